@@ -0,0 +1,439 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codesets.blocks import Block, CellType, Color, RotationType
+from codesets.cell import getRandomBlock
+from codesets.colors import GAME_PLANE_COLOR
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Action, Engine
+from game_logic.matirix import PLACEMENT_CACHE, Matrix
+from game_logic.telemetry import Telemetry
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIN_TIME = 0.2
+# timings are the median of the repeats, a single slow or lucky run moves it less than the best or the mean
+REPEAT = 3
+# the suite runs in this many fresh interpreters and every benchmark keeps its median one;
+# string hashes and the heap layout differ between processes and move the fast benchmarks by a third
+PROCESSES = 3
+REGRESSION_THRESHOLD = 0.2
+# benchmarks of a microsecond or two per operation, and the one racing a writer thread, swing by a third between runs
+# on a shared core; they only fail on a larger drop
+FAST_THRESHOLD = 0.4
+# enough games that one macro repeat runs longer than MIN_TIME
+MACRO_GAMES = 200
+# net blocks per operation a benchmark may leave behind beyond its baseline, one leaked object per op is 1.0
+ALLOCATION_THRESHOLD = 0.05
+
+# random policies keep the original action set so results stay comparable with older baselines
+ACTIONS = [action for action in Action if action != Action.HARD_DROP]
+
+# board-size sweep: per-operation cost should not grow with the board
+GIANT_BOARDS = ((100, 100), (1000, 1000))
+GIANT_STACK = 8
+
+# name -> setup(count) returning a callable that performs `count` operations,
+# or that callable and a teardown run after it whatever happens
+BENCHMARKS: dict[str, Callable[[int], Callable[[], None] | tuple[Callable[[], None], Callable[[], None]]]] = {}
+# benchmarks with a background thread, their allocation counts depend on when it runs and are not compared
+THREADED: set[str] = set()
+# name -> regression threshold, for the benchmarks that do not use REGRESSION_THRESHOLD
+THRESHOLDS: dict[str, float] = {}
+
+def benchmark(name: str, threaded: bool = False, threshold: float = None):
+    def register(setup: Callable[[int], Callable[[], None] | tuple[Callable[[], None], Callable[[], None]]]):
+        BENCHMARKS[name] = setup
+        if threaded:
+            THREADED.add(name)
+        if threshold != None:
+            THRESHOLDS[name] = threshold
+        return setup
+    return register
+
+def newMatrix() -> Matrix:
+    return Matrix(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Color(GAME_PLANE_COLOR), random.Random(0))
+
+def fillRows(matrix: Matrix, rows: int, gap: int = None):
+    for row in range(rows):
+        y = matrix.height - 1 - row
+        for x in range(matrix.width):
+            if x == gap:
+                continue
+            matrix.placeAt(Block(CellType.BACKGROUD), x, y)
+            matrix.moveDown()
+
+def placeT(matrix: Matrix, x: int, y: int, rotation: RotationType = RotationType.TOP):
+    block = Block(CellType.T, Block(CellType.T).rotations.get(rotation))
+    matrix.placeAt(block, x, y)
+
+#region Micro benchmarks
+@benchmark('matrix.moveDown')
+def benchMoveDown(count: int):
+    matrix = newMatrix()
+    def run():
+        for _ in range(count):
+            if not matrix.moveDown():
+                placeT(matrix, 4, 0)
+                matrix.checkLine()
+    placeT(matrix, 4, 0)
+    return run
+
+@benchmark('matrix.moveLeft/moveRight', threshold = FAST_THRESHOLD)
+def benchMoveSideways(count: int):
+    matrix = newMatrix()
+    placeT(matrix, 4, 10)
+    def run():
+        for _ in range(count // 2):
+            matrix.moveLeft()
+            matrix.moveRight()
+    return run
+
+@benchmark('matrix.rotateLeft/rotateRight')
+def benchRotate(count: int):
+    matrix = newMatrix()
+    placeT(matrix, 4, 10)
+    def run():
+        for _ in range(count // 2):
+            matrix.rotateLeft()
+            matrix.rotateRight()
+    return run
+
+def benchCheckLine(fullRows: int):
+    def setup(count: int):
+        board = newMatrix()
+        fillRows(board, fullRows)
+        fillRows(board, 4, 0)
+        boards = [board.copy() for _ in range(count)]
+        def run():
+            for matrix in boards:
+                matrix.checkLine()
+        return run
+    return setup
+
+for fullRows in range(5):
+    benchmark('matrix.checkLine[' + str(fullRows) + ' rows]', threshold = FAST_THRESHOLD if fullRows == 0 else None)(benchCheckLine(fullRows))
+
+@benchmark('matrix.place')
+def benchPlace(count: int):
+    matrix = newMatrix()
+    blocks = [Block(CellType(2 + index % 5)) for index in range(count)]
+    def run():
+        for block in blocks:
+            matrix.place(block)
+    return run
+
+@benchmark('cell.getRandomBlock', threshold = FAST_THRESHOLD)
+def benchGetRandomBlock(count: int):
+    generator = random.Random(0)
+    def run():
+        for _ in range(count):
+            getRandomBlock(generator)
+    return run
+
+@benchmark('engine.step')
+def benchEngineStep(count: int):
+    engine = Engine(seed = 0)
+    generator = random.Random(1)
+    actions = [generator.choice(ACTIONS) for _ in range(1024)]
+    def run():
+        for index in range(count):
+            engine.step(actions[index & 1023])
+            if engine.done:
+                engine.reset(index)
+    return run
+
+@benchmark('engine.step[telemetry]', threaded = True, threshold = FAST_THRESHOLD)
+def benchEngineStepTelemetry(count: int):
+    # same games as engine.step with every event going through the ring buffer and the writer draining to a scratch log
+    descriptor, path = tempfile.mkstemp(prefix = 'bench-telemetry-', suffix = '.jsonl')
+    os.close(descriptor)
+    engine = Engine(seed = 0)
+    engine.telemetry = Telemetry(path, maxBytes = sys.maxsize)
+    generator = random.Random(1)
+    actions = [generator.choice(ACTIONS) for _ in range(1024)]
+    def run():
+        for index in range(count):
+            engine.step(actions[index & 1023])
+            if engine.done:
+                engine.reset(index)
+    def teardown():
+        try:
+            engine.telemetry.close()
+        finally:
+            os.remove(path)
+    return run, teardown
+
+def benchEngineTick(width: int, height: int):
+    def setup(count: int):
+        engine = Engine(width, height, seed = 0)
+        def run():
+            for index in range(count):
+                engine.tick()
+                if engine.done:
+                    engine.reset(index)
+        return run
+    return setup
+
+benchmark('engine.tick', threshold = FAST_THRESHOLD)(benchEngineTick(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT))
+for width, height in GIANT_BOARDS:
+    benchmark('engine.tick[' + str(width) + 'x' + str(height) + ']', threshold = FAST_THRESHOLD)(benchEngineTick(width, height))
+
+@benchmark('engine.snapshot')
+def benchSnapshot(count: int):
+    engine = Engine(seed = 0)
+    for _ in range(100):
+        engine.step(Action.LEFT)
+    def run():
+        for _ in range(count):
+            engine.snapshot()
+    return run
+
+@benchmark('engine.restore')
+def benchRestore(count: int):
+    engine = Engine(seed = 0)
+    for _ in range(100):
+        engine.step(Action.LEFT)
+    snapshot = engine.snapshot()
+    def run():
+        for _ in range(count):
+            engine.restore(snapshot)
+    return run
+
+def benchPlacements(cached: bool):
+    def setup(count: int):
+        matrix = newMatrix()
+        fillRows(matrix, 3, 4)
+        # an overhang so the search has a tuck to find
+        placeT(matrix, 2, matrix.height - 5, RotationType.BOTOM)
+        matrix.drop()
+        matrix.moveDown()
+        placeT(matrix, 4, 0)
+        matrix.getPlacements()
+        def run():
+            for _ in range(count):
+                if not cached:
+                    PLACEMENT_CACHE.clear()
+                matrix.getPlacements()
+        return run
+    return setup
+
+benchmark('matrix.getPlacements[uncached]')(benchPlacements(False))
+benchmark('matrix.getPlacements[cached]', threshold = FAST_THRESHOLD)(benchPlacements(True))
+
+def benchPlaneRender(full: bool, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT, stack: int = 0):
+    def setup(count: int):
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+        import pygame
+        from game_logic.plane import Plane
+        pygame.font.init()
+        surface = pygame.Surface((330, 710))
+        engine = Engine(width, height, seed = 0)
+        # a stack of this many rows at the bottom so the chunks have cells to draw
+        generator = random.Random(0)
+        while min(engine.matrix.getColumnHeights()) > height - stack:
+            engine.step(generator.choice(ACTIONS + [Action.HARD_DROP]))
+        engine.step(Action.NONE)
+        plane = Plane(surface, 330, 710, 100, 10, engine)
+        plane.render()
+        def run():
+            for index in range(count):
+                if full:
+                    plane.reRenderPlane(330, 710)
+                else:
+                    engine.apply(Action.LEFT if index & 1 else Action.RIGHT)
+                plane.render()
+        return run
+    return setup
+
+benchmark('plane.render[full]')(benchPlaneRender(True))
+benchmark('plane.render[incremental]')(benchPlaneRender(False))
+for width, height in GIANT_BOARDS:
+    benchmark('plane.render[full ' + str(width) + 'x' + str(height) + ']')(benchPlaneRender(True, width, height, GIANT_STACK))
+    benchmark('plane.render[incremental ' + str(width) + 'x' + str(height) + ']')(benchPlaneRender(False, width, height, GIANT_STACK))
+#endregion
+
+#region Macro benchmark
+def playGames(games: int, seed: int = 0) -> dict:
+    engine = Engine()
+    generator = random.Random(seed)
+    actions = ACTIONS
+    steps = 0
+    score = 0
+    start = time.perf_counter()
+    for game in range(games):
+        engine.reset(seed + game)
+        done = False
+        while not done:
+            _, _, done = engine.step(generator.choice(actions))
+            steps += 1
+        score += engine.score
+    elapsed = time.perf_counter() - start
+    return {'games': games, 'steps': steps, 'score': score, 'seconds': elapsed, 'gamesPerSec': games / elapsed, 'stepsPerSec': steps / elapsed}
+#endregion
+
+def prepare(setup: Callable, count: int) -> tuple[Callable[[], None], Callable[[], None]]:
+    prepared = setup(count)
+    if isinstance(prepared, tuple):
+        return prepared
+    return prepared, None
+
+def timeRun(setup: Callable, count: int) -> float:
+    run, teardown = prepare(setup, count)
+    try:
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+    finally:
+        if teardown != None:
+            teardown()
+
+def measure(setup: Callable) -> dict:
+    count = 1
+    while True:
+        elapsed = timeRun(setup, count)
+        if elapsed >= MIN_TIME or count >= 1 << 24:
+            break
+        count *= 2 if elapsed == 0 else max(2, min(10, int(MIN_TIME / elapsed) + 1))
+
+    times = [elapsed]
+    for _ in range(REPEAT - 1):
+        times.append(timeRun(setup, count))
+    median = statistics.median(times)
+
+    # allocations: net memory blocks left behind and the transient peak, per operation; counted before the teardown
+    run, teardown = prepare(setup, count)
+    try:
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated = sys.getallocatedblocks() - blocks
+    finally:
+        if teardown != None:
+            teardown()
+    return {
+        'ops': count,
+        'opsPerSec': count / median,
+        'nsPerOp': median * 1e9 / count,
+        'allocatedBlocksPerOp': allocated / count,
+        'peakBytes': peak,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results['micro'].items():
+        reference = baseline.get('micro', {}).get(name)
+        if reference == None:
+            continue
+        change = result['opsPerSec'] / reference['opsPerSec'] - 1
+        allocations = result['allocatedBlocksPerOp'] - reference['allocatedBlocksPerOp']
+        print('%-36s %12.0f ops/s  %+6.1f%% %+8.2f blocks/op' % (name, result['opsPerSec'], change * 100, allocations))
+        if change < -max(threshold, THRESHOLDS.get(name, 0)):
+            regressions.append(name)
+        if allocations > ALLOCATION_THRESHOLD and name not in THREADED:
+            regressions.append(name + ' allocations')
+
+    macro = results.get('macro')
+    reference = baseline.get('macro')
+    if macro == None or reference == None:
+        return regressions
+    if macro['games'] != reference['games']:
+        print('macro: not compared, the baseline played %(games)d games' % reference)
+        return regressions
+    if (macro['steps'], macro['score']) != (reference['steps'], reference['score']):
+        # the same seeds played differently, the engine changed and the baseline has to be refreshed with it
+        print('macro: %(games)d games, %(steps)d steps, score %(score)d' % macro, 'but the baseline played %(games)d games, %(steps)d steps, score %(score)d' % reference)
+        regressions.append('macro games')
+        return regressions
+    change = macro['stepsPerSec'] / reference['stepsPerSec'] - 1
+    print('%-36s %12.0f steps/s  %+6.1f%%' % ('macro', macro['stepsPerSec'], change * 100))
+    if change < -threshold:
+        regressions.append('macro')
+    return regressions
+
+def runSuite(filter: str, games: int) -> dict:
+    results = {'micro': {}}
+    for name, setup in BENCHMARKS.items():
+        if filter not in name:
+            continue
+        try:
+            results['micro'][name] = measure(setup)
+        except ImportError as error:
+            print('skipped', name + ':', error)
+            continue
+        result = results['micro'][name]
+        print('%-36s %12.0f ops/s %10.0f ns/op %8.2f blocks/op' % (name, result['opsPerSec'], result['nsPerOp'], result['allocatedBlocksPerOp']))
+    if games > 0:
+        # the same games every repeat, the run with the median speed is kept
+        results['macro'] = getMedian([playGames(games) for _ in range(REPEAT)], 'stepsPerSec')
+        print('macro: %(games)d games, %(steps)d steps in %(seconds).2fs (%(stepsPerSec).0f steps/s)' % results['macro'])
+    sys.stdout.flush()
+    return results
+
+def getMedian(results: list[dict], key: str) -> dict:
+    return sorted(results, key = lambda result: result[key])[len(results) // 2]
+
+def runProcesses(filter: str, games: int, processes: int) -> dict:
+    if processes <= 1:
+        return runSuite(filter, games)
+    # one process per run, so none of them inherits the heap or the hash seed of another
+    runs = []
+    for index in range(processes):
+        print('process', index + 1, 'of', processes)
+        sys.stdout.flush()
+        with ProcessPoolExecutor(1, mp_context = multiprocessing.get_context('spawn')) as executor:
+            runs.append(executor.submit(runSuite, filter, games).result())
+    results = {'micro': {}}
+    for name in runs[0]['micro']:
+        results['micro'][name] = getMedian([run['micro'][name] for run in runs], 'opsPerSec')
+    if 'macro' in runs[0]:
+        results['macro'] = getMedian([run['macro'] for run in runs], 'stepsPerSec')
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = 'Tetris core benchmarks')
+    parser.add_argument('--filter', default = '', help = 'only run benchmarks whose name contains this')
+    parser.add_argument('--games', type = int, default = MACRO_GAMES, help = 'games played by the macro benchmark')
+    parser.add_argument('--processes', type = int, default = PROCESSES, help = 'fresh interpreters the suite runs in, every benchmark keeps its median')
+    parser.add_argument('--output', help = 'write results as JSON to this file')
+    parser.add_argument('--baseline', default = DEFAULT_BASELINE, help = 'baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'store these results as the new baseline')
+    parser.add_argument('--threshold', type = float, default = REGRESSION_THRESHOLD, help = 'allowed slowdown before failing')
+    arguments = parser.parse_args()
+
+    results = {'python': platform.python_version(), 'machine': platform.machine(), **runProcesses(arguments.filter, arguments.games, arguments.processes)}
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent = 2)
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as file:
+            json.dump(results, file, indent = 2)
+        return 0
+
+    try:
+        with open(arguments.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        return 0
+    regressions = compare(results, baseline, arguments.threshold)
+    if len(regressions) > 0:
+        print('regressions:', ', '.join(regressions))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_logic.engine import CELL_COUNT_HEIGHT, Action
+from game_logic.server import decodeFrames, getFrameFormat
+from game_logic.session import RELEASE_FLAG
+
+INPUTS = [action.value for action in Action if action != Action.NONE] + [Action.DOWN.value | RELEASE_FLAG]
+
+class Client(asyncio.Protocol):
+    def __init__(self, stats: 'Stats'):
+        self.stats: Stats = stats
+        self.transport: asyncio.Transport = None
+        self.__buffer: bytearray = bytearray()
+        self.__sent: float = None
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.stats.connected += 1
+
+    def connection_lost(self, exception: Exception):
+        self.stats.connected -= 1
+
+    def data_received(self, data: bytes):
+        self.__buffer += data
+        frames = decodeFrames(self.__buffer, self.stats.frameFormat)
+        self.stats.frames += len(frames)
+        self.stats.games += sum(1 for frame in frames if frame.done)
+        if len(frames) > 0 and self.__sent != None:
+            self.stats.latencies.append(time.perf_counter() - self.__sent)
+            self.__sent = None
+
+    def send(self, code: int):
+        if self.__sent == None:
+            self.__sent = time.perf_counter()
+        self.transport.write(bytes((code,)))
+        self.stats.inputs += 1
+
+class Stats:
+    def __init__(self, height: int):
+        self.frameFormat = getFrameFormat(height)
+        self.connected: int = 0
+        self.frames: int = 0
+        self.inputs: int = 0
+        self.games: int = 0
+        self.latencies: list[float] = []
+
+async def connect(address: str, stats: Stats) -> Client:
+    loop = asyncio.get_running_loop()
+    if '/' in address:
+        _, client = await loop.create_unix_connection(lambda: Client(stats), address)
+    else:
+        host, port = address.rsplit(':', 1)
+        _, client = await loop.create_connection(lambda: Client(stats), host, int(port))
+    return client
+
+async def play(client: Client, rate: float, end: float, generator: random.Random):
+    loop = asyncio.get_running_loop()
+    while loop.time() < end:
+        await asyncio.sleep(generator.expovariate(rate))
+        if not client.transport.is_closing():
+            client.send(generator.choice(INPUTS))
+
+async def run(address: str, sessions: int, rate: float, seconds: float, seed: int) -> Stats:
+    stats = Stats(CELL_COUNT_HEIGHT)
+    clients = []
+    for _ in range(sessions):
+        clients.append(await connect(address, stats))
+    generator = random.Random(seed)
+    start = time.perf_counter()
+    end = asyncio.get_running_loop().time() + seconds
+    await asyncio.gather(*(play(client, rate, end, random.Random(generator.getrandbits(32))) for client in clients))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.transport.close()
+
+    latencies = sorted(stats.latencies) or [0.0]
+    percentile = lambda value: latencies[min(len(latencies) - 1, int(len(latencies) * value / 100))] * 1000
+    print('%d sessions, %.0f inputs/s, %.0f frames/s, %d games finished' % (sessions, stats.inputs / elapsed, stats.frames / elapsed, stats.games))
+    print('input to frame latency ms: p50 %.2f  p95 %.2f  p99 %.2f' % (percentile(50), percentile(95), percentile(99)))
+    return stats
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = 'Load generator for the Tetris game server')
+    parser.add_argument('--address', default = '127.0.0.1:7777', help = 'host:port or unix socket path of the server')
+    parser.add_argument('--sessions', type = int, default = 1000, help = 'concurrent games')
+    parser.add_argument('--rate', type = float, default = 3.0, help = 'inputs per second per session')
+    parser.add_argument('--seconds', type = float, default = 10.0, help = 'length of the run')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--spawn-server', action = 'store_true', help = 'start a server process on the address first')
+    arguments = parser.parse_args()
+
+    server = None
+    if arguments.spawn_server:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen([sys.executable, os.path.join(root, 'main.py'), '--serve', arguments.address])
+        time.sleep(1.0)
+    try:
+        asyncio.run(run(arguments.address, arguments.sessions, arguments.rate, arguments.seconds, arguments.seed))
+    finally:
+        if server != None:
+            server.terminate()
+            server.wait()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
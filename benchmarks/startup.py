@@ -0,0 +1,91 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# cumulative import time in milliseconds each entry point may take
+IMPORT_BUDGETS: dict[str, float] = {
+    'game_logic.engine': 100.0,
+    'game_logic.replay': 100.0,
+    'game_logic.bot': 100.0,
+    'game_logic.game': 500.0,
+}
+# modules the headless entry points must not pull in
+HEADLESS_FORBIDDEN = ('numpy', 'pygame', 'multiprocessing', 'cProfile')
+HEADLESS_MODULES = ('game_logic.engine', 'game_logic.replay', 'game_logic.bot', 'game_logic.server')
+# wall time in milliseconds from process start until the game window is ready
+GAME_START_BUDGET = 1500.0
+
+def getEnvironment() -> dict[str, str]:
+    environment = dict(os.environ)
+    environment['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    environment.setdefault('SDL_VIDEODRIVER', 'dummy')
+    environment['PYTHONPATH'] = ROOT + os.pathsep + environment.get('PYTHONPATH', '')
+    return environment
+
+def measureImport(module: str) -> float:
+    # -X importtime writes "import time: self [us] | cumulative | name" to stderr, the line for the module itself is the total
+    best = None
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], env = getEnvironment(), capture_output = True, text = True, check = True)
+        cumulative = None
+        for line in result.stderr.splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1]) / 1000
+        if best == None or cumulative < best:
+            best = cumulative
+    return best
+
+def findForbidden(module: str) -> list[str]:
+    code = 'import sys, ' + module + '; print(" ".join(name for name in ' + repr(HEADLESS_FORBIDDEN) + ' if name in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], env = getEnvironment(), capture_output = True, text = True, check = True)
+    return result.stdout.split()
+
+def measureGameStart() -> float:
+    code = 'import time; start = time.perf_counter(); from game_logic.game import Game; Game(seed = 0); print(time.perf_counter() - start)'
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env = getEnvironment(), capture_output = True, text = True, check = True)
+        # interpreter start plus everything up to a ready window
+        elapsed = (time.perf_counter() - start) * 1000
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = 'Startup time checks')
+    parser.add_argument('--no-game', action = 'store_true', help = 'skip the checks that need pygame')
+    arguments = parser.parse_args()
+
+    failures = []
+    for module, budget in IMPORT_BUDGETS.items():
+        if arguments.no_game and module == 'game_logic.game':
+            continue
+        milliseconds = measureImport(module)
+        print('%-20s %8.1f ms  (budget %.0f ms)' % (module, milliseconds, budget))
+        if milliseconds > budget:
+            failures.append(module + ' import over budget')
+    for module in HEADLESS_MODULES:
+        forbidden = findForbidden(module)
+        if len(forbidden) > 0:
+            print('%-20s imports %s' % (module, ', '.join(forbidden)))
+            failures.append(module + ' imports ' + ', '.join(forbidden))
+    if not arguments.no_game:
+        milliseconds = measureGameStart()
+        print('%-20s %8.1f ms  (budget %.0f ms)' % ('game window', milliseconds, GAME_START_BUDGET))
+        if milliseconds > GAME_START_BUDGET:
+            failures.append('game start over budget')
+
+    if len(failures) > 0:
+        print('failed:', '; '.join(failures))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
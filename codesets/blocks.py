@@ -2,10 +2,16 @@ from __future__ import annotations
 from enum import Enum
 import random
 from typing import Tuple
-import pygame.color
-from codesets.helpers import first
 from codesets.colors import *
 
+class CellType(Enum):
+    BACKGROUD = 1
+    LINE = 2
+    T = 3
+    SQUARE = 4
+    L = 5
+    MIRROR_L = 6
+
 class PositionChangeType(Enum):
     CLEAR = 1
     CANT = 2
@@ -15,20 +21,20 @@ class PositionType(Enum):
     BLOCK = 1
     EMPTY = 2
 
+# positions are shared between shapes and boards, so they are never changed after construction
 class Position:
+    __slots__ = ('x', 'y', 'positionType')
+
     def __init__(self, x: int, y : int, empty: bool = False):
         self.x: int = x
         self.y: int = y
         self.positionType: PositionType = PositionType.EMPTY if empty else PositionType.BLOCK
     
     def plus(self, position: Position) -> Position:
-        self.x += position.x
-        self.y += position.y
-        return self
+        return Position(self.x + position.x, self.y + position.y, self.positionType == PositionType.EMPTY)
     
     def clone(self) -> Position:
-        empty: bool = True if self.positionType == PositionType.EMPTY else False
-        return Position(self.x, self.y, empty)
+        return self
     
     def equals(self, position: Position):
         return self.x == position.x and self.y == position.y
@@ -40,18 +46,33 @@ class RotationType(Enum):
     BOTOM = 4
 
 class Rotation:
+    __slots__ = ('positions', 'type', 'offsets', 'rowMasks', 'bottomProfile', 'width', 'height', '__cells')
+
     def __init__(self, positions: list[Position], type: RotationType):
-        self.positions: list[Position] = positions
+        self.positions: tuple[Position, ...] = tuple(positions)
         self.type: RotationType = type
+        self.offsets: tuple[tuple[int, int], ...] = tuple((pos.x, pos.y) for pos in positions if pos.positionType == PositionType.BLOCK)
+        self.width: int = max(pos.x for pos in positions) + 1
+        self.height: int = max(pos.y for pos in positions) + 1
+        self.rowMasks: tuple[int, ...] = self.__getRowMasks()
+        # lowest occupied row of every column, relative to the top of the rotation
+        self.bottomProfile: tuple[int, ...] = tuple(max(y for x, y in self.offsets if x == column) for column in range(self.width))
+        self.__cells: dict[tuple[int, int], Position] = {(pos.x, pos.y): pos for pos in positions}
 
     def getMaxWidthPos(self) -> int:
-        return max(map(lambda pos: pos.x, self.positions))
+        return self.width - 1
 
     def getMaxHeightPos(self) -> int:
-        return max(map(lambda pos: pos.y, self.positions))
+        return self.height - 1
 
     def getPosition(self, x: int, y: int) -> Position:
-        return first(self.positions, lambda p: p.equals(Position(x, y)))
+        return self.__cells.get((x, y))
+
+    def __getRowMasks(self) -> tuple[int, ...]:
+        rowMasks = [0] * self.height
+        for x, y in self.offsets:
+            rowMasks[y] |= 1 << x
+        return tuple(rowMasks)
 
 class Rotations:
     def __init__(self, left: list[Position], top: list[Position], right: list[Position], bottom: list[Position]):
@@ -59,63 +80,123 @@ class Rotations:
         self.top: Rotation = Rotation(top, RotationType.TOP)
         self.right: Rotation = Rotation(right, RotationType.RIGHT)
         self.bottom: Rotation = Rotation(bottom, RotationType.BOTOM)
-    
-    def getRandomRotation(self):
-        rotationNumber = random.randint(1, 4)
-        if rotationNumber == RotationType.LEFT.value:
-            return self.left
-        if rotationNumber == RotationType.RIGHT.value:
-            return self.right
-        if rotationNumber == RotationType.TOP.value:
-            return self.top
-        if rotationNumber == RotationType.BOTOM.value:
-            return self.bottom
-    
-    def getRightRotation(self, currentRotation: Rotation) -> Rotation:
-        switcher = {
+        self.__byType: dict[RotationType, Rotation] = {
+            RotationType.LEFT: self.left,
+            RotationType.TOP: self.top,
+            RotationType.RIGHT: self.right,
+            RotationType.BOTOM: self.bottom,
+        }
+        self.__right: dict[RotationType, Rotation] = {
             RotationType.LEFT: self.top,
             RotationType.TOP: self.right,
             RotationType.RIGHT: self.bottom,
             RotationType.BOTOM: self.left,
         }
-
-        return switcher.get(currentRotation.type)
-    
-    def getLeftRotation(self, currentRotation: Rotation) -> Rotation:
-        switcher = {
+        self.__left: dict[RotationType, Rotation] = {
             RotationType.LEFT: self.bottom,
             RotationType.BOTOM: self.right,
             RotationType.RIGHT: self.top,
             RotationType.TOP: self.left,
         }
 
-        return switcher.get(currentRotation.type)
-        
+    def get(self, type: RotationType) -> Rotation:
+        return self.__byType[type]
+
+    def getRandomRotation(self, generator: random.Random = random):
+        return self.__byType[RotationType(generator.randint(1, 4))]
+
+    def getRightRotation(self, currentRotation: Rotation) -> Rotation:
+        return self.__right[currentRotation.type]
+
+    def getLeftRotation(self, currentRotation: Rotation) -> Rotation:
+        return self.__left[currentRotation.type]
+
 
 class Color:
-    def __init__(self, red: int, green: int, blue: int):
-        self.red: int = red
-        self.green: int = green
-        self.blue: int = blue
-    
+    __slots__ = ('red', 'green', 'blue', '__pyGameColor')
+
     def __init__(self, tuple: Tuple):
         self.red: int = tuple[0]
         self.green: int = tuple[1]
         self.blue: int = tuple[2]
-
-    def getPyGameColor(self) -> pygame.color.Color:
-        return (self.red, self.green, self.blue)
+        self.__pyGameColor: Tuple[int, int, int] = (self.red, self.green, self.blue)
+
+    def getPyGameColor(self) -> Tuple[int, int, int]:
+        return self.__pyGameColor
+
+
+def _getLineRotations() -> Rotations:
+    leftRotation = [Position(0, 0), Position(0, 1), Position(0, 2), Position(0, 3)]
+    topRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(3, 0)]
+    return Rotations(leftRotation, topRotation, leftRotation, topRotation)
+
+def _getTRotations() -> Rotations:
+    leftRotation = [Position(0, 0, True), Position(1, 0), Position(0, 1), Position(1, 1), Position(0, 2, True), Position(1, 2)]
+    topRotation = [Position(0, 0, True), Position(1, 0), Position(2, 0, True), Position(0, 1), Position(1, 1), Position(2, 1)]
+    rightRotation = [Position(0, 0), Position(1, 0, True), Position(0, 1), Position(1, 1), Position(0, 2), Position(1, 2, True)]
+    bottomRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1, True), Position(1, 1), Position(2, 1, True)]
+    return Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
+
+def _getSquareRotations() -> Rotations:
+    leftRotation = [Position(0, 0), Position(1, 0), Position(0, 1), Position(1, 1)]
+    return Rotations(leftRotation, leftRotation, leftRotation, leftRotation)
+
+def _getLRotations() -> Rotations:
+    leftRotation = [Position(0, 0), Position(1, 0, True), Position(0, 1), Position(1, 1, True), Position(0, 2), Position(1, 2)]
+    topRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1), Position(1, 1, True), Position(2, 1, True)]
+    rightRotation = [Position(0, 0), Position(1, 0), Position(0, 1, True), Position(1, 1), Position(0, 2, True), Position(1, 2)]
+    bottomRotation = [Position(0, 0, True), Position(1, 0, True), Position(2, 0), Position(0, 1), Position(1, 1), Position(2, 1)]
+    return Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
+
+def _getMirrorLRotations() -> Rotations:
+    leftRotation = [Position(0, 0, True), Position(1, 0), Position(0, 1, True), Position(1, 1), Position(0, 2), Position(1, 2)]
+    topRotation = [Position(0, 0), Position(1, 0, True), Position(2, 0, True), Position(0, 1), Position(1, 1), Position(2, 1)]
+    rightRotation = [Position(0, 0), Position(1, 0), Position(0, 1), Position(1, 1, True), Position(0, 2), Position(1, 2, True)]
+    bottomRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1, True), Position(1, 1, True), Position(2, 1)]
+    return Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
+
+def _getBackgroundRotations() -> Rotations:
+    leftRotation = [Position(0, 0)]
+    return Rotations(leftRotation, leftRotation, leftRotation, leftRotation)
+
+# shape tables are built once at import and shared by every Block
+ROTATIONS: dict[CellType, Rotations] = {
+    CellType.BACKGROUD: _getBackgroundRotations(),
+    CellType.LINE: _getLineRotations(),
+    CellType.T: _getTRotations(),
+    CellType.SQUARE: _getSquareRotations(),
+    CellType.L: _getLRotations(),
+    CellType.MIRROR_L: _getMirrorLRotations(),
+}
+
+COLORS: dict[CellType, Color] = {
+    CellType.BACKGROUD: Color(BLOCK_BACKGROUD),
+    CellType.LINE: Color(BLOCK_LINE_COLOR),
+    CellType.T: Color(BLOCK_T_COLOR),
+    CellType.SQUARE: Color(BLOCK_SQUARE_COLOR),
+    CellType.L: Color(BLOCK_L_COLOR),
+    CellType.MIRROR_L: Color(BLOCK_MIRROR_L_COLOR),
+}
 
 
 class Block:
-    def __init__(self, color: Color, rotations: Rotations):
-        self.color: Color = color
-        self.rotations: Rotations = rotations
-        self.__rotation: Rotation = None
-    
-    def getRotation(self) -> Rotation:
+    __slots__ = ('type', '__rotation')
+
+    def __init__(self, type: CellType, rotation: Rotation = None):
+        self.type: CellType = type
+        self.__rotation: Rotation = rotation
+
+    @property
+    def color(self) -> Color:
+        return COLORS[self.type]
+
+    @property
+    def rotations(self) -> Rotations:
+        return ROTATIONS[self.type]
+
+    def getRotation(self, generator: random.Random = random) -> Rotation:
         if(self.__rotation == None):
-            self.__rotation = self.rotations.getRandomRotation()
+            self.__rotation = self.rotations.getRandomRotation(generator)
         
         return self.__rotation
     
@@ -134,57 +215,12 @@ class Block:
     
     def rotateRight(self):
         self.__rotation = self.getRotateRight()
-        
-    
 
-class Block_LINE(Block):
-    def __init__(self):
-        color = Color(BLOCK_LINE_COLOR)
-        leftRotation = [Position(0, 0), Position(0, 1), Position(0, 2), Position(0, 3)]
-        topRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(3, 0)]
-        rotation = Rotations(leftRotation, topRotation, leftRotation, topRotation)
-        super().__init__(color, rotation)
-
-class Block_T(Block):
-    def __init__(self):
-        color = Color(BLOCK_T_COLOR)
-        leftRotation = [Position(0, 0, True), Position(1, 0), Position(0, 1), Position(1, 1), Position(0, 2, True), Position(1, 2)]
-        topRotation = [Position(0, 0, True), Position(1, 0), Position(2, 0, True), Position(0, 1), Position(1, 1), Position(2, 1)]
-        rightRotation = [Position(0, 0), Position(1, 0, True), Position(0, 1), Position(1, 1), Position(0, 2), Position(1, 2, True)]
-        bottomRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1, True), Position(1, 1), Position(2, 1, True)]
-        rotation = Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
-        super().__init__(color, rotation)
-
-class Block_SQUARE(Block):
-    def __init__(self):
-        color = Color(BLOCK_SQUARE_COLOR)
-        leftRotation = [Position(0, 0), Position(1, 0), Position(0, 1), Position(1, 1)]
-        rotation = Rotations(leftRotation, leftRotation, leftRotation, leftRotation)
-        super().__init__(color, rotation)
-
-class Block_L(Block):
-    def __init__(self):
-        color = Color(BLOCK_L_COLOR)
-        leftRotation = [Position(0, 0), Position(1, 0, True), Position(0, 1), Position(1, 1, True), Position(0, 2), Position(1, 2)]
-        topRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1), Position(1, 1, True), Position(2, 1, True)]
-        rightRotation = [Position(0, 0), Position(1, 0), Position(0, 1, True), Position(1, 1), Position(0, 2, True), Position(1, 2)]
-        bottomRotation = [Position(0, 0, True), Position(1, 0, True), Position(2, 0), Position(0, 1), Position(1, 1), Position(2, 1)]
-        rotation = Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
-        super().__init__(color, rotation)
-
-class Block_MIRROR_L(Block):
-    def __init__(self):
-        color = Color(BLOCK_MIRROR_L_COLOR)
-        leftRotation = [Position(0, 0, True), Position(1, 0), Position(0, 1, True), Position(1, 1), Position(0, 2), Position(1, 2)]
-        topRotation = [Position(0, 0), Position(1, 0, True), Position(2, 0, True), Position(0, 1), Position(1, 1), Position(2, 1)]
-        rightRotation = [Position(0, 0), Position(1, 0), Position(0, 1), Position(1, 1, True), Position(0, 2), Position(1, 2, True)]
-        bottomRotation = [Position(0, 0), Position(1, 0), Position(2, 0), Position(0, 1, True), Position(1, 1, True), Position(2, 1)]
-        rotation = Rotations(leftRotation, topRotation, rightRotation, bottomRotation)
-        super().__init__(color, rotation)
-
-class Block_BACKGROUD(Block):
-    def __init__(self):
-        color = Color(BLOCK_BACKGROUD)
-        leftRotation = [Position(0, 0)]
-        rotation = Rotations(leftRotation, leftRotation, leftRotation, leftRotation)
-        super().__init__(color, rotation)
+CELL_TYPES: dict[int, CellType] = {type.value: type for type in CellType}
+ROTATION_TYPES: dict[int, RotationType] = {type.value: type for type in RotationType}
+
+def getBlockFromValues(type: int, rotation: int = 0) -> Block:
+    cellType = CELL_TYPES[type]
+    if rotation == 0:
+        return Block(cellType)
+    return Block(cellType, ROTATIONS[cellType].get(ROTATION_TYPES[rotation]))
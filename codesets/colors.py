@@ -1,3 +1,4 @@
+BACKGROUND_COLOR = (255, 255, 255)
 GAME_PLANE_COLOR = (162, 250, 235)
 SCORE_BLOCK_COLOR = GAME_PLANE_COLOR
 BLOCK_BACKGROUD = GAME_PLANE_COLOR
@@ -5,4 +6,6 @@ BLOCK_LINE_COLOR = (35, 212, 32)
 BLOCK_T_COLOR = (148, 24, 219)
 BLOCK_SQUARE_COLOR = (224, 201, 25)
 BLOCK_L_COLOR = (34, 65, 240)
-BLOCK_MIRROR_L_COLOR = (247, 139, 15)
\ No newline at end of file
+BLOCK_MIRROR_L_COLOR = (247, 139, 15)
+# share of the block color in its ghost, the rest is the plane color
+GHOST_BLEND = 0.35
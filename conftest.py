@@ -0,0 +1 @@
+# the repository root is the import root for game_logic and codesets, pytest puts this directory on sys.path
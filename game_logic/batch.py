@@ -0,0 +1,185 @@
+import numpy as np
+from codesets.blocks import ROTATIONS, CellType, RotationType
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Action
+
+FIRST_BLOCK = CellType.LINE.value
+LAST_BLOCK = CellType.MIRROR_L.value
+BLOCK_CELLS = 4
+
+def _buildTables() -> tuple[np.ndarray, np.ndarray]:
+    # indexed by [CellType value, RotationType value - 1]
+    offsets = np.zeros((LAST_BLOCK + 1, len(RotationType), BLOCK_CELLS, 2), dtype = np.int64)
+    widths = np.ones((LAST_BLOCK + 1, len(RotationType)), dtype = np.int64)
+    for type in CellType:
+        if type == CellType.BACKGROUD:
+            continue
+        for rotationType in RotationType:
+            rotation = ROTATIONS[type].get(rotationType)
+            offsets[type.value, rotationType.value - 1] = rotation.offsets
+            widths[type.value, rotationType.value - 1] = rotation.width
+    return offsets, widths
+
+OFFSETS, WIDTHS = _buildTables()
+
+class BatchEngine:
+    def __init__(self, count: int, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT, seed: int = None):
+        self.count: int = count
+        self.width: int = width
+        self.height: int = height
+        self.reset(seed)
+
+    def reset(self, seed: int = None) -> np.ndarray:
+        self.random: np.random.Generator = np.random.default_rng(seed)
+        self.boards: np.ndarray = np.zeros((self.count, self.height, self.width), dtype = np.uint8)
+        self.block: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.rotation: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.x: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.y: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.nextBlock: np.ndarray = self.random.integers(FIRST_BLOCK, LAST_BLOCK + 1, self.count)
+        self.savedBlock: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.savedRotation: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.canSave: np.ndarray = np.ones(self.count, dtype = bool)
+        self.score: np.ndarray = np.zeros(self.count, dtype = np.int64)
+        self.done: np.ndarray = np.zeros(self.count, dtype = bool)
+        return self.getBoards()
+
+    def resetFinished(self) -> np.ndarray:
+        index = np.flatnonzero(self.done)
+        self.boards[index] = 0
+        self.block[index] = 0
+        self.nextBlock[index] = self.random.integers(FIRST_BLOCK, LAST_BLOCK + 1, len(index))
+        self.savedBlock[index] = 0
+        self.canSave[index] = True
+        self.score[index] = 0
+        self.done[index] = False
+        return index
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        actions = np.asarray(actions)
+        live = ~self.done
+        hasBlock = live & (self.block != 0)
+        rewards = np.zeros(self.count, dtype = np.int64)
+
+        self.__move(np.flatnonzero(hasBlock & (actions == Action.LEFT.value)), -1, 0)
+        self.__move(np.flatnonzero(hasBlock & (actions == Action.RIGHT.value)), 1, 0)
+        self.__rotate(np.flatnonzero(hasBlock & (actions == Action.ROTATE_LEFT.value)), -1)
+        self.__rotate(np.flatnonzero(hasBlock & (actions == Action.ROTATE_RIGHT.value)), 1)
+        self.__moveDown(np.flatnonzero(hasBlock & (actions == Action.DOWN.value)), rewards, False)
+        self.__saveBlock(np.flatnonzero(live & self.canSave & (actions == Action.SAVE.value)))
+        self.__hardDrop(np.flatnonzero(hasBlock & (self.block != 0) & (actions == Action.HARD_DROP.value)), rewards)
+        self.tick(rewards)
+        return self.getBoards(), rewards, self.done.copy()
+
+    def tick(self, rewards: np.ndarray = None) -> np.ndarray:
+        if rewards is None:
+            rewards = np.zeros(self.count, dtype = np.int64)
+        live = ~self.done
+        empty = np.flatnonzero(live & (self.block == 0))
+        self.__moveDown(np.flatnonzero(live & (self.block != 0)), rewards, True)
+        self.__placeBlock(empty)
+        return rewards
+
+    def getBoards(self, withBlocks: bool = True) -> np.ndarray:
+        boards = self.boards.copy()
+        if withBlocks:
+            index = np.flatnonzero(self.block != 0)
+            xs, ys = self.__getCells(self.block[index], self.rotation[index], self.x[index], self.y[index])
+            boards[index[:, None], ys, xs] = self.block[index, None]
+        return boards
+
+    def __getCells(self, block: np.ndarray, rotation: np.ndarray, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        offsets = OFFSETS[block, rotation]
+        return x[:, None] + offsets[:, :, 0], y[:, None] + offsets[:, :, 1]
+
+    def __fits(self, index: np.ndarray, block: np.ndarray, rotation: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        xs, ys = self.__getCells(block, rotation, x, y)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        occupied = self.boards[index[:, None], np.clip(ys, 0, self.height - 1), np.clip(xs, 0, self.width - 1)] != 0
+        return np.all(inside & ~occupied, axis = 1)
+
+    def __move(self, index: np.ndarray, x: int, y: int) -> np.ndarray:
+        nextX = self.x[index] + x
+        nextY = self.y[index] + y
+        fits = self.__fits(index, self.block[index], self.rotation[index], nextX, nextY)
+        moved = index[fits]
+        self.x[moved] = nextX[fits]
+        self.y[moved] = nextY[fits]
+        return fits
+
+    def __rotate(self, index: np.ndarray, direction: int):
+        block = self.block[index]
+        rotation = (self.rotation[index] + direction) % len(RotationType)
+        x = np.minimum(self.x[index], self.width - WIDTHS[block, rotation])
+        fits = self.__fits(index, block, rotation, x, self.y[index])
+        rotated = index[fits]
+        self.rotation[rotated] = rotation[fits]
+        self.x[rotated] = x[fits]
+
+    def __moveDown(self, index: np.ndarray, rewards: np.ndarray, spawn: bool):
+        if len(index) == 0:
+            return
+        locked = index[~self.__move(index, 0, 1)]
+        if len(locked) == 0:
+            return
+
+        block = self.block[locked]
+        xs, ys = self.__getCells(block, self.rotation[locked], self.x[locked], self.y[locked])
+        self.boards[locked[:, None], ys, xs] = block[:, None]
+        self.block[locked] = 0
+
+        points = self.__checkLine(locked)
+        self.score[locked] += points
+        rewards[locked] += points
+        if spawn:
+            self.__placeBlock(locked)
+
+    def __hardDrop(self, index: np.ndarray, rewards: np.ndarray):
+        falling = index
+        while len(falling) > 0:
+            falling = falling[self.__move(falling, 0, 1)]
+        self.__moveDown(index, rewards, True)
+
+    def __checkLine(self, index: np.ndarray) -> np.ndarray:
+        full = np.all(self.boards[index] != 0, axis = 2)
+        lines = full.sum(axis = 1)
+        cleared = lines > 0
+        if np.any(cleared):
+            boards = index[cleared]
+            # stable sort moves the full rows to the top and keeps the rest in order
+            order = np.argsort(~full[cleared], axis = 1, kind = 'stable')
+            compacted = np.take_along_axis(self.boards[boards], order[:, :, None], axis = 1)
+            compacted[np.arange(self.height)[None, :] < lines[cleared, None]] = 0
+            self.boards[boards] = compacted
+
+        points = self.width * lines
+        return np.where(lines == 4, points * points, points)
+
+    def __placeBlock(self, index: np.ndarray):
+        if len(index) == 0:
+            return
+        self.canSave[index] = True
+        self.__place(index, self.nextBlock[index], self.random.integers(0, len(RotationType), len(index)))
+        self.nextBlock[index] = self.random.integers(FIRST_BLOCK, LAST_BLOCK + 1, len(index))
+
+    def __place(self, index: np.ndarray, block: np.ndarray, rotation: np.ndarray):
+        x = (self.random.random(len(index)) * (self.width - WIDTHS[block, rotation] + 1)).astype(np.int64)
+        self.block[index] = block
+        self.rotation[index] = rotation
+        self.x[index] = x
+        self.y[index] = 0
+        fits = self.__fits(index, block, rotation, x, np.zeros(len(index), dtype = np.int64))
+        self.done[index[~fits]] = True
+
+    def __saveBlock(self, index: np.ndarray):
+        if len(index) == 0:
+            return
+        current = self.block[index]
+        currentRotation = self.rotation[index]
+        hasSaved = self.savedBlock[index] != 0
+        swapped = index[hasSaved]
+        if len(swapped) > 0:
+            self.__place(swapped, self.savedBlock[swapped], self.savedRotation[swapped])
+        self.__placeBlock(index[~hasSaved])
+        self.savedBlock[index] = current
+        self.savedRotation[index] = currentRotation
+        self.canSave[index] = False
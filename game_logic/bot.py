@@ -0,0 +1,140 @@
+from collections import deque
+from typing import NamedTuple
+from codesets.blocks import Block, CellType
+from game_logic.engine import Action, Engine
+from game_logic.matirix import Matrix
+
+class Weights(NamedTuple):
+    height: float = -0.510066
+    lines: float = 0.760666
+    holes: float = -0.35663
+    bumpiness: float = -0.184483
+
+MOVE_ACTIONS: dict[str, Action] = {
+    'moveLeft': Action.LEFT,
+    'moveRight': Action.RIGHT,
+    'rotateLeft': Action.ROTATE_LEFT,
+    'rotateRight': Action.ROTATE_RIGHT,
+}
+
+class Placement(NamedTuple):
+    # each action with the row the block has to reach before it is pressed
+    actions: tuple[tuple[Action, int], ...]
+    matrix: Matrix
+    lines: int
+    score: float
+
+def evaluate(matrix: Matrix, lines: int, weights: Weights) -> float:
+    tops = matrix.getColumnHeights()
+    heights = [matrix.height - top for top in tops]
+    covered = 0
+    holes = 0
+    # rows above the highest column are empty
+    for row in matrix.getRows()[min(tops):]:
+        covered |= row
+        holes += (covered & ~row).bit_count()
+
+    bumpiness = sum(abs(heights[column] - heights[column + 1]) for column in range(matrix.width - 1))
+    return weights.height * sum(heights) + weights.lines * lines + weights.holes * holes + weights.bumpiness * bumpiness
+
+def drop(matrix: Matrix) -> int:
+    matrix.drop()
+    matrix.moveDown()
+    fullRow = (1 << matrix.width) - 1
+    lines = sum(1 for row in matrix.getRows() if row == fullRow)
+    matrix.checkLine()
+    return lines
+
+def getPlacements(matrix: Matrix, block: Block) -> list[Placement]:
+    placements = []
+    for landing in matrix.getPlacements(block):
+        board = matrix.copy()
+        board.placeAt(Block(block.type, landing.rotation), landing.x, landing.y)
+        board.moveDown()
+        board.checkLine()
+        actions = tuple((MOVE_ACTIONS[name], row) for name, row in landing.moves)
+        placements.append(Placement(actions, board, landing.lines, 0.0))
+    return placements
+
+def getDrops(matrix: Matrix, type: CellType) -> list[Placement]:
+    placements = []
+    rotations = Block(type).rotations
+    seen = set()
+    for rotation in (rotations.left, rotations.top, rotations.right, rotations.bottom):
+        if rotation.rowMasks in seen:
+            continue
+        seen.add(rotation.rowMasks)
+        for x in range(matrix.width - rotation.width + 1):
+            board = matrix.copy()
+            if not board.placeAt(Block(type, rotation), x, 0):
+                continue
+            lines = drop(board)
+            placements.append(Placement((), board, lines, 0.0))
+    return placements
+
+def getLookaheadScore(matrix: Matrix, lines: int, nextType: CellType, weights: Weights) -> float:
+    nextPlacements = getDrops(matrix, nextType)
+    if len(nextPlacements) == 0:
+        return evaluate(matrix, lines, weights)
+    return max(evaluate(placement.matrix, lines + placement.lines, weights) for placement in nextPlacements)
+
+def _lookahead(arguments: tuple[Matrix, int, CellType, Weights]) -> float:
+    return getLookaheadScore(*arguments)
+
+class Bot:
+    def __init__(self, weights: Weights = Weights(), lookahead: bool = False, workers: int = 0):
+        self.weights: Weights = weights
+        self.lookahead: bool = lookahead
+        self.__executor: 'ProcessPoolExecutor' = None
+        if lookahead and workers > 0:
+            # worker processes are only needed for the parallel lookahead, so keep them off the startup path
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self.__executor = ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('spawn'))
+
+    def choose(self, matrix: Matrix, block: Block, nextBlock: Block = None) -> Placement:
+        placements = getPlacements(matrix, block)
+        if len(placements) == 0:
+            return Placement((), matrix, 0, 0.0)
+
+        if self.lookahead and nextBlock != None:
+            arguments = [(placement.matrix, placement.lines, nextBlock.type, self.weights) for placement in placements]
+            if self.__executor != None:
+                scores = list(self.__executor.map(_lookahead, arguments))
+            else:
+                scores = [_lookahead(argument) for argument in arguments]
+        else:
+            scores = [evaluate(placement.matrix, placement.lines, self.weights) for placement in placements]
+
+        best = max(range(len(placements)), key = lambda index: scores[index])
+        return placements[best]._replace(score = scores[best])
+
+    def close(self):
+        if self.__executor != None:
+            self.__executor.shutdown(cancel_futures = True)
+            self.__executor = None
+
+class AutoPlayer:
+    def __init__(self, bot: Bot):
+        self.bot: Bot = bot
+        self.__block: Block = None
+        self.__actions: deque[tuple[Action, int]] = deque()
+
+    def getAction(self, engine: Engine) -> Action:
+        block = engine.matrix.currentBlock
+        if block == None:
+            return None
+        if block is not self.__block:
+            self.__block = block
+            self.__actions = deque(self.bot.choose(engine.matrix, block, engine.nextBlock).actions)
+        if len(self.__actions) == 0:
+            return None
+        action, row = self.__actions[0]
+        if engine.matrix.getBlockPosition().y < row:
+            # a tuck or spin further down, soft drop to its row first
+            return Action.DOWN
+        self.__actions.popleft()
+        return action
+
+    def close(self):
+        self.bot.close()
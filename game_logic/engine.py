@@ -0,0 +1,238 @@
+import struct
+from enum import Enum
+from typing import NamedTuple
+from codesets.blocks import CELL_TYPES, ROTATION_TYPES, Block, Color, getBlockFromValues
+from codesets.cell import getRandomBlock
+from codesets.colors import GAME_PLANE_COLOR
+from game_logic.matirix import Board, Matrix
+from game_logic.rng import GameRandom
+
+CELL_COUNT_WIDTH = 10
+CELL_COUNT_HEIGHT = 22
+# smallest board every block fits on, and the largest one offered for mega board games
+MIN_BOARD_SIZE = 4
+MAX_BOARD_SIZE = 1000
+# snapshot: board size, score, generator state, next block, saved block type and rotation, canSave, done, then the matrix
+SNAPSHOT_HEADER = struct.Struct('<HHQQBBBBB')
+
+SNAPSHOT_MAGIC = b'TSN'
+
+class SnapshotError(Exception):
+    pass
+
+def saveSnapshot(engine: 'Engine', path: str):
+    with open(path, 'wb') as file:
+        file.write(SNAPSHOT_MAGIC + engine.snapshot())
+
+def loadSnapshot(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise SnapshotError('not a snapshot')
+    return data[len(SNAPSHOT_MAGIC):]
+
+class Action(Enum):
+    NONE = 0
+    LEFT = 1
+    RIGHT = 2
+    ROTATE_LEFT = 3
+    ROTATE_RIGHT = 4
+    DOWN = 5
+    SAVE = 6
+    HARD_DROP = 7
+
+class State(NamedTuple):
+    rows: tuple[int, ...]
+    block: int
+    rotation: int
+    x: int
+    y: int
+    nextBlock: int
+    score: int
+
+class Keyframe(NamedTuple):
+    # engine fields packed like a snapshot header, and the board sharing its rows with the live matrix
+    header: bytes
+    board: Board
+
+class Engine:
+    def __init__(self, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT, seed: int = None):
+        if not MIN_BOARD_SIZE <= width <= MAX_BOARD_SIZE or not MIN_BOARD_SIZE <= height <= MAX_BOARD_SIZE:
+            raise ValueError('board must be between ' + str(MIN_BOARD_SIZE) + ' and ' + str(MAX_BOARD_SIZE) + ' cells on each side')
+        self.width: int = width
+        self.height: int = height
+        # optional event sink, kept across resets so restarted games log to the same stream
+        self.telemetry: 'Telemetry' = None
+        self.__actions = {
+            Action.NONE: lambda: 0,
+            Action.LEFT: self.moveLeft,
+            Action.RIGHT: self.moveRight,
+            Action.ROTATE_LEFT: self.rotateLeft,
+            Action.ROTATE_RIGHT: self.rotateRight,
+            Action.DOWN: self.moveDown,
+            Action.SAVE: self.saveBlock,
+            Action.HARD_DROP: self.hardDrop,
+        }
+        self.reset(seed)
+
+    def reset(self, seed: int = None) -> State:
+        self.random: GameRandom = GameRandom(seed)
+        self.matrix: Matrix = Matrix(self.width, self.height, Color(GAME_PLANE_COLOR), self.random)
+        self.nextBlock: Block = getRandomBlock(self.random)
+        self.savedBlock: Block = None
+        self.canSave: bool = True
+        self.score: int = 0
+        self.done: bool = False
+        return self.getState()
+
+    def step(self, action: Action) -> tuple[State, int, bool]:
+        if self.done:
+            return self.getState(), 0, True
+        reward = self.apply(action)
+        reward += self.tick()
+        return self.getState(), reward, self.done
+
+    def apply(self, action: Action) -> int:
+        if self.done:
+            return 0
+        return self.__actions[action]() or 0
+
+    def tick(self, spawn: bool = True) -> int:
+        if self.done:
+            return 0
+        if self.matrix.hasBlock():
+            return self.moveDown(spawn)
+        if spawn:
+            self.placeBlock()
+        return 0
+
+    def getState(self) -> State:
+        block = self.matrix.currentBlock
+        if block == None:
+            return State(self.matrix.getRows(), 0, 0, 0, 0, self.nextBlock.type.value, self.score)
+        position = self.matrix.getBlockPosition()
+        return State(self.matrix.getRows(), block.type.value, block.getRotation().type.value, position.x, position.y, self.nextBlock.type.value, self.score)
+
+    def getSnapshotSize(self) -> int:
+        return SNAPSHOT_HEADER.size + self.matrix.getSnapshotSize()
+
+    def snapshot(self) -> bytes:
+        return self.__packHeader() + self.matrix.snapshot()
+
+    def restore(self, data: bytes):
+        if len(data) != self.getSnapshotSize():
+            raise SnapshotError('snapshot has ' + str(len(data)) + ' bytes, expected ' + str(self.getSnapshotSize()))
+        # both halves are checked before either is assigned, so a damaged snapshot leaves the engine as it was
+        header = self.__unpackHeader(data)
+        try:
+            self.matrix.restore(memoryview(data)[SNAPSHOT_HEADER.size:])
+        except ValueError as error:
+            raise SnapshotError(str(error))
+        self.__setHeader(*header)
+
+    def getKeyframe(self) -> Keyframe:
+        return Keyframe(self.__packHeader(), self.matrix.getBoard())
+
+    def restoreKeyframe(self, keyframe: Keyframe):
+        self.__setHeader(*self.__unpackHeader(keyframe.header))
+        self.matrix.setBoard(keyframe.board)
+
+    def __packHeader(self) -> bytes:
+        saved = self.savedBlock
+        savedType = saved.type.value if saved != None else 0
+        savedRotation = saved.getRotation().type.value if saved != None else 0
+        return SNAPSHOT_HEADER.pack(self.width, self.height, self.score, self.random.state, self.nextBlock.type.value, savedType, savedRotation, self.canSave, self.done)
+
+    def __unpackHeader(self, data: bytes) -> tuple[int, int, Block, Block, bool, bool]:
+        width, height, score, state, nextType, savedType, savedRotation, canSave, done = SNAPSHOT_HEADER.unpack_from(data)
+        if width != self.width or height != self.height:
+            raise SnapshotError('snapshot is for a ' + str(width) + 'x' + str(height) + ' board')
+        if nextType not in CELL_TYPES or savedType != 0 and (savedType not in CELL_TYPES or savedRotation != 0 and savedRotation not in ROTATION_TYPES):
+            raise SnapshotError('snapshot has an unknown next or saved block')
+        savedBlock = getBlockFromValues(savedType, savedRotation) if savedType != 0 else None
+        return score, state, getBlockFromValues(nextType), savedBlock, canSave != 0, done != 0
+
+    def __setHeader(self, score: int, state: int, nextBlock: Block, savedBlock: Block, canSave: bool, done: bool):
+        self.random.state = state
+        self.nextBlock = nextBlock
+        self.savedBlock = savedBlock
+        self.canSave = canSave
+        self.done = done
+        self.score = score
+
+    #region Blocks
+    def placeBlock(self):
+        self.canSave = True
+        block = self.nextBlock
+        placed = self.matrix.place(block)
+        self.nextBlock = getRandomBlock(self.random)
+        if self.telemetry != None:
+            self.telemetry.emit('spawn', block = block.type.name, next = self.nextBlock.type.name)
+        if not placed:
+            self.__endGame()
+
+    def moveLeft(self):
+        self.matrix.moveLeft()
+
+    def moveRight(self):
+        self.matrix.moveRight()
+
+    def rotateLeft(self):
+        self.matrix.rotateLeft()
+
+    def rotateRight(self):
+        self.matrix.rotateRight()
+
+    def moveDown(self, spawn: bool = False) -> int:
+        block = self.matrix.currentBlock
+        if block == None or self.matrix.moveDown():
+            return 0
+
+        points = self.matrix.checkLine()
+        self.score += points
+        if self.telemetry != None:
+            self.__emitLock(block, points)
+        if spawn:
+            self.placeBlock()
+        return points
+
+    def hardDrop(self) -> int:
+        if not self.matrix.hasBlock():
+            return 0
+        self.matrix.drop()
+        return self.moveDown(True)
+
+    def saveBlock(self):
+        if not self.canSave:
+            return
+        current = self.matrix.currentBlock
+        if self.savedBlock != None:
+            placed = self.matrix.place(self.savedBlock)
+            if self.telemetry != None:
+                self.__emitHold(current, self.savedBlock)
+            self.savedBlock = current
+            self.canSave = False
+            if not placed:
+                self.__endGame()
+            return
+
+        if self.telemetry != None:
+            self.__emitHold(current, None)
+        self.savedBlock = current
+        self.placeBlock()
+        self.canSave = False
+
+    def __endGame(self):
+        self.done = True
+        if self.telemetry != None:
+            self.telemetry.emit('gameOver', score = self.score)
+
+    def __emitHold(self, block: Block, swapped: Block):
+        self.telemetry.emit('hold', block = block.type.name if block != None else None, swapped = swapped.type.name if swapped != None else None)
+
+    def __emitLock(self, block: Block, points: int):
+        position = self.matrix.getBlockPosition()
+        self.telemetry.emit('lock', block = block.type.name, rotation = block.getRotation().type.value, x = position.x, y = position.y)
+        if points > 0:
+            self.telemetry.emit('lines', lines = self.matrix.lastLines, points = points, score = self.score)
+    #endregion
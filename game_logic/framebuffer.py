@@ -0,0 +1,212 @@
+import json
+import os
+import queue
+import threading
+from typing import NamedTuple
+import numpy as np
+from codesets.blocks import COLORS, Color
+from codesets.colors import GHOST_BLEND
+from game_logic.engine import Engine
+from game_logic.layout import MIN_CELL_SIZE
+from game_logic.matirix import EMPTY_CELL
+from game_logic.replay import Replay, ReplayPlayer, load
+from game_logic.scheduler import TICK_RATE, toTicks
+
+# frames use the smallest cell size the game window shows
+DEFAULT_CELL_SIZE = MIN_CELL_SIZE
+# frame buffers shared by the renderer and the writer thread, rendering waits when all of them are queued
+QUEUE_FRAMES = 8
+# the ghost of CellType value v is palette entry v + GHOST_OFFSET
+GHOST_OFFSET = max(type.value for type in COLORS) + 1
+# a highlight clip keeps running this long after its line clear
+HIGHLIGHT_TAIL_SECONDS = 1.0
+RAW_SUFFIX = '.rgb'
+THUMBNAIL_SUFFIX = '.png'
+FORMATS = ('raw', 'png')
+
+class ExportResult(NamedTuple):
+    path: str
+    frames: int
+    score: int
+
+def _buildPalette(planeColor: Color) -> np.ndarray:
+    palette = np.zeros((2 * GHOST_OFFSET, 3), dtype = np.uint8)
+    plane = planeColor.getPyGameColor()
+    palette[EMPTY_CELL] = plane
+    palette[EMPTY_CELL + GHOST_OFFSET] = plane
+    for type, color in COLORS.items():
+        palette[type.value] = color.getPyGameColor()
+        palette[type.value + GHOST_OFFSET] = tuple(round(block * GHOST_BLEND + background * (1 - GHOST_BLEND)) for block, background in zip(color.getPyGameColor(), plane))
+    return palette
+
+def savePng(frame: np.ndarray, path: str):
+    import pygame
+    # surfarray is indexed [x, y], frames are [y, x]
+    pygame.image.save(pygame.surfarray.make_surface(frame.swapaxes(0, 1)), path)
+
+class FrameRenderer:
+    def __init__(self, engine: Engine, cellSize: int = DEFAULT_CELL_SIZE):
+        self.cellSize: int = cellSize
+        # frames are RGB rows of pixels, the whole board at cellSize pixels per cell
+        self.shape: tuple[int, int, int] = (engine.height * cellSize, engine.width * cellSize, 3)
+        self.__engine: Engine = engine
+        self.__palette: np.ndarray = _buildPalette(engine.matrix.getDefaultColor())
+        self.__cells: np.ndarray = np.zeros((engine.height, engine.width), dtype = np.uint8)
+
+    def render(self, frame: np.ndarray = None) -> np.ndarray:
+        matrix = self.__engine.matrix
+        cells = self.__cells
+        cells[:] = np.frombuffer(matrix.getCellTypes(), dtype = np.uint8).reshape(cells.shape)
+        block = matrix.currentBlock
+        if block != None:
+            rotation = block.getRotation()
+            position = matrix.getBlockPosition()
+            for cell in matrix.getBlockPositions(rotation, position.x, matrix.getLandingRow()):
+                if cells[cell.y, cell.x] == EMPTY_CELL:
+                    cells[cell.y, cell.x] = block.type.value + GHOST_OFFSET
+            for cell in matrix.getBlockPositions(rotation, position.x, position.y):
+                cells[cell.y, cell.x] = block.type.value
+
+        if frame is None:
+            frame = np.empty(self.shape, dtype = np.uint8)
+        # one palette lookup for the board, widened to a pixel row per board row, then copied down cellSize times
+        rows = self.__palette[cells].repeat(self.cellSize, 1)
+        frame.reshape(cells.shape[0], self.cellSize, self.shape[1], 3)[:] = rows[:, None]
+        return frame
+
+    def renderSurface(self, surface: 'pygame.Surface'):
+        import pygame
+        pygame.surfarray.blit_array(surface, self.render().swapaxes(0, 1))
+
+class RawVideoWriter:
+    # rgb24 frames back to back in a memory-mapped file, described by a JSON file next to it
+    def __init__(self, path: str, frames: int, shape: tuple[int, int, int], fps: float):
+        self.path: str = path
+        self.__video: np.memmap = np.memmap(path, dtype = np.uint8, mode = 'w+', shape = (frames,) + shape)
+        with open(path + '.json', 'w') as file:
+            json.dump({'width': shape[1], 'height': shape[0], 'frames': frames, 'fps': fps, 'pixelFormat': 'rgb24'}, file)
+
+    def write(self, index: int, frame: np.ndarray):
+        self.__video[index] = frame
+
+    def close(self):
+        self.__video.flush()
+        del self.__video
+
+class PngWriter:
+    def __init__(self, directory: str):
+        self.path: str = directory
+        os.makedirs(directory, exist_ok = True)
+
+    def write(self, index: int, frame: np.ndarray):
+        savePng(frame, os.path.join(self.path, 'frame%06d.png' % index))
+
+    def close(self):
+        pass
+
+class FramePipeline:
+    # frames are rendered on the calling thread and written out by a worker, buffers go back and forth between them
+    def __init__(self, writer: RawVideoWriter | PngWriter, shape: tuple[int, int, int], depth: int = QUEUE_FRAMES):
+        self.__writer: RawVideoWriter | PngWriter = writer
+        self.__free: queue.Queue[np.ndarray] = queue.Queue()
+        for _ in range(depth):
+            self.__free.put(np.empty(shape, dtype = np.uint8))
+        self.__frames: queue.Queue[tuple[int, np.ndarray]] = queue.Queue()
+        self.__error: Exception = None
+        self.__thread: threading.Thread = threading.Thread(target = self.__run, name = 'frame-writer', daemon = True)
+        self.__thread.start()
+
+    def acquire(self) -> np.ndarray:
+        frame = self.__free.get()
+        if self.__error != None:
+            raise self.__error
+        return frame
+
+    def submit(self, index: int, frame: np.ndarray):
+        self.__frames.put((index, frame))
+
+    def close(self):
+        self.__frames.put(None)
+        self.__thread.join()
+        self.__writer.close()
+        if self.__error != None:
+            raise self.__error
+
+    def __run(self):
+        while True:
+            item = self.__frames.get()
+            if item == None:
+                return
+            index, frame = item
+            if self.__error == None:
+                try:
+                    self.__writer.write(index, frame)
+                except Exception as error:
+                    # handed to the renderer on its next acquire
+                    self.__error = error
+            self.__free.put(frame)
+
+def findHighlight(replay: Replay, seconds: float) -> tuple[int, int]:
+    # ticks of the clip around the biggest line clear, the end of the game when nothing was cleared
+    player = ReplayPlayer(replay)
+    engine = player.session.engine
+    best = 0
+    bestTick = replay.ticks
+    while True:
+        score = engine.score
+        if not player.update():
+            break
+        if engine.score - score >= max(best, 1):
+            best = engine.score - score
+            bestTick = player.session.ticks
+    end = min(replay.ticks, bestTick + toTicks(HIGHLIGHT_TAIL_SECONDS))
+    return max(0, end - toTicks(seconds)), end
+
+def exportReplay(replay: Replay, path: str, format: str = 'raw', fps: int = TICK_RATE, cellSize: int = DEFAULT_CELL_SIZE, highlight: float = None, thumbnail: bool = False) -> ExportResult:
+    if format not in FORMATS:
+        raise ValueError('unknown format ' + format)
+    # a frame every step ticks, other rates would be written with timestamps the frames do not have
+    if fps < 1 or fps > TICK_RATE or TICK_RATE % fps != 0:
+        raise ValueError('fps must divide the tick rate of ' + str(TICK_RATE))
+    step = TICK_RATE // fps
+    start, end = (0, replay.ticks) if highlight == None else findHighlight(replay, highlight)
+    player = ReplayPlayer(replay)
+    renderer = FrameRenderer(player.session.engine, cellSize)
+    frames = (end - start) // step + 1
+    if format == 'raw':
+        writer = RawVideoWriter(path + RAW_SUFFIX, frames, renderer.shape, TICK_RATE / step)
+    else:
+        writer = PngWriter(path)
+
+    pipeline = FramePipeline(writer, renderer.shape)
+    index = 0
+    try:
+        while True:
+            ticks = player.session.ticks
+            if ticks >= start and (ticks - start) % step == 0:
+                frame = pipeline.acquire()
+                renderer.render(frame)
+                pipeline.submit(index, frame)
+                index += 1
+            if ticks >= end or not player.update():
+                break
+    finally:
+        pipeline.close()
+    if thumbnail:
+        savePng(renderer.render(), path + THUMBNAIL_SUFFIX)
+    return ExportResult(writer.path, index, player.session.engine.score)
+
+def exportFile(path: str, directory: str, **options) -> ExportResult:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return exportReplay(load(path), os.path.join(directory, name), **options)
+
+def exportFiles(paths: list[str], directory: str, workers: int = 0, **options) -> list[ExportResult]:
+    # one game per process; rendering and writing of a single game already overlap inside exportReplay
+    os.makedirs(directory, exist_ok = True)
+    if workers <= 1:
+        return [exportFile(path, directory, **options) for path in paths]
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(exportFile, path, directory, **options) for path in paths]
+        return [future.result() for future in futures]
@@ -1,119 +1,279 @@
-from typing import Sequence
+import time
 import pygame
 from pygame.locals import *
 from pygame.event import Event
-from codesets.colors import SCORE_BLOCK_COLOR
+from codesets.colors import BACKGROUND_COLOR, SCORE_BLOCK_COLOR
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Action, SnapshotError, loadSnapshot, saveSnapshot
+from game_logic.history import History
+from game_logic.layout import SCORE_PADDING
+from game_logic.matirix import Matrix
 from game_logic.plane import Plane
+from game_logic.profiler import FrameProfiler
+from game_logic.replay import Replay, ReplayPlayer, fromSession
+from game_logic.scheduler import TICK_RATE, Scheduler
+from game_logic.session import Session
+from game_logic.text import TextRenderer
 
 START_WIDTH = 330
 START_HEIGHT = 600
 TOP_MARGIN = 100
 BOTTOM_MARGIN = 10
-START_TICK_DOWN = 1.0
-DOWN_PRESSED_TICK_DOWN = 0.05
-MAX_CLICK_EVENT_TIME = 0.5
+PROFILE_REFRESH_FRAMES = 30
+PROFILE_CAPTURE_SECONDS = 10.0
+PROFILE_TEXT_COLOR = (255, 255, 255)
+PROFILE_BACKGROUND_COLOR = (0, 0, 0)
+SNAPSHOT_FILE = 'tetris.snapshot'
+FRAME_STATS_SECONDS = 1.0
 
 def WIDOW_HEIGHT():
     return START_HEIGHT + TOP_MARGIN + BOTTOM_MARGIN
 
 class Game:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, autoPlayer = None, seed: int = None, replay: Replay = None, profiler: FrameProfiler = None, capturePath: str = None, captureSeconds: float = PROFILE_CAPTURE_SECONDS, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT, telemetry: 'Telemetry' = None, gcPolicy: 'GcPolicy' = None):
+        # only the subsystems the game uses, fonts start with the first rendered text
+        pygame.display.init()
         self.__surface : pygame.Surface = pygame.display.set_mode((START_WIDTH, WIDOW_HEIGHT()), RESIZABLE)
-        self.__plane: Plane = Plane(self.__surface, START_WIDTH, WIDOW_HEIGHT(), TOP_MARGIN, BOTTOM_MARGIN)
+        self.__replayPlayer: ReplayPlayer = None
+        if replay != None:
+            self.__replayPlayer = ReplayPlayer(replay)
+            self.__session: Session = self.__replayPlayer.session
+        else:
+            self.__session: Session = Session(seed, autoPlayer, width = width, height = height)
+        self.__history: History = History(self.__session)
+        # ticking stops while looking back through the history, until play continues from there
+        self.__rewinding: bool = False
+        self.__plane: Plane = Plane(self.__surface, START_WIDTH, WIDOW_HEIGHT(), TOP_MARGIN, BOTTOM_MARGIN, self.__session.engine)
         self.__runnung: bool = False
-        self.__tickDown: float = START_TICK_DOWN
-        self.__timeLastEvent: float = 0.0
-        self.__lastClick: float = 0
-        self.__downPressed = False
+        self.snapshotPath: str = SNAPSHOT_FILE
+        self.__scheduler: Scheduler = Scheduler()
+        self.__renderedPoints: int = None
+        self.__scoreText: TextRenderer = TextRenderer('arial', 20, bold = True)
+        self.profiler: FrameProfiler = None
+        self.gcPolicy: 'GcPolicy' = gcPolicy
+        self.__capturePath: str = capturePath
+        self.__captureSeconds: float = captureSeconds
+        self.__showProfile: bool = False
+        self.__profileSurface: pygame.Surface = None
+        self.__profileText: TextRenderer = None
+        if profiler != None or capturePath != None:
+            self.__startProfiler(profiler or FrameProfiler())
+        if capturePath != None:
+            self.profiler.startCapture(capturePath, captureSeconds)
+        self.telemetry: 'Telemetry' = telemetry
+        self.__session.engine.telemetry = telemetry
+        self.__statsStart: float = 0.0
+        self.__lastFrame: float = 0.0
+        self.__statsFrames: int = 0
+        self.__longestFrame: float = 0.0
 
-        self.points = 0
+    @property
+    def points(self) -> int:
+        return self.__session.engine.score
+
+    def getReplay(self) -> Replay:
+        return fromSession(self.__session)
 
     def run(self):
         self.__runnung: bool = True
 
-        getTicksLastFrame: int = 0
+        if self.gcPolicy != None:
+            self.gcPolicy.start()
+        if self.profiler != None and self.profiler.allocations != None:
+            self.profiler.allocations.start()
+        self.__scheduler.start()
+        self.__statsStart = self.__lastFrame = time.perf_counter()
         while self.__runnung:
-            ticks: int = pygame.time.get_ticks()
-            deltaTime: float = (ticks - getTicksLastFrame) / 1000.0
-            getTicksLastFrame = ticks
-            self.__timeLastEvent += deltaTime
-            self.__lastClick += deltaTime
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            self.__mark('pump')
+            for event in events:
                 self.__stop(event)
                 self.__resize(event)
                 self.__keypress(event)
-            
-            self.__update(deltaTime)
-            self.__checkEvent()
-            # self.__keyPressed(pygame.key.get_pressed())
+                self.__profileKeys(event)
+                self.__snapshotKeys(event)
+                self.__historyKeys(event)
+            self.__mark('input')
 
-    def __getTickDown(self):
-        return DOWN_PRESSED_TICK_DOWN if self.__downPressed else self.__tickDown
+            for _ in range(self.__scheduler.advance()):
+                if not self.__rewinding:
+                    self.__tick()
+            self.__mark('tick')
+            if self.__scheduler.frameDue():
+                self.__update()
+            if self.gcPolicy != None:
+                self.gcPolicy.collect(self.__scheduler.getIdleTime())
+                self.__mark('gc')
+            self.__scheduler.idle()
+            self.__mark('idle')
 
-    def __checkEvent(self):
-        if self.__timeLastEvent < self.__getTickDown() or self.__lastClick < MAX_CLICK_EVENT_TIME:
-            return
-        self.__timeLastEvent = 0
-        self.__onEvent()
-    
-    def __onEvent(self):
-        self.__timeLastEvent = 0
-        if self.__plane.hasBlock():
-            self.__moveDown()
-            return
+        if self.profiler != None:
+            self.profiler.close()
+        if self.gcPolicy != None:
+            self.gcPolicy.stop()
 
-        if self.__downPressed:
+    def __tick(self):
+        if self.__replayPlayer != None:
+            if self.__replayPlayer.update():
+                self.__history.update()
             return
-        self.__plane.placeBlock()
-    
-    def __moveDown(self):
-        if not self.__plane.moveDown():
-            self.points += self.__plane.checkLine()
-            self.__onEvent()
+        if self.__session.autoPlayer != None and self.__session.engine.done:
+            self.__session.restart()
+            self.__history.reset()
+        self.__session.update()
+        self.__history.update()
 
     def __stop(self, event: Event):
         if (event.type == KEYDOWN and event.key == K_ESCAPE) or event.type == QUIT:
             self.__runnung = False
 
     def __keypress(self, event: Event):
+        if self.__replayPlayer != None or self.__rewinding:
+            return
         if event.type == KEYDOWN:
             if event.key == K_LSHIFT:
-                self.__plane.rotateLeft()
+                self.__session.press(Action.ROTATE_LEFT)
             if event.key == K_LEFT:
-                self.__lastClick = 0
-                self.__plane.moveLeft()
+                self.__session.press(Action.LEFT)
             if event.key == K_RIGHT:
-                self.__lastClick = 0
-                self.__plane.moveRight()
+                self.__session.press(Action.RIGHT)
             if event.key == K_DOWN:
-                self.__downPressed = True
-                self.__moveDown()
+                self.__session.press(Action.DOWN)
             if event.key == K_UP:
-                self.__plane.saveBlock()
+                self.__session.press(Action.SAVE)
+            if event.key == K_SPACE:
+                self.__session.press(Action.HARD_DROP)
         if event.type == KEYUP:
             if event.key == K_DOWN:
-                self.__downPressed = False
+                self.__session.release(Action.DOWN)
     
-    def __update(self, deltaTime: float):
-        self.__surface.fill((255, 255, 255))
-        self.__plane.render()
-        self.__renderScore()
-        pygame.display.flip()
+    def __update(self):
+        repaint = self.__plane.needsRepaint()
+        if repaint:
+            self.__surface.fill(BACKGROUND_COLOR)
+        rects = self.__plane.render()
+        if repaint or self.__renderedPoints != self.points:
+            rects.append(self.__renderScore())
+        self.__mark('score')
+        if self.__showProfile:
+            rects.append(self.__renderProfile())
+
+        if repaint:
+            pygame.display.flip()
+        elif len(rects) > 0:
+            pygame.display.update(rects)
+        self.__mark('flip')
+        if self.profiler != None:
+            self.profiler.endFrame()
+        if self.telemetry != None:
+            self.__countFrame()
+
+    def __snapshotKeys(self, event: Event):
+        if event.type != KEYDOWN or self.__replayPlayer != None:
+            return
+        if event.key == K_F5:
+            saveSnapshot(self.__session.engine, self.snapshotPath)
+        if event.key == K_F9:
+            try:
+                self.__session.restore(loadSnapshot(self.snapshotPath))
+            except (OSError, SnapshotError) as error:
+                # the game goes on as it was, the reason only reaches the log
+                if self.telemetry != None:
+                    self.telemetry.emit('snapshotFailed', path = self.snapshotPath, error = str(error))
+                return
+            self.__rewinding = False
+            self.__history.reset()
+            self.__plane.reRenderPlane(*self.__surface.get_size())
+
+    #region History
+    def __historyKeys(self, event: Event):
+        # page up and down step through the pieces, home and end through the seconds, return plays on from there
+        if event.type != KEYDOWN:
+            return
+        if event.key == K_PAGEUP:
+            self.__seek(lambda: self.__history.stepPiece(-1))
+        if event.key == K_PAGEDOWN:
+            self.__seek(lambda: self.__history.stepPiece(1))
+        if event.key == K_HOME:
+            self.__seek(lambda: self.__history.seek(self.__session.ticks - TICK_RATE))
+        if event.key == K_END:
+            self.__seek(lambda: self.__history.seek(self.__session.ticks + TICK_RATE))
+        if event.key == K_RETURN and self.__rewinding:
+            self.__rewinding = False
+            self.__history.branch()
+            if self.__replayPlayer != None:
+                self.__replayPlayer.resync()
+            # no catching up on the ticks spent rewinding
+            self.__scheduler.start()
+
+    def __seek(self, seek):
+        self.__rewinding = True
+        seek()
+        self.__plane.reRenderPlane(*self.__surface.get_size())
+    #endregion
+
+    #region Profiling
+    def __startProfiler(self, profiler: FrameProfiler):
+        self.profiler = profiler
+        self.profiler.gcPolicy = self.gcPolicy
+        self.profiler.instrument(Matrix)
+        self.__plane.profiler = profiler
+
+    def __mark(self, phase: str):
+        if self.profiler != None:
+            self.profiler.mark(phase)
+
+    def __profileKeys(self, event: Event):
+        if event.type != KEYDOWN:
+            return
+        if event.key == K_F3:
+            if self.profiler == None:
+                self.__startProfiler(FrameProfiler())
+            self.__showProfile = not self.__showProfile
+            self.__profileSurface = None
+            # the overlay covers part of the plane, so hiding it needs a full redraw
+            self.__plane.reRenderPlane(*self.__surface.get_size())
+        if event.key == K_F4 and self.__capturePath != None and not self.profiler.isCapturing():
+            self.profiler.startCapture(self.__capturePath, self.__captureSeconds)
+
+    def __renderProfile(self) -> pygame.Rect:
+        if self.__profileSurface == None or self.profiler.frames % PROFILE_REFRESH_FRAMES == 0:
+            if self.__profileText == None:
+                self.__profileText = TextRenderer('monospace', 12, color = PROFILE_TEXT_COLOR)
+            lines = [self.__profileText.render(line) for line in self.profiler.getLines()]
+            width = max(line.get_width() for line in lines) + 6
+            height = sum(line.get_height() for line in lines) + 6
+            self.__profileSurface = pygame.Surface((width, height))
+            self.__profileSurface.fill(PROFILE_BACKGROUND_COLOR)
+            y = 3
+            for line in lines:
+                self.__profileSurface.blit(line, (3, y))
+                y += line.get_height()
+        return self.__surface.blit(self.__profileSurface, (0, 0))
+    #endregion
+
+    #region Telemetry
+    def __countFrame(self):
+        now = time.perf_counter()
+        self.__statsFrames += 1
+        self.__longestFrame = max(self.__longestFrame, now - self.__lastFrame)
+        self.__lastFrame = now
+        elapsed = now - self.__statsStart
+        if elapsed < FRAME_STATS_SECONDS:
+            return
+        self.telemetry.emit('frames', frames = self.__statsFrames, fps = round(self.__statsFrames / elapsed, 1), longestMs = round(self.__longestFrame * 1000, 2), dropped = self.telemetry.dropped)
+        self.__statsStart = now
+        self.__statsFrames = 0
+        self.__longestFrame = 0.0
+    #endregion
     
-    def __renderScore(self):
-        my_font = pygame.font.SysFont('arial', 20, bold = True)
-        text = str(self.points)
-        text_surface = my_font.render(text, False, (0, 0, 0))
-        text_width, text_height = my_font.size(text)
-        leftPivot = self.__plane.getPlaneLeftPivot()
-        gamePlaneWidth = self.__plane.getGameWidth()
-        pygame.draw.rect(self.__surface, SCORE_BLOCK_COLOR, pygame.Rect(leftPivot.x, 0, gamePlaneWidth, text_height + 6))
-        self.__surface.blit(text_surface, (leftPivot.x + gamePlaneWidth / 2 - text_width / 2, 3))
-
-    def _renderNext(self):
-        next = self.__plane.nextBlock
-        pass
+    def __renderScore(self) -> pygame.Rect:
+        self.__renderedPoints = self.points
+        text_surface = self.__scoreText.render(str(self.points))
+        text_width, text_height = text_surface.get_size()
+        box = self.__plane.getLayout().getScoreBox(text_height)
+        rect = self.__surface.fill(SCORE_BLOCK_COLOR, box)
+        self.__surface.blit(text_surface, (box.x + box.width // 2 - text_width // 2, SCORE_PADDING))
+        return rect
 
     def __resize(self, event: Event):
         if event.type != VIDEORESIZE:
@@ -0,0 +1,114 @@
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+from codesets.blocks import Block
+from game_logic.engine import Keyframe
+from game_logic.session import Session
+
+# a keyframe after this many pieces or ticks, whichever comes first, bounds how far a seek re-simulates
+KEYFRAME_PIECES = 64
+KEYFRAME_TICKS = 4096
+
+class HistoryFrame(NamedTuple):
+    tick: int
+    # pieces seen and session events recorded before tick
+    piece: int
+    event: int
+    engine: Keyframe
+    gravity: tuple[bool, int, int]
+
+# the state at tick t is the one after t session updates, before the inputs recorded for tick t;
+# keyframes share their immutable rows with each other and the recorded inputs are the deltas between them
+class History:
+    def __init__(self, session: Session):
+        self.session: Session = session
+        self.reset()
+
+    def reset(self):
+        # the session started over or was replaced by a snapshot, what came before cannot be reached anymore
+        self.latestTick: int = self.session.ticks
+        self.__keyframes: list[HistoryFrame] = []
+        self.__keyTicks: list[int] = []
+        # tick every piece appeared at
+        self.__pieces: array = array('I')
+        self.__block: Block = self.session.engine.matrix.currentBlock
+        if self.__block != None:
+            self.__pieces.append(self.latestTick)
+        self.__capture()
+
+    @property
+    def pieces(self) -> int:
+        return len(self.__pieces)
+
+    def update(self):
+        # called after every session update
+        session = self.session
+        block = session.engine.matrix.currentBlock
+        if block is not self.__block:
+            self.__block = block
+            if block != None:
+                self.__pieces.append(session.ticks)
+        self.latestTick = session.ticks
+        last = self.__keyframes[-1]
+        if session.ticks - last.tick >= KEYFRAME_TICKS or len(self.__pieces) - last.piece >= KEYFRAME_PIECES:
+            self.__capture()
+
+    def getPiece(self, tick: int = None) -> int:
+        # index of the piece in play at tick, -1 before the first one
+        return bisect_right(self.__pieces, self.session.ticks if tick == None else tick) - 1
+
+    def seek(self, tick: int):
+        tick = max(0, min(tick, self.latestTick))
+        keyframe = self.__keyframes[bisect_right(self.__keyTicks, tick) - 1]
+        session = self.session
+        engine = session.engine
+        engine.restoreKeyframe(keyframe.engine)
+        session.gravity.setState(keyframe.gravity)
+        session.ticks = keyframe.tick
+
+        # replay the recorded inputs up to tick without recording them again, asking the bot or emitting events
+        events = session.events
+        autoPlayer = session.autoPlayer
+        telemetry = engine.telemetry
+        session.events = []
+        session.autoPlayer = None
+        engine.telemetry = None
+        try:
+            index = keyframe.event
+            while session.ticks < tick:
+                while index < len(events) and events[index][0] <= session.ticks:
+                    session.input(events[index][1])
+                    index += 1
+                session.update()
+        finally:
+            session.events = events
+            session.autoPlayer = autoPlayer
+            engine.telemetry = telemetry
+
+    def seekPiece(self, piece: int):
+        if len(self.__pieces) > 0:
+            self.seek(self.__pieces[max(0, min(piece, len(self.__pieces) - 1))])
+
+    def stepPiece(self, steps: int):
+        piece = self.getPiece()
+        if steps < 0 and piece >= 0 and self.session.ticks > self.__pieces[piece]:
+            # the first step back only returns to the start of the piece in play
+            steps += 1
+        self.seekPiece(piece + steps)
+
+    def branch(self):
+        # continue from the state seeked to, everything recorded after it is dropped
+        session = self.session
+        ticks = session.ticks
+        session.events = [event for event in session.events if event[0] < ticks]
+        keep = bisect_right(self.__keyTicks, ticks)
+        del self.__keyframes[keep:]
+        del self.__keyTicks[keep:]
+        del self.__pieces[bisect_right(self.__pieces, ticks):]
+        self.__block = session.engine.matrix.currentBlock
+        self.latestTick = ticks
+
+    def __capture(self):
+        session = self.session
+        self.__keyframes.append(HistoryFrame(session.ticks, len(self.__pieces), len(session.events), session.engine.getKeyframe(), session.gravity.getState()))
+        self.__keyTicks.append(session.ticks)
@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+PREVIEW_CELL_SIZE = 15
+PREVIEW_CELL_COUNT = 4
+PREVIEW_MARGIN = 30
+PREVIEW_TOP = 50
+SCORE_PADDING = 3
+# boards that do not fit at this size are shown through a scrolling viewport
+MIN_CELL_SIZE = 8
+MAX_CACHED_LAYOUTS = 64
+
+class Box(NamedTuple):
+    x: int
+    y: int
+    width: int
+    height: int
+
+class Layout(NamedTuple):
+    cellSize: int
+    board: Box
+    nextBox: Box
+    savedBox: Box
+    center: int
+    # board cells that fit into the viewport
+    columns: int
+    rows: int
+
+    def getCell(self, column: int, row: int) -> Box:
+        return Box(self.board.x + self.cellSize * column, self.board.y + self.cellSize * row, self.cellSize, self.cellSize)
+
+    def getScoreBox(self, textHeight: int) -> Box:
+        return Box(self.board.x, 0, self.board.width, textHeight + 2 * SCORE_PADDING)
+
+@lru_cache(maxsize = MAX_CACHED_LAYOUTS)
+def getLayout(surfaceWidth: int, surfaceHeight: int, columns: int, rows: int, topMargin: int, bottomMargin: int) -> Layout:
+    # the largest whole cell size that fits the board both horizontally and vertically, but not below the minimum
+    maxPlaneHeight = max(0, surfaceHeight - topMargin - bottomMargin)
+    cellSize = max(MIN_CELL_SIZE, min(surfaceWidth // columns, maxPlaneHeight // rows))
+    visibleColumns = min(columns, surfaceWidth // cellSize)
+    visibleRows = min(rows, maxPlaneHeight // cellSize)
+    planeWidth = cellSize * visibleColumns
+    planeHeight = cellSize * visibleRows
+    board = Box((surfaceWidth - planeWidth) // 2, surfaceHeight - bottomMargin - planeHeight, planeWidth, planeHeight)
+
+    center = board.x + planeWidth // 2
+    previewSize = PREVIEW_CELL_COUNT * PREVIEW_CELL_SIZE
+    nextBox = Box(center + PREVIEW_MARGIN, PREVIEW_TOP, previewSize, previewSize)
+    savedBox = Box(center - PREVIEW_MARGIN - previewSize, PREVIEW_TOP, previewSize, previewSize)
+    return Layout(cellSize, board, nextBox, savedBox, center, visibleColumns, visibleRows)
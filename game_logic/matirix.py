@@ -1,56 +1,353 @@
 import random
-from numpy import empty
-from codesets.blocks import Block, Color, Position, PositionType, Rotation
+import struct
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, NamedTuple
+from codesets.blocks import CELL_TYPES, COLORS, ROTATION_TYPES, Block, Color, Position, PositionType, Rotation, Rotations, getBlockFromValues
 from codesets.cell import Cell
-from codesets.helpers import first
-import copy
+from game_logic.rng import GOLDEN_GAMMA, MASK_64, mix64
+
+EMPTY_CELL = 0
+ZOBRIST_SEED = 0x5EED
+MAX_CACHED_PLACEMENTS = 4096
+
+class LazyTable(dict):
+    # filled on first lookup, so a giant board only pays for the cells that are ever used
+    def __init__(self, factory: Callable[[int], object]):
+        super().__init__()
+        self.__factory: Callable[[int], object] = factory
+
+    def __missing__(self, index: int):
+        value = self[index] = self.__factory(index)
+        return value
+
+@lru_cache(maxsize = None)
+def getPositions(width: int, height: int) -> dict[int, Position]:
+    # one shared Position per cell, indexed row-major (y * width + x)
+    return LazyTable(lambda index: Position(index % width, index // width))
+
+# snapshot: active block type and rotation (0 when there is none), origin, one mask per row, then the color plane
+SNAPSHOT_HEADER = '<BBhh'
+
+@lru_cache(maxsize = None)
+def getSnapshotFormat(width: int, height: int) -> struct.Struct:
+    if width <= 16:
+        rowFormat = 'H'
+    elif width <= 32:
+        rowFormat = 'I'
+    elif width <= 64:
+        rowFormat = 'Q'
+    else:
+        rowFormat = str((width + 7) // 8) + 's'
+    return struct.Struct(SNAPSHOT_HEADER + rowFormat * height)
+
+@lru_cache(maxsize = None)
+def getZobristKeys(width: int, height: int) -> dict[int, int]:
+    # derived from the cell index with a fixed seed, so hashes agree between processes, e.g. bot workers
+    return LazyTable(lambda index: mix64((index * GOLDEN_GAMMA + ZOBRIST_SEED) & MASK_64))
+
+class Landing(NamedTuple):
+    rotation: Rotation
+    x: int
+    y: int
+    lines: int
+    # Matrix moves other than moveDown that lead here, each with the row the block has to be on when it is made
+    moves: tuple[tuple[str, int], ...]
+
+class PlacementCache:
+    def __init__(self, capacity: int = MAX_CACHED_PLACEMENTS):
+        self.capacity: int = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__entries: OrderedDict[tuple, tuple[Landing, ...]] = OrderedDict()
+
+    def get(self, key: tuple) -> tuple[Landing, ...]:
+        landings = self.__entries.get(key)
+        if landings == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return landings
+
+    def put(self, key: tuple, landings: tuple[Landing, ...]):
+        self.__entries[key] = landings
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.capacity:
+            self.__entries.popitem(last = False)
+
+    def clear(self):
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+# shared by every matrix, copies of a board hash the same so bots and tools reuse each other's searches
+PLACEMENT_CACHE = PlacementCache()
+
+def _getColumns(columns: int) -> list[int]:
+    found = []
+    while columns:
+        found.append((columns & -columns).bit_length() - 1)
+        columns &= columns - 1
+    return found
+
+def _fillRuns(seeds: int, valid: int) -> int:
+    # grow every seed over the run of valid columns it sits in, doubling the step so wide boards take log(width) rounds
+    up = down = seeds & valid
+    upRuns = downRuns = valid
+    shift = 1
+    while upRuns or downRuns:
+        up |= upRuns & (up << shift)
+        down |= downRuns & (down >> shift)
+        upRuns &= upRuns << shift
+        downRuns &= downRuns >> shift
+        shift <<= 1
+    return up | down
+
+_PALETTE: dict[int, Color] = {type.value: color for type, color in COLORS.items()}
+# bytes a color plane may hold, anything else left by translate came from a damaged snapshot
+_CELL_BYTES: bytes = bytes([EMPTY_CELL, *_PALETTE])
+
+class Board(NamedTuple):
+    # the matrix's own immutable row objects, so boards taken one after another share every unchanged row
+    rows: tuple[int, ...]
+    colors: tuple[bytes, ...]
+    block: int
+    rotation: int
+    x: int
+    y: int
 
 class Matrix:
-    def __init__(self, width: int, height: int, defaultColor: Color):
+    def __init__(self, width: int, height: int, defaultColor: Color, generator: random.Random = random):
         self.width: int = width
         self.height: int = height
-        self.__matrix: list[list[Cell]] = [[Cell(defaultColor, Position(x, y)) for x in range(width)] for y in range(height)]
         self.currentBlock: Block = None
-        self.__currentBlockPositions: list[Position] = []
+        # rows removed by the last checkLine that cleared anything
+        self.lastLines: int = 0
         self.__defaultColor: Color = defaultColor
-    
-    def place(self, block: Block):
+        self.__fullRow: int = (1 << width) - 1
+        # locked cells only, one bitmask per row (bit x is column x)
+        self.__rows: list[int] = [0] * height
+        # CellType value of every locked cell, one immutable row per board row; empty rows all share one object
+        self.__emptyRow: bytes = bytes(width)
+        self.__colors: list[bytes] = [self.__emptyRow] * height
+        self.__palette: dict[int, Color] = {}
+        self.__positions: dict[int, Position] = getPositions(width, height)
+        # rows blocks locked into since the last checkLine (bit y is row y), only these can have become full
+        self.__touchedRows: int = 0
+        # row of the highest locked cell in every column, height when the column is empty; None until asked for after the rows were replaced
+        self.__columnHeights: list[int] = [height] * width
+        # Zobrist hash of the locked cells, None until asked for and after line clears
+        self.__hash: int = None
+        self.__x: int = 0
+        self.__y: int = 0
+        self.__generator: random.Random = generator
+        # cells locked since the last popDirtyCells, one column mask per row
+        self.__dirtyRows: dict[int, int] = {}
+        # (rotation, x, y) of the active block at the last popDirtyCells, which is where it is on screen
+        self.__drawnBlock: tuple[Rotation, int, int] = None
+        self.__repaint: bool = True
+
+    def place(self, block: Block) -> bool:
         self.currentBlock = block
-        
-        rotation = self.currentBlock.getRotation()
+
+        rotation = self.currentBlock.getRotation(self.__generator)
         maxWidthPos = rotation.getMaxWidthPos()
-        xPosition = random.randint(0, self.width - 1 - maxWidthPos)
-        self.__setBlock(Position(xPosition, 0))
+        self.__x = self.__generator.randint(0, self.width - 1 - maxWidthPos)
+        self.__y = 0
+        return self.__checkPosition(rotation, self.__x, self.__y)
+
+    def placeAt(self, block: Block, x: int, y: int) -> bool:
+        self.currentBlock = block
+        self.__x = x
+        self.__y = y
+        return self.__checkPosition(block.getRotation(self.__generator), x, y)
+
+    def copy(self) -> 'Matrix':
+        matrix = Matrix(self.width, self.height, self.__defaultColor, self.__generator)
+        matrix.__rows = list(self.__rows)
+        matrix.__colors = list(self.__colors)
+        matrix.__palette = dict(self.__palette)
+        matrix.__touchedRows = self.__touchedRows
+        matrix.__columnHeights = list(self.__getColumnHeights())
+        matrix.__hash = self.__hash
+        return matrix
+
+    def __getstate__(self) -> dict:
+        # copies sent to bot workers leave the shared position table behind, the worker looks up its own
+        state = dict(self.__dict__)
+        del state['_Matrix__positions']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.__positions = getPositions(self.width, self.height)
+
+    def getSnapshotSize(self) -> int:
+        return getSnapshotFormat(self.width, self.height).size + self.width * self.height
+
+    def snapshot(self) -> bytes:
+        snapshotFormat = getSnapshotFormat(self.width, self.height)
+        rows = self.__rows
+        if self.width > 64:
+            rows = [row.to_bytes((self.width + 7) // 8, 'little') for row in rows]
+        block = self.currentBlock
+        if block == None:
+            return snapshotFormat.pack(0, 0, 0, 0, *rows) + b''.join(self.__colors)
+        return snapshotFormat.pack(block.type.value, block.getRotation().type.value, self.__x, self.__y, *rows) + b''.join(self.__colors)
+
+    def restore(self, data: bytes):
+        # everything is checked before anything is assigned, a damaged snapshot raises ValueError and leaves the matrix as it was
+        snapshotFormat = getSnapshotFormat(self.width, self.height)
+        type, rotation, x, y, *rows = snapshotFormat.unpack_from(data)
+        if self.width > 64:
+            rows = [int.from_bytes(row, 'little') for row in rows]
+        width = self.width
+        if max(rows) > self.__fullRow:
+            raise ValueError('snapshot has cells right of the board')
+        block = None
+        if type != 0:
+            if type not in CELL_TYPES or rotation not in ROTATION_TYPES:
+                raise ValueError('snapshot has an unknown active block')
+            block = getBlockFromValues(type, rotation)
+            shape = block.getRotation()
+            if x < 0 or x + shape.width > width or y < 0 or y + shape.height > self.height:
+                raise ValueError('snapshot has the active block outside the board')
+        start = snapshotFormat.size
+        plane = bytes(data[start:start + width * self.height])
+        if len(plane.translate(None, _CELL_BYTES)) != 0:
+            raise ValueError('snapshot has unknown cell types')
+
+        # rows without locked cells share the empty row, only occupied ones are copied out of the color plane
+        emptyRow = self.__emptyRow
+        self.__rows = rows
+        self.__colors = [plane[y * width:(y + 1) * width] if row else emptyRow for y, row in enumerate(rows)]
+        self.__resetBoard(block, x, y)
+
+    def getBoard(self) -> Board:
+        block = self.currentBlock
+        if block == None:
+            return Board(tuple(self.__rows), tuple(self.__colors), 0, 0, 0, 0)
+        return Board(tuple(self.__rows), tuple(self.__colors), block.type.value, block.getRotation().type.value, self.__x, self.__y)
+
+    def setBoard(self, board: Board):
+        self.__rows = list(board.rows)
+        self.__colors = list(board.colors)
+        self.__resetBoard(getBlockFromValues(board.block, board.rotation) if board.block != 0 else None, board.x, board.y)
 
     def get(self, pos: Position) -> Cell:
-        # render pivot
-        # if self.__getCurrentPosition().equals(pos):
-        #     return Cell(Color(0,0,0), pos)
-        
-        return self.__matrix[pos.y][pos.x]
-    
+        color = self.getColor(pos)
+        return Cell(color, pos, PositionType.EMPTY if color is self.__defaultColor else PositionType.BLOCK)
+
+    def getColor(self, pos: Position) -> Color:
+        if self.__isCurrentBlock(pos.x, pos.y):
+            return self.currentBlock.color
+        return self.getLockedColor(pos)
+
+    def getLockedColor(self, pos: Position) -> Color:
+        colorIndex = self.__colors[pos.y][pos.x]
+        if colorIndex == EMPTY_CELL:
+            return self.__defaultColor
+        return self.__palette[colorIndex]
+
+    def getCellTypes(self) -> bytes:
+        # CellType value of every locked cell row by row, EMPTY_CELL where nothing is locked
+        return b''.join(self.__colors)
+
+    def getPosition(self, x: int, y: int) -> Position:
+        return self.__positions[y * self.width + x]
+
+    def getLockedPositions(self, left: int, top: int, right: int, bottom: int) -> list[Position]:
+        # locked cells in columns left..right-1 and rows top..bottom-1, rows above the highest column are skipped
+        filled = []
+        mask = ((1 << (right - left)) - 1) << left
+        for y in range(max(top, min(self.__getColumnHeights())), bottom):
+            row = self.__rows[y] & mask
+            start = y * self.width
+            while row:
+                filled.append(self.__positions[start + (row & -row).bit_length() - 1])
+                row &= row - 1
+        return filled
+
+    def getDefaultColor(self) -> Color:
+        return self.__defaultColor
+
     def moveLeft(self):
-        self.__move(Position(-1, 0))
-    
+        self.__move(-1, 0)
+
     def moveRight(self):
-        self.__move(Position(1, 0))
+        self.__move(1, 0)
 
     def moveDown(self):
-        if self.__move(Position(0, 1)):
+        if self.__move(0, 1):
             return True
-        self.__unsetBlock()
+        self.__lockBlock()
         return False
-    
+
+    def drop(self) -> int:
+        if self.currentBlock == None:
+            return 0
+        landingRow = self.getLandingRow()
+        distance = landingRow - self.__y
+        if distance > 0:
+            self.__y = landingRow
+        return distance
+
+    def getLandingRow(self) -> int:
+        rotation = self.currentBlock.getRotation()
+        heights = self.__getColumnHeights()
+        landingRow = self.height - rotation.height
+        for column, bottom in enumerate(rotation.bottomProfile):
+            columnHeight = heights[self.__x + column]
+            if self.__y + bottom >= columnHeight:
+                # the block is under an overhang, the column height says nothing about what is below it
+                return self.__findLandingRow(rotation)
+            if columnHeight - 1 - bottom < landingRow:
+                landingRow = columnHeight - 1 - bottom
+        return landingRow
+
+    def getHash(self) -> int:
+        if self.__hash == None:
+            keys = getZobristKeys(self.width, self.height)
+            value = 0
+            for y, row in enumerate(self.__rows):
+                start = y * self.width
+                while row:
+                    value ^= keys[start + (row & -row).bit_length() - 1]
+                    row &= row - 1
+            self.__hash = value
+        return self.__hash
+
+    def getPlacements(self, block: Block = None, x: int = None, y: int = None) -> tuple[Landing, ...]:
+        # every spot the block can lock in from (x, y) using the moves below, defaults to the active block
+        if block == None:
+            block = self.currentBlock
+            if block == None:
+                return ()
+        x = self.__x if x == None else x
+        y = self.__y if y == None else y
+        rotation = block.getRotation(self.__generator)
+        key = (self.width, self.height, self.getHash(), block.type.value, rotation.type.value, x, y)
+        landings = PLACEMENT_CACHE.get(key)
+        if landings == None:
+            landings = self.__findPlacements(block.rotations, rotation, x, y)
+            PLACEMENT_CACHE.put(key, landings)
+        return landings
+
+    def getBlockPositions(self, rotation: Rotation, x: int, y: int) -> list[Position]:
+        return [self.__positions[index] for index in self.__getBlockCells(rotation, x, y)]
+
     def checkLine(self) -> int:
         if self.hasBlock():
             return 0
-        
+
         rowsToDelete = self.__getRowsToDelete()
         if len(rowsToDelete) == 0:
             return 0
-        for row in rowsToDelete:
-            self.__removeRow(row)
-        
+        self.__removeRows(rowsToDelete)
+        self.__repaint = True
+        self.lastLines = len(rowsToDelete)
+
         points = self.width * len(rowsToDelete)
         if len(rowsToDelete) == 4:
             points = pow(points, 2)
@@ -59,138 +356,310 @@ class Matrix:
     def rotateLeft(self):
         if self.currentBlock == None:
             return
-        newRotation = self.currentBlock.getRotateLeft()
-        if not self.__checkRotation(newRotation):
+        if not self.__rotate(self.currentBlock.getRotateLeft()):
             return
 
         self.currentBlock.rotateLeft()
-        self.__setBlock(self.__getCurrentPosition())
-    
+
     def rotateRight(self):
         if self.currentBlock == None:
             return
-        newRotation = self.currentBlock.getRotateRight()
-        if not self.__checkRotation(newRotation):
+        if not self.__rotate(self.currentBlock.getRotateRight()):
             return
-        
+
         self.currentBlock.rotateRight()
-        self.__setBlock(self.__getCurrentPosition())
-    
+
     def hasBlock(self):
         return self.currentBlock != None
 
+    def getRows(self) -> tuple[int, ...]:
+        return tuple(self.__rows)
+
+    def getColumnHeights(self) -> tuple[int, ...]:
+        # row of the highest locked cell in every column, height when the column is empty
+        return tuple(self.__getColumnHeights())
+
+    def getBlockPosition(self) -> Position:
+        return Position(self.__x, self.__y)
+
+    def needsRepaint(self) -> bool:
+        return self.__repaint
+
+    def popDirtyCells(self) -> list[Position]:
+        # the active block is erased where it was drawn and drawn where it is now, the moves in between never reached the screen
+        if self.__drawnBlock != None:
+            self.__markFootprint(*self.__drawnBlock)
+        block = self.currentBlock
+        self.__drawnBlock = None if block == None else (block.getRotation(), self.__x, self.__y)
+        if self.__drawnBlock != None:
+            self.__markFootprint(*self.__drawnBlock)
+        cells = []
+        for y, dirty in self.__dirtyRows.items():
+            start = y * self.width
+            while dirty:
+                cells.append(self.__positions[start + (dirty & -dirty).bit_length() - 1])
+                dirty &= dirty - 1
+        self.__dirtyRows.clear()
+        self.__repaint = False
+        return cells
+
     def __getRowsToDelete(self) -> list[int]:
         rowsToDelete = []
-        for row in range(self.height):
-            emptyBlock = first(self.__matrix[row], lambda el: el.type == PositionType.EMPTY)
-            if emptyBlock == None:
+        touched = self.__touchedRows
+        self.__touchedRows = 0
+        while touched:
+            row = (touched & -touched).bit_length() - 1
+            touched &= touched - 1
+            if self.__rows[row] == self.__fullRow:
                 rowsToDelete.append(row)
         return rowsToDelete
 
-    def __removeRow(self, rowIndex: int):
-        for column in range(self.width):
-            self.__set(Position(column, rowIndex), self.__defaultColor, PositionType.EMPTY)
-        if rowIndex == 0:
+    def __removeRows(self, rowsToDelete: list[int]):
+        # deleting from the bottom up keeps the indexes of the rows still to go, then all empty rows go on top at once
+        rows = self.__rows
+        colors = self.__colors
+        for row in reversed(rowsToDelete):
+            del rows[row]
+            del colors[row]
+        rows[0:0] = [0] * len(rowsToDelete)
+        colors[0:0] = [self.__emptyRow] * len(rowsToDelete)
+        self.__shiftColumnHeights(rowsToDelete)
+        # every cell above the cleared rows moved, rehash lazily instead of here
+        self.__hash = None
+
+    def __shiftColumnHeights(self, rowsToDelete: list[int]):
+        # full rows cross every column, so a column keeps its top cell unless that cell was on the highest cleared row
+        heights = self.__columnHeights
+        if heights == None:
             return
-        
-        for row in range(rowIndex - 1, -1, -1):
-            self.__moveDownRow(row)
-    
-    def __moveDownRow(self, rowIndex: int):
+        top = rowsToDelete[0]
+        uncovered = 0
         for column in range(self.width):
-            position = Position(column, rowIndex)
-            cell = self.get(position)
-            self.__set(position.clone().plus(Position(0, 1)), cell.color, cell.type)
+            if heights[column] < top:
+                heights[column] += len(rowsToDelete)
+            else:
+                uncovered |= 1 << column
+                heights[column] = self.height
+        # those columns get the next locked cell below, found on the compacted rows
+        y = top + len(rowsToDelete)
+        while uncovered and y < self.height:
+            found = self.__rows[y] & uncovered
+            uncovered &= ~found
+            while found:
+                heights[(found & -found).bit_length() - 1] = y
+                found &= found - 1
+            y += 1
+
+    def __resetBoard(self, block: Block, x: int, y: int):
+        # everything derived from the rows after they were replaced wholesale
+        self.__palette = dict(_PALETTE)
+        self.currentBlock = block
+        self.__x = x
+        self.__y = y
+        # nothing says which rows the last lock touched, so let the next checkLine look at all of them
+        self.__touchedRows = (1 << self.height) - 1
+        self.__columnHeights = None
+        self.__hash = None
+        self.__repaint = True
+
+    def __getColumnHeights(self) -> list[int]:
+        if self.__columnHeights != None:
+            return self.__columnHeights
+        heights = [self.height] * self.width
+        covered = 0
+        for y, row in enumerate(self.__rows):
+            newColumns = row & ~covered
+            while newColumns:
+                heights[(newColumns & -newColumns).bit_length() - 1] = y
+                newColumns &= newColumns - 1
+            covered |= row
+            if covered == self.__fullRow:
+                break
+        self.__columnHeights = heights
+        return heights
+
+    def __findPlacements(self, rotations: Rotations, rotation: Rotation, x: int, y: int) -> tuple[Landing, ...]:
+        # BFS one row at a time on column masks: flood the row with sideways moves and rotations, then step down into the next row
+        if not self.__checkPosition(rotation, x, y):
+            return ()
+        turns = {}
+        for current in (rotations.left, rotations.top, rotations.right, rotations.bottom):
+            left = rotations.getLeftRotation(current)
+            right = rotations.getRightRotation(current)
+            turns[current] = (('rotateLeft', left, self.width - left.width), ('rotateRight', right, self.width - right.width))
+        # per row from y on: masks of the columns entered from the row above and of the columns reachable on the row
+        entries: list[dict[Rotation, int]] = []
+        reaches: list[dict[Rotation, int]] = []
+        rowParents: dict[int, dict] = {}
+        # first row of the straight fall that entered each column, so walking back up skips it in one step
+        falls: dict[Rotation, dict[int, int]] = {current: {} for current in turns}
+        landings = []
+        seen = set()
+        entry = {current: 0 for current in turns}
+        entry[rotation] = 1 << x
+        previous = dict(entry)
+        previous[rotation] = 0
+        valid = {current: self.__getValidColumns(current, y) for current in turns}
+        row = y
+        while any(entry.values()):
+            for current, columns in entry.items():
+                for column in _getColumns(columns & ~previous[current]):
+                    falls[current][column] = row
+            previous = entry
+            reach = {current: _fillRuns(entry[current], valid[current]) for current in turns}
+            changed = True
+            while changed:
+                changed = False
+                for current, columns in reach.items():
+                    for _, turn, limit in turns[current]:
+                        turned = columns & ((2 << limit) - 1)
+                        if columns >> (limit + 1):
+                            turned |= 1 << limit
+                        added = turned & valid[turn] & ~reach[turn]
+                        if added:
+                            reach[turn] = _fillRuns(reach[turn] | added, valid[turn])
+                            changed = True
+            entries.append(entry)
+            reaches.append(reach)
 
-    def __move(self, position: Position) -> bool:
+            valid = {current: self.__getValidColumns(current, row + 1) for current in turns}
+            entry = {}
+            for current, columns in reach.items():
+                entry[current] = columns & valid[current]
+                resting = columns & ~valid[current]
+                while resting:
+                    restX = (resting & -resting).bit_length() - 1
+                    resting &= resting - 1
+                    shape = (current.rowMasks, restX, row)
+                    if shape in seen:
+                        continue
+                    seen.add(shape)
+                    fallRow = falls[current][restX] if (entries[-1][current] >> restX) & 1 else row
+                    moves = self.__getMoves(turns, entries, reaches, rowParents, y, current, restX, fallRow)
+                    landings.append(Landing(current, restX, row, self.__countFullRows(current, restX, row), moves))
+            row += 1
+        return tuple(landings)
+
+    def __getMoves(self, turns: dict, entries: list[dict[Rotation, int]], reaches: list[dict[Rotation, int]], rowParents: dict[int, dict], top: int, rotation: Rotation, x: int, y: int) -> tuple[tuple[str, int], ...]:
+        # walk back up: straight up while the column was entered from above, otherwise follow the row's search back to an entry.
+        # y may be the top of the fall that ended in the landing, the rows below it add no moves
+        moves = []
+        state = (rotation, x)
+        row = y
+        while True:
+            if (entries[row - top][state[0]] >> state[1]) & 1:
+                if row == top:
+                    break
+                row -= 1
+                continue
+            parents = rowParents.get(row)
+            if parents == None:
+                parents = rowParents[row] = self.__searchRow(turns, entries[row - top], reaches[row - top])
+            while parents[state] != None:
+                state, name = parents[state]
+                moves.append((name, row))
+        moves.reverse()
+        return tuple(moves)
+
+    def __searchRow(self, turns: dict, entry: dict[Rotation, int], reach: dict[Rotation, int]) -> dict[tuple[Rotation, int], tuple]:
+        parents = {(current, column): None for current, columns in entry.items() for column in _getColumns(columns)}
+        queue = list(parents)
+        for state in queue:
+            current, column = state
+            for name, nextRotation, nextX in (('moveLeft', current, column - 1), ('moveRight', current, column + 1)) + tuple((name, turn, min(column, limit)) for name, turn, limit in turns[current]):
+                nextState = (nextRotation, nextX)
+                if nextX >= 0 and (reach[nextRotation] >> nextX) & 1 and nextState not in parents:
+                    parents[nextState] = (state, name)
+                    queue.append(nextState)
+        return parents
+
+    def __getValidColumns(self, rotation: Rotation, y: int) -> int:
+        # bit x is set when the rotation fits with its left column at x on row y
+        if y + rotation.height > self.height:
+            return 0
+        blocked = 0
+        for column, row in rotation.offsets:
+            blocked |= self.__rows[y + row] >> column
+        return ~blocked & ((1 << (self.width - rotation.width + 1)) - 1)
+
+    def __countFullRows(self, rotation: Rotation, x: int, y: int) -> int:
+        return sum(1 for row, mask in enumerate(rotation.rowMasks) if self.__rows[y + row] | (mask << x) == self.__fullRow)
+
+    def __findLandingRow(self, rotation: Rotation) -> int:
+        y = self.__y
+        while self.__checkPosition(rotation, self.__x, y + 1):
+            y += 1
+        return y
+
+    def __move(self, x: int, y: int) -> bool:
         if self.currentBlock == None:
             return
-        nextPosition = self.__getCurrentPosition().clone().plus(position)
-        if not self.__checkPosition(nextPosition):
+        nextX = self.__x + x
+        nextY = self.__y + y
+        if not self.__checkPosition(self.currentBlock.getRotation(), nextX, nextY):
             return False
-        self.__setBlock(nextPosition)
-        return self.__checkPosition(nextPosition)
-
-    def __set(self, pos: Position, color: Color, type: PositionType = PositionType.EMPTY):
-        self.__matrix[pos.y][pos.x] = Cell(color, pos, type)
-
-    def __clear(self):
-        for pos in self.__currentBlockPositions:
-            self.__set(Position(pos.x, pos.y), self.__defaultColor)
-        self.__currentBlockPositions = []
-
-    def __checkRotation(self, rotation: Rotation) -> bool:
-        for position in rotation.positions:
-            isBlock = self.get(position).type == PositionType.BLOCK
-            isCurrenctBlock = first(self.__currentBlockPositions, lambda pos: pos.equals(position)) != None
-            if isBlock and not isCurrenctBlock:
-                return False
-        
+        self.__x = nextX
+        self.__y = nextY
         return True
 
-    def __checkPosition(self, newPos: Position) -> bool:
-        for pos in self.currentBlock.getRotation().positions:
-            if pos.positionType == PositionType.BLOCK:
-                blockPosition = pos.clone().plus(newPos)
-                if blockPosition.x < 0 or blockPosition.x >= self.width or blockPosition.y >= self.height:
-                    return False
-
-                isBlock = self.get(blockPosition).type == PositionType.BLOCK
-                isCurrenctBlock = first(self.__currentBlockPositions, lambda pos: pos.equals(blockPosition)) != None
-                if isBlock and not isCurrenctBlock:
-                    return False
+    def __rotate(self, rotation: Rotation) -> bool:
+        x = min(self.__x, self.width - 1 - rotation.getMaxWidthPos())
+        if not self.__checkPosition(rotation, x, self.__y):
+            return False
+        self.__x = x
         return True
 
-    def __getCurrentPosition(self) -> Position:
-        if len(self.__currentBlockPositions) == 0:
-            return Position(0, 0)
-        
-        currentPositions = copy.deepcopy(self.__currentBlockPositions)
-        currentPositions.sort(key = lambda pos: pos.x)
-        x = currentPositions[0].x
-        currentPositions.sort(key = lambda pos: pos.y)
-        y = currentPositions[0].y
-        return Position(x, y)
-
-    def __getCurrentPosition(self) -> Position:
-        if len(self.__currentBlockPositions) == 0:
-            return Position(0, 0)
-        
-        return Position(self.__minX(), self.__minY())
-
-    def __maxX(self) -> int:
-        currentPositions = copy.deepcopy(self.__currentBlockPositions)
-        currentPositions.sort(reverse = True, key = lambda pos: pos.x)
-        return currentPositions[0].x
-
-    def __maxY(self) -> int:
-            currentPositions = copy.deepcopy(self.__currentBlockPositions)
-            currentPositions.sort(reverse = True, key = lambda pos: pos.y)
-            return currentPositions[0].y
-
-    def __minX(self) -> int:
-        currentPositions = copy.deepcopy(self.__currentBlockPositions)
-        currentPositions.sort(key = lambda pos: pos.x)
-        return currentPositions[0].x
-
-    def __minY(self) -> int:
-            currentPositions = copy.deepcopy(self.__currentBlockPositions)
-            currentPositions.sort(key = lambda pos: pos.y)
-            return currentPositions[0].y
-
-    def __setBlock(self, position: Position):
-        self.__clear()
-        positionCopy = position.clone()
+    def __checkPosition(self, rotation: Rotation, x: int, y: int) -> bool:
+        rowMasks = rotation.rowMasks
+        if x < 0 or x + rotation.width > self.width or y < 0 or y + rotation.height > self.height:
+            return False
+        for row, mask in enumerate(rowMasks):
+            if self.__rows[y + row] & (mask << x):
+                return False
+        return True
+
+    def __isCurrentBlock(self, x: int, y: int) -> bool:
+        if self.currentBlock == None:
+            return False
+        rowMasks = self.currentBlock.getRotation().rowMasks
+        row = y - self.__y
+        if row < 0 or row >= len(rowMasks) or x < self.__x:
+            return False
+        return (rowMasks[row] >> (x - self.__x)) & 1 == 1
+
+    def __getBlockCells(self, rotation: Rotation, x: int, y: int) -> list[int]:
+        return [(y + row) * self.width + x + column for column, row in rotation.offsets]
+
+    def __markFootprint(self, rotation: Rotation, x: int, y: int):
+        dirtyRows = self.__dirtyRows
+        for row, mask in enumerate(rotation.rowMasks):
+            dirtyRows[y + row] = dirtyRows.get(y + row, 0) | mask << x
+
+    def __lockBlock(self):
+        if self.currentBlock == None:
+            return
+        colorIndex = self.currentBlock.type.value
+        self.__palette[colorIndex] = self.currentBlock.color
         rotation = self.currentBlock.getRotation()
-        while rotation.getMaxWidthPos() + positionCopy.x >= self.width:
-            positionCopy.x -= 1
-
-        for pos in rotation.positions:
-            if pos.positionType == PositionType.BLOCK:
-                blockPosition = positionCopy.clone().plus(pos)
-                self.__set(blockPosition, self.currentBlock.color, PositionType.BLOCK)
-                self.__currentBlockPositions.append(blockPosition)
-    
-    def __unsetBlock(self):
+        for row, mask in enumerate(rotation.rowMasks):
+            self.__rows[self.__y + row] |= mask << self.__x
+        self.__touchedRows |= ((1 << rotation.height) - 1) << self.__y
+        colors = self.__colors
+        for row, mask in enumerate(rotation.rowMasks):
+            line = bytearray(colors[self.__y + row])
+            while mask:
+                line[self.__x + (mask & -mask).bit_length() - 1] = colorIndex
+                mask &= mask - 1
+            colors[self.__y + row] = bytes(line)
+        heights = self.__columnHeights
+        if heights != None:
+            for column, row in rotation.offsets:
+                if self.__y + row < heights[self.__x + column]:
+                    heights[self.__x + column] = self.__y + row
+        if self.__hash != None:
+            keys = getZobristKeys(self.width, self.height)
+            for index in self.__getBlockCells(rotation, self.__x, self.__y):
+                self.__hash ^= keys[index]
+        # the cells now belong to the board, let whoever draws it know even if they were drawn already
+        self.__markFootprint(rotation, self.__x, self.__y)
         self.currentBlock = None
-        self.__currentBlockPositions = []
\ No newline at end of file
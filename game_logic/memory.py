@@ -0,0 +1,155 @@
+import gc
+import sys
+import time
+import tracemalloc
+from game_logic import profiler
+from game_logic.profiler import FRAME_HISTORY, Histogram
+
+# frames between the tracemalloc snapshots the top allocation sites are taken from
+SNAPSHOT_FRAMES = 600
+TOP_SITES = 10
+TRACE_DEPTH = 1
+# idle time a collection of the oldest generation needs, younger ones run in any idle window
+FULL_COLLECTION_IDLE = 0.008
+# counts this many times over the threshold collect even without idle time, so a busy game cannot grow unbounded
+FORCE_FACTOR = 10
+
+class AllocationTracker:
+    # fed by FrameProfiler.mark and endFrame, so allocations are split by the same phases as the frame time
+    def __init__(self, capacity: int = FRAME_HISTORY, snapshotFrames: int = SNAPSHOT_FRAMES):
+        self.frames: int = 0
+        # memory blocks allocated minus freed per phase and frame
+        self.phases: dict[str, Histogram] = {}
+        # traced bytes a frame allocated above what it started with, short lived garbage included
+        self.transientBytes: Histogram = Histogram(capacity)
+        # (file:line, bytes, blocks) that grew most between the last two snapshots
+        self.sites: list[tuple[str, int, int]] = []
+        self.__capacity: int = capacity
+        self.__snapshotFrames: int = snapshotFrames
+        self.__counts: dict[str, int] = {}
+        self.__blocks: int = 0
+        self.__frameStart: int = 0
+        self.__snapshot: tracemalloc.Snapshot = None
+
+    def start(self):
+        tracemalloc.start(TRACE_DEPTH)
+        self.__snapshot = self.__takeSnapshot()
+        self.__frameStart = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.__blocks = sys.getallocatedblocks()
+
+    def mark(self, phase: str):
+        blocks = sys.getallocatedblocks()
+        self.__counts[phase] = self.__counts.get(phase, 0) + blocks - self.__blocks
+        self.__blocks = blocks
+
+    def endFrame(self):
+        if not tracemalloc.is_tracing():
+            return
+        self.frames += 1
+        current, peak = tracemalloc.get_traced_memory()
+        self.transientBytes.add(peak - self.__frameStart)
+        tracemalloc.reset_peak()
+        self.__frameStart = current
+        for phase in set(self.phases) | set(self.__counts):
+            histogram = self.phases.get(phase)
+            if histogram == None:
+                histogram = self.phases[phase] = Histogram(self.__capacity)
+            histogram.add(self.__counts.get(phase, 0))
+        self.__counts.clear()
+        if self.frames % self.__snapshotFrames == 0:
+            self.__updateSites()
+        # the bookkeeping above allocates too, keep it out of the next frame
+        self.__blocks = sys.getallocatedblocks()
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            self.__updateSites()
+            tracemalloc.stop()
+
+    def getReport(self) -> dict:
+        report = {'frames': self.frames, 'transientBytes': dict(zip(('p50', 'p95', 'p99'), self.transientBytes.getPercentiles())), 'blocks': {}}
+        for phase, histogram in self.phases.items():
+            report['blocks'][phase] = dict(zip(('p50', 'p95', 'p99'), histogram.getPercentiles()))
+        report['sites'] = [{'site': site, 'bytes': size, 'blocks': count} for site, size, count in self.sites]
+        return report
+
+    def getLines(self) -> list[str]:
+        return ['%-7s %6d %6d %6d' % (('kB',) + tuple(value // 1024 for value in self.transientBytes.getPercentiles()))]
+
+    def __takeSnapshot(self) -> tracemalloc.Snapshot:
+        # the measuring code itself is not a site worth reporting
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, path) for path in (tracemalloc.__file__, profiler.__file__, __file__)])
+
+    def __updateSites(self):
+        snapshot = self.__takeSnapshot()
+        differences = snapshot.compare_to(self.__snapshot, 'lineno')
+        self.__snapshot = snapshot
+        self.sites = [(str(difference.traceback[0]), difference.size_diff, difference.count_diff) for difference in differences[:TOP_SITES] if difference.size_diff > 0]
+
+class GcPolicy:
+    # startup objects are frozen out of every collection and the rest is collected when the game loop would sleep anyway
+    def __init__(self, capacity: int = FRAME_HISTORY):
+        self.pauses: Histogram = Histogram(capacity)
+        self.longestPause: float = 0.0
+        self.collections: list[int] = [0, 0, 0]
+        # collections that had to run without enough idle time
+        self.forced: int = 0
+        # objects gc.freeze moved out of the collected generations at start
+        self.frozen: int = 0
+        self.__thresholds: tuple[int, int, int] = gc.get_threshold()
+        self.__pauseStart: float = 0.0
+        self.__wasEnabled: bool = gc.isenabled()
+
+    def start(self):
+        gc.collect()
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+        gc.disable()
+        gc.callbacks.append(self.__record)
+
+    def collect(self, idleTime: float):
+        # the generation automatic collection would run now, or None
+        counts = gc.get_count()
+        generation = None
+        for index in range(2, -1, -1):
+            if counts[index] > self.__thresholds[index]:
+                generation = index
+                break
+        if generation == None:
+            return
+        forced = counts[generation] > self.__thresholds[generation] * FORCE_FACTOR
+        if not forced:
+            if idleTime <= 0:
+                return
+            if generation == 2 and idleTime < FULL_COLLECTION_IDLE:
+                # the full collection waits for a longer idle window, the young objects do not have to
+                generation = 1
+        elif idleTime <= 0 or (generation == 2 and idleTime < FULL_COLLECTION_IDLE):
+            self.forced += 1
+        gc.collect(generation)
+
+    def stop(self):
+        if self.__record in gc.callbacks:
+            gc.callbacks.remove(self.__record)
+        gc.unfreeze()
+        if self.__wasEnabled:
+            gc.enable()
+
+    def getReport(self) -> dict:
+        report = {'collections': list(self.collections), 'forced': self.forced, 'frozen': self.frozen, 'longestMs': self.longestPause * 1000}
+        report['pauseMs'] = dict(zip(('p50', 'p95', 'p99'), (value * 1000 for value in self.pauses.getPercentiles())))
+        return report
+
+    def getLines(self) -> list[str]:
+        return ['%-7s %6.2f %6.2f %6.2f' % (('gc',) + tuple(value * 1000 for value in self.pauses.getPercentiles()))]
+
+    def __record(self, phase: str, info: dict):
+        # every collection is timed, including ones started outside of collect()
+        if phase == 'start':
+            self.__pauseStart = time.perf_counter()
+            return
+        pause = time.perf_counter() - self.__pauseStart
+        self.pauses.add(pause)
+        self.longestPause = max(self.longestPause, pause)
+        self.collections[info['generation']] += 1
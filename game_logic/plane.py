@@ -1,154 +1,258 @@
 import pygame
-from codesets.blocks import Position, Color, PositionType, Block
-from codesets.cell import Cell, getRandomBlock
+from codesets.blocks import Position, Color, Block, Rotation
+from game_logic.engine import Engine
+from game_logic.layout import PREVIEW_CELL_SIZE, PREVIEW_MARGIN, PREVIEW_TOP, Layout, getLayout
 from game_logic.matirix import Matrix
-from codesets.colors import GAME_PLANE_COLOR
+from game_logic.profiler import FrameProfiler
+from codesets.colors import BACKGROUND_COLOR, GHOST_BLEND
 
-CELL_COUNT_WIDTH = 10
-CELL_COUNT_HEIGHT = 22
+# locked cells are pre-rendered in square chunks of this many cells
+CHUNK_SIZE = 32
+# cells kept between the active block and the viewport edge before it scrolls
+SCROLL_MARGIN = 4
 
 class Plane:
-    def __init__(self, surface : pygame.Surface, surfaceWidth: int, surfaceHeight: int, topMargin: int, bottomMargin: int):
+    def __init__(self, surface : pygame.Surface, surfaceWidth: int, surfaceHeight: int, topMargin: int, bottomMargin: int, engine: Engine):
         self.surfaceWidth: int = surfaceWidth
         self.surfaceHeight: int = surfaceHeight
-        self.nextBlock = getRandomBlock()
+        self.profiler: FrameProfiler = None
 
-        self.__matrix: Matrix = Matrix(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Color(GAME_PLANE_COLOR))
+        self.__engine: Engine = engine
         self.__surface: pygame.Surface = surface
         self.__topMargin: int = topMargin
         self.__bottomMargin: int = bottomMargin
-        self.__leftBorder: int = 0
-        self.__cellSize: int = 0
-        self.__savedBlock: Block = None
-        self.__canSave: bool = True
+        self.__layout: Layout = None
+        # pre-rendered cell squares per color at the current cell size and at the preview size
+        self.__tiles: dict[tuple[int, int, int], pygame.Surface] = {}
+        self.__previewTiles: dict[tuple[int, int, int], pygame.Surface] = {}
+        # locked cells of the board by (column, row) of the chunk, only the visible ones are kept
+        self.__chunks: dict[tuple[int, int], pygame.Surface] = {}
+        # board cell shown in the top left corner of the viewport
+        self.__view: tuple[int, int] = (0, 0)
+        self.__ghostTiles: dict[tuple[int, int, int], pygame.Surface] = {}
+        # landing footprint (rotation, x, y) of the active block as last drawn, and its cells
+        self.__ghost: tuple[Rotation, int, int] = None
+        self.__ghostCells: set[Position] = set()
+        self.__repaint: bool = True
+        self.__renderedNextBlock: Block = None
+        self.__renderedSavedBlock: Block = None
         self.__setPlaneSize()
 
-    #region Blocks
-    def placeBlock(self):
-        self.__canSave = True
-        self.__matrix.place(self.nextBlock)
-        self.nextBlock = getRandomBlock()
-        
-    def rotateLeft(self):
-        self.__matrix.rotateLeft()
-
-    def rotateRight(self):
-        self.__matrix.rotateRight()
-
-    def moveRight(self):
-        self.__matrix.moveRight()
-
-    def moveLeft(self):
-        self.__matrix.moveLeft()
-
-    def moveDown(self):
-        if self.__matrix.hasBlock() and self.__matrix.moveDown():
-            return True
-        
-        return False
-    
-    def checkLine(self) -> int:
-        return self.__matrix.checkLine()
+    @property
+    def nextBlock(self) -> Block:
+        return self.__engine.nextBlock
 
-    def hasBlock(self) -> bool:
-        return self.__matrix.hasBlock()
-    
-    def saveBlock(self):
-        if not self.__canSave:
-            return
-        current = self.__matrix.currentBlock
-        if self.__savedBlock != None:
-            self.__matrix.place(self.__savedBlock)
-            self.__savedBlock = current
-            self.__canSave = False
-            return
-        
-        self.__savedBlock = current
-        self.placeBlock()
-        self.__canSave = False
-    
-    #endregion
+    @property
+    def __matrix(self) -> Matrix:
+        return self.__engine.matrix
+
+    @property
+    def __savedBlock(self) -> Block:
+        return self.__engine.savedBlock
 
     #region Render Plane
 
+    def getLayout(self) -> Layout:
+        return self.__layout
+
     def getPlaneLeftPivot(self) -> Position:
-        return Position(self.__leftBorder, self.surfaceHeight - self.__cellSize * self.__matrix.height)
+        return Position(self.__layout.board.x, self.__layout.board.y)
     
     def getGameWidth(self) -> int:
-        return self.__cellSize * self.__matrix.width
+        return self.__layout.board.width
+
+    def needsRepaint(self) -> bool:
+        # scrolling repaints everything, so it has to be decided before callers clear the surface
+        self.__followBlock()
+        return self.__repaint or self.__matrix.needsRepaint()
+
+    def render(self) -> list[pygame.Rect]:
+        if self.needsRepaint():
+            if self.__matrix.needsRepaint():
+                # rows moved or the board was replaced
+                self.__chunks.clear()
+            self.__repaint = False
+            self.__invalidateChunks(self.__matrix.popDirtyCells())
+            self.__updateGhost()
+            self.__renderGamePlane()
+            self.__mark('plane')
+            self.__renderNextBlock()
+            self.__mark('next')
+            self.__renderSavedBlock()
+            self.__mark('saved')
+            return [self.__surface.get_rect()]
+
+        dirty = self.__matrix.popDirtyCells()
+        self.__invalidateChunks(dirty)
+        rects = [rect for rect in (self.__renderGameCell(position) for position in dirty + self.__updateGhost()) if rect != None]
+        self.__mark('plane')
+        boxes = [pygame.Rect(self.__layout.nextBox), pygame.Rect(self.__layout.savedBox)]
+        previewChanged = self.nextBlock is not self.__renderedNextBlock or self.__savedBlock is not self.__renderedSavedBlock
+        if previewChanged or any(box.collidelist(rects) != -1 for box in boxes):
+            rects += self.__renderPreviews(boxes)
+        return rects
 
-    def render(self):
-        self.__renderGamePlane()
-        self.__renderNextBlock()
-        self.__renderSavedBlock()
-        
     def reRenderPlane(self, surfaceWidth: int, surfaceHeight: int):
         self.surfaceWidth = surfaceWidth
         self.surfaceHeight = surfaceHeight
+        self.__repaint = True
         self.__setPlaneSize()
 
+    def __renderPreviews(self, boxes: list[pygame.Rect]) -> list[pygame.Rect]:
+        # previews are drawn over the top rows of the plane, so repaint what is under them first
+        rects = list(boxes)
+        for box in boxes:
+            self.__surface.fill(BACKGROUND_COLOR, box)
+            rects += [rect for rect in (self.__renderGameCell(position) for position in self.__getCellsUnder(box)) if rect != None]
+        self.__mark('plane')
+        self.__renderNextBlock()
+        self.__mark('next')
+        self.__renderSavedBlock()
+        self.__mark('saved')
+        return rects
+
+    def __mark(self, phase: str):
+        if self.profiler != None:
+            self.profiler.mark(phase)
+
+    def __getCellsUnder(self, box: pygame.Rect) -> list[Position]:
+        layout = self.__layout
+        board = layout.board
+        cellSize = layout.cellSize
+        if box.bottom <= board.y:
+            return []
+        viewX, viewY = self.__view
+        lastRow = min(layout.rows - 1, (box.bottom - 1 - board.y) // cellSize)
+        firstColumn = max(0, (box.left - board.x) // cellSize)
+        lastColumn = min(layout.columns - 1, (box.right - 1 - board.x) // cellSize)
+        return [self.__matrix.getPosition(viewX + column, viewY + row) for row in range(lastRow + 1) for column in range(firstColumn, lastColumn + 1)]
+
     def __renderSavedBlock(self):
+        self.__renderedSavedBlock = self.__savedBlock
         if self.__savedBlock == None:
             return
         leftRotation = self.__savedBlock.rotations.left
-        for row in range(leftRotation.getMaxHeightPos() + 1):
-            for column in range(leftRotation.getMaxWidthPos() + 1):
-                position = leftRotation.getPosition(column, row)
-                if position.positionType == PositionType.EMPTY:
-                    continue
-                center = self.getPlaneLeftPivot().x + self.getGameWidth() / 2
-                cellsize = 15
-                position = Position(column, row)
-                x = center - 30 - ((leftRotation.getMaxWidthPos() + 1) * cellsize) + (cellsize * position.x)
-                y = 50 + (cellsize * position.y)
-                self.__renderCell(Position(x, y), self.__savedBlock.color, cellsize)
+        tile = self.__getTile(self.__previewTiles, self.__savedBlock.color, PREVIEW_CELL_SIZE)
+        left = self.__layout.center - PREVIEW_MARGIN - (leftRotation.width * PREVIEW_CELL_SIZE)
+        self.__surface.blits([(tile, (left + PREVIEW_CELL_SIZE * column, PREVIEW_TOP + PREVIEW_CELL_SIZE * row)) for column, row in leftRotation.offsets], False)
 
     def __renderNextBlock(self):
+        self.__renderedNextBlock = self.nextBlock
         leftRotation = self.nextBlock.rotations.left
-        for row in range(leftRotation.getMaxHeightPos() + 1):
-            for column in range(leftRotation.getMaxWidthPos() + 1):
-                position = leftRotation.getPosition(column, row)
-                if position.positionType == PositionType.EMPTY:
-                    continue
-                center = self.getPlaneLeftPivot().x + self.getGameWidth() / 2
-                cellsize = 15
-                position = Position(column, row)
-                x = 30 + center + (cellsize * position.x)
-                y = 50 + (cellsize * position.y)
-                self.__renderCell(Position(x, y), self.nextBlock.color, cellsize)
+        tile = self.__getTile(self.__previewTiles, self.nextBlock.color, PREVIEW_CELL_SIZE)
+        left = self.__layout.center + PREVIEW_MARGIN
+        self.__surface.blits([(tile, (left + PREVIEW_CELL_SIZE * column, PREVIEW_TOP + PREVIEW_CELL_SIZE * row)) for column, row in leftRotation.offsets], False)
 
     def __renderGamePlane(self):
-        for column in range(self.__matrix.width):
-            for row in range(self.__matrix.height):
-                position = Position(column, row)
-                x = self.__leftBorder + (self.__cellSize * position.x)
-                y = self.surfaceHeight - self.__bottomMargin - (self.__cellSize * (self.__matrix.height - position.y))
-                self.__renderCell(Position(x, y), self.__matrix.get(position).color, self.__cellSize)
-
-    def __renderCell(self, pos: Position, color: Color, cellSize: int):
-        pygame.draw.rect(self.__surface, color.getPyGameColor(), pygame.Rect(pos.x, pos.y, cellSize, cellSize))
-        # render indexes
-        # my_font = pygame.font.SysFont('arial', 15)
-        # text_surface = my_font.render(str(cell.position.x) + "," + str(cell.position.y), False, (0, 0, 0))
-        # self.__surface.blit(text_surface, (x + 5, y + 5))
+        # one blit per visible chunk of locked cells, then the active block and its ghost
+        layout = self.__layout
+        board = layout.board
+        viewX, viewY = self.__view
+        visible = [(column, row) for row in range(viewY // CHUNK_SIZE, (viewY + layout.rows - 1) // CHUNK_SIZE + 1) for column in range(viewX // CHUNK_SIZE, (viewX + layout.columns - 1) // CHUNK_SIZE + 1)]
+        self.__surface.set_clip(pygame.Rect(board))
+        for column, row in visible:
+            self.__surface.blit(self.__getChunk(column, row), (board.x + (column * CHUNK_SIZE - viewX) * layout.cellSize, board.y + (row * CHUNK_SIZE - viewY) * layout.cellSize))
+        self.__surface.set_clip(None)
+        self.__chunks = {key: self.__chunks[key] for key in visible}
+
+        block = self.__matrix.currentBlock
+        if block != None:
+            position = self.__matrix.getBlockPosition()
+            for cell in self.__matrix.getBlockPositions(block.getRotation(), position.x, position.y):
+                self.__renderGameCell(cell)
+        for position in self.__ghostCells:
+            self.__renderGameCell(position)
+
+    def __getChunk(self, column: int, row: int) -> pygame.Surface:
+        chunk = self.__chunks.get((column, row))
+        if chunk != None:
+            return chunk
+        matrix = self.__matrix
+        cellSize = self.__layout.cellSize
+        left = column * CHUNK_SIZE
+        top = row * CHUNK_SIZE
+        right = min(matrix.width, left + CHUNK_SIZE)
+        bottom = min(matrix.height, top + CHUNK_SIZE)
+        chunk = self.__chunks[(column, row)] = pygame.Surface(((right - left) * cellSize, (bottom - top) * cellSize))
+        chunk.fill(matrix.getDefaultColor().getPyGameColor())
+        cells = matrix.getLockedPositions(left, top, right, bottom)
+        chunk.blits([(self.__getTile(self.__tiles, matrix.getLockedColor(cell), cellSize), ((cell.x - left) * cellSize, (cell.y - top) * cellSize)) for cell in cells], False)
+        return chunk
+
+    def __invalidateChunks(self, positions: list[Position]):
+        for position in positions:
+            self.__chunks.pop((position.x // CHUNK_SIZE, position.y // CHUNK_SIZE), None)
+
+    def __followBlock(self):
+        layout = self.__layout
+        matrix = self.__matrix
+        if matrix.currentBlock == None or (layout.columns >= matrix.width and layout.rows >= matrix.height):
+            return
+        rotation = matrix.currentBlock.getRotation()
+        position = matrix.getBlockPosition()
+        view = (self.__scroll(self.__view[0], position.x, rotation.width, layout.columns, matrix.width), self.__scroll(self.__view[1], position.y, rotation.height, layout.rows, matrix.height))
+        if view != self.__view:
+            self.__view = view
+            self.__repaint = True
+
+    def __scroll(self, view: int, start: int, size: int, visible: int, total: int) -> int:
+        # keep the view while the block is clear of its edges, otherwise centre it on the block
+        if visible >= total:
+            return 0
+        margin = max(0, min(SCROLL_MARGIN, (visible - size) // 2))
+        if start - margin >= view and start + size + margin <= view + visible:
+            return view
+        return max(0, min(total - visible, start + size // 2 - visible // 2))
+
+    def __renderGameCell(self, position: Position) -> pygame.Rect:
+        layout = self.__layout
+        column = position.x - self.__view[0]
+        row = position.y - self.__view[1]
+        if column < 0 or row < 0 or column >= layout.columns or row >= layout.rows:
+            return None
+        cellSize = layout.cellSize
+        board = layout.board
+        color = self.__matrix.getColor(position)
+        if position in self.__ghostCells and color is self.__matrix.getDefaultColor():
+            tile = self.__getGhostTile(self.__matrix.currentBlock.color, color, cellSize)
+        else:
+            tile = self.__getTile(self.__tiles, color, cellSize)
+        return self.__surface.blit(tile, (board.x + cellSize * column, board.y + cellSize * row))
+
+    def __getTile(self, tiles: dict[tuple[int, int, int], pygame.Surface], color: Color, cellSize: int) -> pygame.Surface:
+        tile = tiles.get(color.getPyGameColor())
+        if tile == None:
+            tile = tiles[color.getPyGameColor()] = pygame.Surface((cellSize, cellSize))
+            tile.fill(color.getPyGameColor())
+        return tile
+
+    def __getGhostTile(self, color: Color, planeColor: Color, cellSize: int) -> pygame.Surface:
+        tile = self.__ghostTiles.get(color.getPyGameColor())
+        if tile == None:
+            tile = self.__ghostTiles[color.getPyGameColor()] = pygame.Surface((cellSize, cellSize))
+            tile.fill(tuple(round(block * GHOST_BLEND + plane * (1 - GHOST_BLEND)) for block, plane in zip(color.getPyGameColor(), planeColor.getPyGameColor())))
+        return tile
+
+    def __updateGhost(self) -> list[Position]:
+        # returns the cells whose ghost state changed since the last render
+        matrix = self.__matrix
+        ghost = None
+        if matrix.currentBlock != None:
+            ghost = (matrix.currentBlock.getRotation(), matrix.getBlockPosition().x, matrix.getLandingRow())
+        if ghost == self.__ghost:
+            return []
+        changed = list(self.__ghostCells)
+        self.__ghost = ghost
+        self.__ghostCells = set(matrix.getBlockPositions(*ghost)) if ghost != None else set()
+        return changed + list(self.__ghostCells)
 
     def __setPlaneSize(self):
-        planeWidth = self.surfaceWidth
-        maxPlaneHeight = self.surfaceHeight - self.__topMargin - self.__bottomMargin
-        planeHeight = self.__getPlaneHeight(planeWidth)
-        cellSize = self.__getCellSize(planeWidth)
-        while ((not planeHeight.is_integer()) or planeHeight > maxPlaneHeight or (not cellSize.is_integer())) and planeWidth > 0:
-            planeWidth -=1
-            planeHeight = self.__getPlaneHeight(planeWidth)
-            cellSize = self.__getCellSize(planeWidth)
-        
-        self.__leftBorder = (self.surfaceWidth - planeWidth) / 2
-        self.__cellSize = cellSize
-    
-    def __getPlaneHeight(self, planeWidth: int) -> int:
-        return (planeWidth * self.__matrix.height) / self.__matrix.width
-    
-    def __getCellSize(self, planeWidth: int) -> int:
-        return planeWidth / self.__matrix.width
+        layout = getLayout(self.surfaceWidth, self.surfaceHeight, self.__matrix.width, self.__matrix.height, self.__topMargin, self.__bottomMargin)
+        if self.__layout == None or layout.cellSize != self.__layout.cellSize:
+            self.__tiles.clear()
+            self.__ghostTiles.clear()
+            self.__chunks.clear()
+        self.__layout = layout
+        self.__view = (0, 0)
 
     #endregion
\ No newline at end of file
@@ -0,0 +1,154 @@
+import time
+from collections import deque
+from typing import Callable
+
+FRAME_HISTORY = 600
+PERCENTILES = (50, 95, 99)
+COUNTED_OPERATIONS = ('place', 'placeAt', 'copy', 'get', 'moveLeft', 'moveRight', 'moveDown', 'rotateLeft', 'rotateRight', 'checkLine')
+
+class Histogram:
+    def __init__(self, capacity: int = FRAME_HISTORY):
+        self.__samples: deque[float] = deque(maxlen = capacity)
+
+    def add(self, value: float):
+        self.__samples.append(value)
+
+    def getPercentiles(self, percentiles: tuple[int, ...] = PERCENTILES) -> tuple[float, ...]:
+        if len(self.__samples) == 0:
+            return tuple(0.0 for _ in percentiles)
+        samples = sorted(self.__samples)
+        last = len(samples) - 1
+        return tuple(samples[min(last, int(len(samples) * percentile / 100))] for percentile in percentiles)
+
+class FrameProfiler:
+    def __init__(self, capacity: int = FRAME_HISTORY, clock: Callable[[], float] = time.perf_counter):
+        self.frames: int = 0
+        self.phases: dict[str, Histogram] = {}
+        self.operations: dict[str, Histogram] = {}
+        self.totalOperations: Histogram = Histogram(capacity)
+        self.__capacity: int = capacity
+        self.__clock: Callable[[], float] = clock
+        self.__last: float = clock()
+        self.__frameStart: float = self.__last
+        # time per phase and operation counts of the frame being measured
+        self.__times: dict[str, float] = {}
+        self.__counts: dict[str, int] = {}
+        self.__instrumented: list[tuple[type, str, Callable]] = []
+        self.__capture: 'cProfile.Profile' = None
+        # optional per-phase allocation counts and collection pauses, reported next to the frame times
+        self.allocations: 'AllocationTracker' = None
+        self.gcPolicy: 'GcPolicy' = None
+        self.__capturePath: str = None
+        self.__captureEnd: float = 0.0
+
+    def mark(self, phase: str):
+        now = self.__clock()
+        self.__times[phase] = self.__times.get(phase, 0.0) + now - self.__last
+        self.__last = now
+        if self.allocations != None:
+            self.allocations.mark(phase)
+
+    def endFrame(self):
+        now = self.__clock()
+        self.frames += 1
+        self.__getHistogram(self.phases, 'frame').add(now - self.__frameStart)
+        self.__frameStart = now
+        for phase in self.phases:
+            if phase != 'frame':
+                self.phases[phase].add(self.__times.get(phase, 0.0))
+        for phase in self.__times:
+            if phase not in self.phases:
+                self.__getHistogram(self.phases, phase).add(self.__times[phase])
+        self.__times.clear()
+
+        self.totalOperations.add(sum(self.__counts.values()))
+        for name in self.operations:
+            self.operations[name].add(self.__counts.get(name, 0))
+        for name in self.__counts:
+            if name not in self.operations:
+                self.__getHistogram(self.operations, name).add(self.__counts[name])
+        self.__counts.clear()
+
+        if self.__capture != None and now >= self.__captureEnd:
+            self.stopCapture()
+        if self.allocations != None:
+            self.allocations.endFrame()
+
+    def count(self, name: str):
+        self.__counts[name] = self.__counts.get(name, 0) + 1
+
+    def instrument(self, target: type, names: tuple[str, ...] = COUNTED_OPERATIONS):
+        for name in names:
+            method = getattr(target, name)
+            self.__instrumented.append((target, name, method))
+            setattr(target, name, self.__counted(name, method))
+
+    def restore(self):
+        for target, name, method in reversed(self.__instrumented):
+            setattr(target, name, method)
+        self.__instrumented.clear()
+
+    def startCapture(self, path: str, seconds: float):
+        import cProfile
+        self.stopCapture()
+        self.__capturePath = path
+        self.__captureEnd = self.__clock() + seconds
+        self.__capture = cProfile.Profile()
+        self.__capture.enable()
+
+    def stopCapture(self):
+        if self.__capture == None:
+            return
+        self.__capture.disable()
+        self.__capture.dump_stats(self.__capturePath)
+        self.__capture = None
+
+    def isCapturing(self) -> bool:
+        return self.__capture != None
+
+    def getReport(self) -> dict:
+        report = {'frames': self.frames, 'phases': {}, 'operations': {'total': dict(zip(('p50', 'p95', 'p99'), self.totalOperations.getPercentiles()))}}
+        for phase, histogram in self.phases.items():
+            report['phases'][phase] = dict(zip(('p50', 'p95', 'p99'), (value * 1000 for value in histogram.getPercentiles())))
+        for name, histogram in self.operations.items():
+            report['operations'][name] = dict(zip(('p50', 'p95', 'p99'), histogram.getPercentiles()))
+        if self.allocations != None:
+            report['allocations'] = self.allocations.getReport()
+        if self.gcPolicy != None:
+            report['gc'] = self.gcPolicy.getReport()
+        return report
+
+    def getLines(self) -> list[str]:
+        lines = ['%-7s %6s %6s %6s' % ('ms', 'p50', 'p95', 'p99')]
+        for phase, histogram in self.phases.items():
+            lines.append('%-7s %6.2f %6.2f %6.2f' % ((phase,) + tuple(value * 1000 for value in histogram.getPercentiles())))
+        lines.append('%-7s %6d %6d %6d' % (('ops',) + self.totalOperations.getPercentiles()))
+        if self.allocations != None:
+            lines += self.allocations.getLines()
+        if self.gcPolicy != None:
+            lines += self.gcPolicy.getLines()
+        return lines
+
+    def dump(self, path: str):
+        import json
+        with open(path, 'w') as file:
+            json.dump(self.getReport(), file, indent = 2)
+
+    def close(self):
+        self.stopCapture()
+        self.restore()
+        if self.allocations != None:
+            self.allocations.stop()
+
+    def __getHistogram(self, histograms: dict[str, Histogram], name: str) -> Histogram:
+        histogram = histograms.get(name)
+        if histogram == None:
+            histogram = histograms[name] = Histogram(self.__capacity)
+        return histogram
+
+    def __counted(self, name: str, method: Callable) -> Callable:
+        count = self.count
+        def counted(*arguments, **keywords):
+            count(name)
+            return method(*arguments, **keywords)
+        return counted
@@ -0,0 +1,126 @@
+from bisect import bisect_left
+from typing import NamedTuple
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT
+from game_logic.session import Session
+
+MAGIC = b'TRP'
+VERSION = 3
+# version 2 files have no board size and were always played on the default board
+SIZELESS_VERSION = 2
+AUTO_PLAY_FLAG = 0x1
+CODE_BITS = 4
+
+class Replay(NamedTuple):
+    seed: int
+    autoPlay: bool
+    ticks: int
+    score: int
+    events: list[tuple[int, int]]
+    width: int = CELL_COUNT_WIDTH
+    height: int = CELL_COUNT_HEIGHT
+
+class ReplayError(Exception):
+    pass
+
+def fromSession(session: Session) -> Replay:
+    if session.restored:
+        raise ReplayError('a game continued from a snapshot cannot be replayed')
+    return Replay(session.seed, session.autoPlay, session.ticks, session.engine.score, list(session.events), session.engine.width, session.engine.height)
+
+def encode(replay: Replay) -> bytes:
+    data = bytearray(MAGIC)
+    data.append(VERSION)
+    data.append(AUTO_PLAY_FLAG if replay.autoPlay else 0)
+    for value in (replay.seed, replay.ticks, replay.score, replay.width, replay.height, len(replay.events)):
+        _writeVarint(data, value)
+
+    # each event is one varint: ticks since the previous event, then the input code
+    lastTick = 0
+    for tick, code in replay.events:
+        _writeVarint(data, (tick - lastTick) << CODE_BITS | code)
+        lastTick = tick
+    return bytes(data)
+
+def decode(data: bytes) -> Replay:
+    if data[:len(MAGIC)] != MAGIC or len(data) < len(MAGIC) + 2:
+        raise ReplayError('not a replay')
+    version = data[len(MAGIC)]
+    if version != VERSION and version != SIZELESS_VERSION:
+        raise ReplayError('unsupported replay version ' + str(version))
+    autoPlay = data[len(MAGIC) + 1] & AUTO_PLAY_FLAG != 0
+    offset = len(MAGIC) + 2
+    seed, offset = _readVarint(data, offset)
+    ticks, offset = _readVarint(data, offset)
+    score, offset = _readVarint(data, offset)
+    width, height = CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT
+    if version != SIZELESS_VERSION:
+        width, offset = _readVarint(data, offset)
+        height, offset = _readVarint(data, offset)
+    count, offset = _readVarint(data, offset)
+
+    events = []
+    tick = 0
+    for _ in range(count):
+        value, offset = _readVarint(data, offset)
+        tick += value >> CODE_BITS
+        events.append((tick, value & ((1 << CODE_BITS) - 1)))
+    return Replay(seed, autoPlay, ticks, score, events, width, height)
+
+def save(replay: Replay, path: str):
+    with open(path, 'wb') as file:
+        file.write(encode(replay))
+
+def load(path: str) -> Replay:
+    with open(path, 'rb') as file:
+        return decode(file.read())
+
+def simulate(replay: Replay) -> Session:
+    player = ReplayPlayer(replay)
+    while player.update():
+        pass
+    return player.session
+
+def verify(replay: Replay) -> bool:
+    return simulate(replay).engine.score == replay.score
+
+class ReplayPlayer:
+    def __init__(self, replay: Replay):
+        self.replay: Replay = replay
+        self.session: Session = Session(replay.seed, autoPlay = replay.autoPlay, width = replay.width, height = replay.height)
+        self.__index: int = 0
+
+    def isFinished(self) -> bool:
+        return self.session.ticks >= self.replay.ticks
+
+    def resync(self):
+        # the session was moved to another tick, continue with the events of that tick
+        self.__index = bisect_left(self.replay.events, self.session.ticks, key = lambda event: event[0])
+
+    def update(self) -> bool:
+        events = self.replay.events
+        while self.__index < len(events) and events[self.__index][0] <= self.session.ticks:
+            self.session.input(events[self.__index][1])
+            self.__index += 1
+        if self.isFinished():
+            return False
+        self.session.update()
+        return True
+
+def _writeVarint(data: bytearray, value: int):
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+
+def _readVarint(data: bytes, offset: int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError('truncated replay')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
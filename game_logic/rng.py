@@ -0,0 +1,46 @@
+import os
+import random
+
+MASK_64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+def mix64(value: int) -> int:
+    # SplitMix64 output function, spreads any 64-bit value over all bits
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+# SplitMix64: the whole generator state is one 64-bit int, so it snapshots and restores in a single field
+class GameRandom(random.Random):
+    def __init__(self, seed: int = None):
+        self.state: int = 0
+        super().__init__(seed)
+
+    def seed(self, a: int = None, version: int = 2):
+        if a == None:
+            a = int.from_bytes(os.urandom(8), 'little')
+        elif not isinstance(a, int):
+            a = hash(a)
+        self.state = a & MASK_64
+        self.gauss_next = None
+
+    def getstate(self) -> int:
+        return self.state
+
+    def setstate(self, state: int):
+        self.state = state & MASK_64
+
+    def random(self) -> float:
+        return (self.__next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        if k <= 64:
+            return self.__next() >> (64 - k)
+        value = 0
+        for shift in range(0, k, 64):
+            value |= self.__next() << shift
+        return value & ((1 << k) - 1)
+
+    def __next(self) -> int:
+        self.state = (self.state + GOLDEN_GAMMA) & MASK_64
+        return mix64(self.state)
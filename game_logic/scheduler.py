@@ -0,0 +1,87 @@
+import time
+from typing import Callable
+
+TICK_RATE = 60
+MAX_FPS = 60
+MAX_CATCH_UP_TICKS = 30
+START_TICK_DOWN = 1.0
+DOWN_PRESSED_TICK_DOWN = 0.05
+MAX_CLICK_EVENT_TIME = 0.5
+
+def toTicks(seconds: float, tickRate: int = TICK_RATE) -> int:
+    return max(1, round(seconds * tickRate))
+
+class GravityTimer:
+    def __init__(self, tickRate: int = TICK_RATE):
+        self.downPressed: bool = False
+        self.__tickDown: int = toTicks(START_TICK_DOWN, tickRate)
+        self.__downPressedTickDown: int = toTicks(DOWN_PRESSED_TICK_DOWN, tickRate)
+        self.__clickTicks: int = toTicks(MAX_CLICK_EVENT_TIME, tickRate)
+        self.__ticksLastEvent: int = 0
+        self.__ticksLastClick: int = 0
+
+    def click(self):
+        self.__ticksLastClick = 0
+
+    def getState(self) -> tuple[bool, int, int]:
+        return self.downPressed, self.__ticksLastEvent, self.__ticksLastClick
+
+    def setState(self, state: tuple[bool, int, int]):
+        self.downPressed, self.__ticksLastEvent, self.__ticksLastClick = state
+
+    def update(self) -> bool:
+        self.__ticksLastEvent += 1
+        self.__ticksLastClick += 1
+        tickDown = self.__downPressedTickDown if self.downPressed else self.__tickDown
+        if self.__ticksLastEvent < tickDown or self.__ticksLastClick < self.__clickTicks:
+            return False
+        self.__ticksLastEvent = 0
+        return True
+
+class Scheduler:
+    def __init__(self, tickRate: int = TICK_RATE, maxFps: int = MAX_FPS, clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        self.tickTime: float = 1.0 / tickRate
+        self.frameTime: float = 1.0 / maxFps
+        self.ticks: int = 0
+        self.__clock: Callable[[], float] = clock
+        self.__sleep: Callable[[float], None] = sleep
+        self.__nextTick: float = 0.0
+        self.__nextFrame: float = 0.0
+        self.start()
+
+    def start(self):
+        now = self.__clock()
+        self.__nextTick = now + self.tickTime
+        self.__nextFrame = now
+
+    def advance(self) -> int:
+        now = self.__clock()
+        if now < self.__nextTick:
+            return 0
+        due = int((now - self.__nextTick) / self.tickTime) + 1
+        if due > MAX_CATCH_UP_TICKS:
+            # after a stall drop the backlog instead of fast-forwarding the game
+            due = MAX_CATCH_UP_TICKS
+            self.__nextTick = now + self.tickTime
+        else:
+            self.__nextTick += due * self.tickTime
+        self.ticks += due
+        return due
+
+    def frameDue(self) -> bool:
+        now = self.__clock()
+        if now < self.__nextFrame:
+            return False
+        self.__nextFrame += self.frameTime
+        if self.__nextFrame < now:
+            self.__nextFrame = now + self.frameTime
+        return True
+
+    def getIdleTime(self) -> float:
+        # time until the next tick or frame is due
+        return min(self.__nextTick, self.__nextFrame) - self.__clock()
+
+    def idle(self):
+        delay = self.getIdleTime()
+        if delay > 0:
+            self.__sleep(delay)
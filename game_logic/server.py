@@ -0,0 +1,195 @@
+import asyncio
+import random
+import struct
+from typing import NamedTuple
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Action, Engine, State
+from game_logic.scheduler import DOWN_PRESSED_TICK_DOWN, MAX_CATCH_UP_TICKS, MAX_CLICK_EVENT_TIME, START_TICK_DOWN, TICK_RATE, toTicks
+from game_logic.session import RELEASE_FLAG
+
+WHEEL_SIZE = 128
+DONE_FLAG = 0x1
+# frame: payload length, then score, flags, block, rotation, x, y, next block and one mask per row
+FRAME_HEADER = '<HIBBBhhB'
+
+class Frame(NamedTuple):
+    state: State
+    done: bool
+
+def getFrameFormat(height: int) -> struct.Struct:
+    return struct.Struct(FRAME_HEADER + 'I' * height)
+
+def decodeFrames(data: bytearray, frameFormat: struct.Struct) -> list[Frame]:
+    frames = []
+    offset = 0
+    while offset + frameFormat.size <= len(data):
+        _, score, flags, block, rotation, x, y, nextBlock, *rows = frameFormat.unpack_from(data, offset)
+        frames.append(Frame(State(tuple(rows), block, rotation, x, y, nextBlock, score), flags & DONE_FLAG != 0))
+        offset += frameFormat.size
+    del data[:offset]
+    return frames
+
+class TimerWheel:
+    def __init__(self, size: int = WHEEL_SIZE):
+        self.tick: int = 0
+        self.__slots: list[set] = [set() for _ in range(size)]
+
+    def schedule(self, item, tick: int):
+        self.__slots[tick % len(self.__slots)].add(item)
+
+    def advance(self) -> list:
+        # items carry their own due tick, so moved and far-future entries are filtered here instead of removed
+        self.tick += 1
+        slot = self.__slots[self.tick % len(self.__slots)]
+        due = [item for item in slot if item.dueTick == self.tick]
+        slot.difference_update(due)
+        slot.difference_update([item for item in slot if item.dueTick < self.tick])
+        return due
+
+class RemoteGame(asyncio.Protocol):
+    def __init__(self, server: 'GameServer'):
+        self.server: GameServer = server
+        self.engine: Engine = Engine(server.width, server.height, random.getrandbits(32))
+        self.transport: asyncio.Transport = None
+        self.downPressed: bool = False
+        self.dueTick: int = 0
+        self.__lastFall: int = server.wheel.tick
+        self.__lastClick: int = server.wheel.tick - server.clickTicks
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.server.add(self)
+
+    def connection_lost(self, exception: Exception):
+        self.server.remove(self)
+
+    def data_received(self, data: bytes):
+        for code in data:
+            self.input(code)
+        self.server.markDirty(self)
+
+    def input(self, code: int):
+        if code & RELEASE_FLAG:
+            if code & ~RELEASE_FLAG == Action.DOWN.value:
+                self.downPressed = False
+                self.schedule()
+            return
+        if code >= len(Action):
+            return
+        action = Action(code)
+        if action == Action.LEFT or action == Action.RIGHT:
+            self.__lastClick = self.server.wheel.tick
+        if action == Action.DOWN:
+            self.downPressed = True
+        self.engine.apply(action)
+        self.schedule()
+
+    def fall(self):
+        self.__lastFall = self.server.wheel.tick
+        self.engine.tick(not self.downPressed)
+        self.schedule()
+
+    def schedule(self):
+        tickDown = self.server.downPressedTickDown if self.downPressed else self.server.tickDown
+        dueTick = max(self.__lastFall + tickDown, self.__lastClick + self.server.clickTicks, self.server.wheel.tick + 1)
+        if dueTick != self.dueTick:
+            self.dueTick = dueTick
+            self.server.wheel.schedule(self, dueTick)
+
+    def restart(self):
+        self.engine.reset(random.getrandbits(32))
+        self.downPressed = False
+        self.__lastFall = self.server.wheel.tick
+        self.schedule()
+
+class GameServer:
+    def __init__(self, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT, tickRate: int = TICK_RATE):
+        self.width: int = width
+        self.height: int = height
+        self.tickTime: float = 1.0 / tickRate
+        self.tickDown: int = toTicks(START_TICK_DOWN, tickRate)
+        self.downPressedTickDown: int = toTicks(DOWN_PRESSED_TICK_DOWN, tickRate)
+        self.clickTicks: int = toTicks(MAX_CLICK_EVENT_TIME, tickRate)
+        self.wheel: TimerWheel = TimerWheel()
+        self.games: set[RemoteGame] = set()
+        self.frames: int = 0
+        self.__frameFormat: struct.Struct = getFrameFormat(height)
+        self.__dirty: set[RemoteGame] = set()
+        self.__flushScheduled: bool = False
+        self.__servers: list[asyncio.AbstractServer] = []
+        self.__ticker: asyncio.Task = None
+
+    async def start(self, host: str = None, port: int = None, path: str = None):
+        loop = asyncio.get_running_loop()
+        if path != None:
+            self.__servers.append(await loop.create_unix_server(lambda: RemoteGame(self), path))
+        if port != None:
+            self.__servers.append(await loop.create_server(lambda: RemoteGame(self), host, port))
+        self.__ticker = asyncio.create_task(self.__tick())
+
+    async def serveForever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self.__servers))
+
+    async def close(self):
+        for server in self.__servers:
+            server.close()
+            await server.wait_closed()
+        if self.__ticker != None:
+            self.__ticker.cancel()
+        for game in list(self.games):
+            game.transport.close()
+
+    def add(self, game: RemoteGame):
+        self.games.add(game)
+        game.schedule()
+        self.markDirty(game)
+
+    def remove(self, game: RemoteGame):
+        self.games.discard(game)
+        self.__dirty.discard(game)
+        game.dueTick = -1
+
+    def markDirty(self, game: RemoteGame):
+        self.__dirty.add(game)
+        if not self.__flushScheduled:
+            self.__flushScheduled = True
+            asyncio.get_running_loop().call_soon(self.__flush)
+
+    async def __tick(self):
+        # one timer for every game: wake once per tick and only touch the games whose gravity is due
+        loop = asyncio.get_running_loop()
+        nextTick = loop.time()
+        while True:
+            nextTick += self.tickTime
+            delay = nextTick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                if delay < -self.tickTime * MAX_CATCH_UP_TICKS:
+                    # after a stall drop the backlog instead of fast-forwarding every game
+                    nextTick = loop.time()
+                await asyncio.sleep(0)
+            for game in self.wheel.advance():
+                game.fall()
+                self.markDirty(game)
+
+    def __flush(self):
+        # frames of one loop iteration go out together, one write per game
+        self.__flushScheduled = False
+        for game in self.__dirty:
+            if game.transport.is_closing():
+                continue
+            self.frames += 1
+            engine = game.engine
+            state = engine.getState()
+            game.transport.write(self.__frameFormat.pack(self.__frameFormat.size - 2, state.score, DONE_FLAG if engine.done else 0, state.block, state.rotation, state.x, state.y, state.nextBlock, *state.rows))
+            if engine.done:
+                game.restart()
+        self.__dirty.clear()
+
+async def serve(host: str = None, port: int = None, path: str = None):
+    server = GameServer()
+    await server.start(host, port, path)
+    try:
+        await server.serveForever()
+    finally:
+        await server.close()
@@ -0,0 +1,69 @@
+import random
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Action, Engine
+from game_logic.scheduler import GravityTimer
+
+RELEASE_FLAG = 0x8
+
+class Session:
+    def __init__(self, seed: int = None, autoPlayer = None, autoPlay: bool = False, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT):
+        self.autoPlayer = autoPlayer
+        # holding down blocks the next spawn for people, but not for the bot
+        self.autoPlay: bool = autoPlay or autoPlayer != None
+        self.engine: Engine = Engine(width, height)
+        self.gravity: GravityTimer = GravityTimer()
+        self.restart(seed)
+
+    def restart(self, seed: int = None):
+        self.seed: int = seed if seed != None else random.getrandbits(32)
+        self.engine.reset(self.seed)
+        self.gravity = GravityTimer()
+        self.ticks: int = 0
+        # (tick, input code) in the order they were applied
+        self.events: list[tuple[int, int]] = []
+        # a restored snapshot cannot be reproduced from the seed and the inputs
+        self.restored: bool = False
+
+    def restore(self, snapshot: bytes):
+        self.engine.restore(snapshot)
+        self.gravity = GravityTimer()
+        self.restored = True
+
+    def press(self, action: Action):
+        self.events.append((self.ticks, action.value))
+        if action == Action.LEFT or action == Action.RIGHT:
+            self.gravity.click()
+        if action == Action.DOWN:
+            self.gravity.downPressed = True
+        self.engine.apply(action)
+
+    def release(self, action: Action):
+        if action != Action.DOWN:
+            return
+        self.events.append((self.ticks, action.value | RELEASE_FLAG))
+        self.gravity.downPressed = False
+
+    def input(self, code: int):
+        if code & RELEASE_FLAG:
+            self.release(Action(code & ~RELEASE_FLAG))
+        else:
+            self.press(Action(code))
+
+    def update(self):
+        self.__autoPlay()
+        if self.gravity.update():
+            self.engine.tick(self.autoPlay or not self.gravity.downPressed)
+        self.ticks += 1
+
+    def __autoPlay(self):
+        if self.autoPlayer == None or self.engine.done:
+            return
+        action = self.autoPlayer.getAction(self.engine)
+        if action != None:
+            self.press(action)
+            return
+        # once the piece is lined up let it fall at soft drop speed
+        hasBlock = self.engine.matrix.hasBlock()
+        if hasBlock and not self.gravity.downPressed:
+            self.press(Action.DOWN)
+        elif not hasBlock and self.gravity.downPressed:
+            self.release(Action.DOWN)
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+BUFFER_CAPACITY = 4096
+FLUSH_INTERVAL = 0.25
+FSYNC_INTERVAL = 5.0
+MAX_FILE_BYTES = 8 * 1024 * 1024
+MAX_BACKUPS = 5
+# events encoded between yields of the GIL, so a large batch never stalls the frame for a whole switch interval
+ENCODE_SLICE = 64
+
+class Telemetry:
+    def __init__(self, path: str, capacity: int = BUFFER_CAPACITY, maxBytes: int = MAX_FILE_BYTES, backups: int = MAX_BACKUPS, flushInterval: float = FLUSH_INTERVAL, fsyncInterval: float = FSYNC_INTERVAL):
+        self.path: str = path
+        # counters are only written by one thread each: emitted and dropped by the game, the rest by the writer
+        self.emitted: int = 0
+        self.dropped: int = 0
+        self.written: int = 0
+        self.failedWrites: int = 0
+        self.rotations: int = 0
+        self.__capacity: int = capacity
+        self.__maxBytes: int = maxBytes
+        self.__backups: int = backups
+        self.__flushInterval: float = flushInterval
+        self.__fsyncInterval: float = fsyncInterval
+        # (wall time, event name, fields); appends and pops are atomic, so the game never waits for the writer
+        self.__events: deque[tuple[float, str, dict]] = deque()
+        self.__reportedDrops: int = 0
+        self.__file = open(path, 'ab')
+        self.__size: int = self.__file.tell()
+        self.__stop: threading.Event = threading.Event()
+        self.__thread: threading.Thread = threading.Thread(target = self.__run, name = 'telemetry', daemon = True)
+        self.__thread.start()
+
+    def emit(self, name: str, **fields):
+        # called on the frame: no I/O, no locks, and a full buffer drops the event instead of waiting
+        if len(self.__events) >= self.__capacity:
+            self.dropped += 1
+            return
+        self.emitted += 1
+        self.__events.append((time.time(), name, fields))
+
+    def close(self):
+        if self.__stop.is_set():
+            return
+        self.__stop.set()
+        self.__thread.join()
+
+    def __run(self):
+        lastSync = time.monotonic()
+        while not self.__stop.wait(self.__flushInterval):
+            self.__drain()
+            if time.monotonic() - lastSync >= self.__fsyncInterval:
+                self.__sync()
+                lastSync = time.monotonic()
+        self.__drain()
+        self.__sync()
+        self.__file.close()
+
+    def __drain(self):
+        events = self.__events
+        count = len(events)
+        lines = []
+        for index in range(count):
+            timestamp, name, fields = events.popleft()
+            lines.append(json.dumps({'t': round(timestamp, 3), 'event': name, **fields}, separators = (',', ':')))
+            if index % ENCODE_SLICE == ENCODE_SLICE - 1:
+                time.sleep(0)
+        dropped = self.dropped
+        if dropped != self.__reportedDrops:
+            lines.append(json.dumps({'t': round(time.time(), 3), 'event': 'dropped', 'count': dropped - self.__reportedDrops, 'total': dropped}, separators = (',', ':')))
+            self.__reportedDrops = dropped
+        if len(lines) == 0:
+            return
+
+        data = ('\n'.join(lines) + '\n').encode()
+        if self.__size > 0 and self.__size + len(data) > self.__maxBytes:
+            try:
+                self.__rotate()
+            except (OSError, ValueError):
+                # the log grows past maxBytes until a rotation succeeds, rather than losing the events
+                self.failedWrites += 1
+        try:
+            self.__file.write(data)
+            self.__file.flush()
+        except (OSError, ValueError):
+            # a full or failing card must not take the game down, the batch is lost and counted
+            self.failedWrites += 1
+            return
+        self.__size += len(data)
+        self.written += count
+
+    def __sync(self):
+        try:
+            os.fsync(self.__file.fileno())
+        except (OSError, ValueError):
+            self.failedWrites += 1
+
+    def __rotate(self):
+        # path -> path.1 -> ... -> path.backups, the oldest one is dropped
+        self.__sync()
+        self.__file.close()
+        try:
+            for index in range(self.__backups - 1, 0, -1):
+                source = self.path + '.' + str(index)
+                if os.path.exists(source):
+                    os.replace(source, self.path + '.' + str(index + 1))
+            if self.__backups > 0:
+                os.replace(self.path, self.path + '.1')
+            else:
+                os.remove(self.path)
+        finally:
+            # reopened whether or not the renames went through, a closed file would fail every later write
+            self.__file = open(self.path, 'ab')
+            self.__size = self.__file.tell()
+        self.rotations += 1
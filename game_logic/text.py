@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from functools import lru_cache
+import pygame
+
+MAX_CACHED_TEXTS = 32
+
+@lru_cache(maxsize = None)
+def getFont(name: str, size: int, bold: bool = False) -> pygame.font.Font:
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.SysFont(name, size, bold = bold)
+
+class TextRenderer:
+    def __init__(self, name: str, size: int, bold: bool = False, color: tuple[int, int, int] = (0, 0, 0), capacity: int = MAX_CACHED_TEXTS):
+        self.color: tuple[int, int, int] = color
+        self.__font: pygame.font.Font = None
+        self.__fontKey: tuple[str, int, bool] = (name, size, bold)
+        self.__capacity: int = capacity
+        self.__surfaces: OrderedDict[str, pygame.Surface] = OrderedDict()
+
+    def render(self, text: str) -> pygame.Surface:
+        surface = self.__surfaces.get(text)
+        if surface != None:
+            self.__surfaces.move_to_end(text)
+            return surface
+
+        if self.__font == None:
+            self.__font = getFont(*self.__fontKey)
+        surface = self.__font.render(text, False, self.color)
+        self.__surfaces[text] = surface
+        if len(self.__surfaces) > self.__capacity:
+            self.__surfaces.popitem(last = False)
+        return surface
+
+    def size(self, text: str) -> tuple[int, int]:
+        return self.render(text).get_size()
@@ -0,0 +1,269 @@
+import json
+import math
+import os
+import random
+import statistics
+import time
+from typing import Callable, NamedTuple
+from game_logic.bot import Bot, Weights
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, Engine
+from game_logic.rng import mix64
+
+# bots survive indefinitely on the default board, so every game ends after this many pieces
+MAX_PIECES = 500
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SECONDS = 10.0
+# chunks per worker, enough to balance uneven game lengths while keeping the pickling overhead low
+CHUNKS_PER_WORKER = 4
+POPULATION = 16
+# share of each generation kept as parents of the next one
+ELITE_SHARE = 0.25
+MUTATION_SIGMA = 0.2
+MUTATION_DECAY = 0.9
+
+# name -> factory of a placement policy: anything with choose(matrix, block, nextBlock) -> Placement
+POLICIES: dict[str, Callable[[Weights], Bot]] = {
+    'greedy': lambda weights: Bot(weights),
+    'lookahead': lambda weights: Bot(weights, lookahead = True),
+}
+
+class PolicySpec(NamedTuple):
+    name: str
+    weights: Weights
+
+    def getLabel(self) -> str:
+        return self.name + ':' + ','.join('%.4g' % weight for weight in self.weights)
+
+class GameResult(NamedTuple):
+    seed: int
+    score: int
+    lines: int
+    pieces: int
+    # reached the piece limit instead of topping out
+    survived: bool
+
+class Summary(NamedTuple):
+    label: str
+    games: int
+    meanScore: float
+    # half width of the 95% confidence interval of meanScore
+    scoreError: float
+    medianScore: float
+    minScore: int
+    maxScore: int
+    meanLines: float
+    meanPieces: float
+    survival: float
+    # seeds on which this contestant scored more than every other one
+    wins: int
+
+class Config(NamedTuple):
+    games: int
+    seed: int
+    maxPieces: int = MAX_PIECES
+    width: int = CELL_COUNT_WIDTH
+    height: int = CELL_COUNT_HEIGHT
+
+def parsePolicy(text: str) -> PolicySpec:
+    # "name" or "name:height,lines,holes,bumpiness"
+    name, _, weights = text.partition(':')
+    if name not in POLICIES:
+        raise ValueError('unknown policy ' + name + ', expected one of ' + ', '.join(POLICIES))
+    if weights == '':
+        return PolicySpec(name, Weights())
+    values = [float(value) for value in weights.split(',')]
+    if len(values) != len(Weights._fields):
+        raise ValueError('policy weights need ' + str(len(Weights._fields)) + ' values: ' + ', '.join(Weights._fields))
+    return PolicySpec(name, Weights(*values))
+
+#region Games
+_policies: dict[PolicySpec, Bot] = {}
+
+def _getPolicy(spec: PolicySpec) -> Bot:
+    # built once per worker process, tasks only carry the spec
+    policy = _policies.get(spec)
+    if policy == None:
+        policy = _policies[spec] = POLICIES[spec.name](spec.weights)
+    return policy
+
+def playGame(spec: PolicySpec, seed: int, maxPieces: int = MAX_PIECES, width: int = CELL_COUNT_WIDTH, height: int = CELL_COUNT_HEIGHT) -> GameResult:
+    policy = _getPolicy(spec)
+    engine = Engine(width, height, seed)
+    engine.placeBlock()
+    lines = 0
+    pieces = 0
+    while not engine.done and pieces < maxPieces:
+        matrix = engine.matrix
+        placement = policy.choose(matrix, matrix.currentBlock, engine.nextBlock)
+        # the same inputs the auto player presses, without waiting for gravity between them
+        for action, row in placement.actions:
+            while matrix.hasBlock() and matrix.getBlockPosition().y < row:
+                engine.moveDown()
+            engine.apply(action)
+        if engine.hardDrop() > 0:
+            lines += engine.matrix.lastLines
+        pieces += 1
+    return GameResult(seed, engine.score, lines, pieces, not engine.done)
+
+def playGames(spec: PolicySpec, seeds: tuple[int, ...], maxPieces: int, width: int, height: int) -> list[tuple[int, int, int, int, bool]]:
+    # plain tuples keep the results sent back to the parent small
+    return [tuple(playGame(spec, seed, maxPieces, width, height)) for seed in seeds]
+
+def runGames(tasks: list[tuple[int, PolicySpec, tuple[int, ...]]], config: Config, workers: int, onResults: Callable[[int, list[GameResult]], None]):
+    # tasks are (key, policy, seeds); onResults(key, results) runs in this process as chunks finish
+    if workers <= 1:
+        for key, spec, seeds in tasks:
+            for seed in seeds:
+                onResults(key, [playGame(spec, seed, config.maxPieces, config.width, config.height)])
+        return
+
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    size = max(1, math.ceil(sum(len(seeds) for _, _, seeds in tasks) / (workers * CHUNKS_PER_WORKER)))
+    chunks = []
+    for key, spec, seeds in tasks:
+        chunks += [(key, spec, seeds[start:start + size]) for start in range(0, len(seeds), size)]
+    executor = ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('spawn'))
+    try:
+        pending = {executor.submit(playGames, spec, seeds, config.maxPieces, config.width, config.height): key for key, spec, seeds in chunks}
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when = FIRST_COMPLETED)
+            for future in done:
+                onResults(pending.pop(future), [GameResult(*result) for result in future.result()])
+    finally:
+        executor.shutdown(cancel_futures = True)
+#endregion
+
+#region Statistics
+def summarize(label: str, results: list[GameResult], wins: int = 0) -> Summary:
+    scores = [result.score for result in results]
+    error = 1.96 * statistics.stdev(scores) / math.sqrt(len(scores)) if len(scores) > 1 else 0.0
+    return Summary(label, len(results), statistics.fmean(scores), error, statistics.median(scores), min(scores), max(scores),
+        statistics.fmean(result.lines for result in results), statistics.fmean(result.pieces for result in results),
+        sum(result.survived for result in results) / len(results), wins)
+
+def countWins(results: list[list[GameResult]]) -> list[int]:
+    # contestants played the same seeds, a seed is won by a strictly highest score
+    scores = [{result.seed: result.score for result in contestant} for contestant in results]
+    wins = [0] * len(results)
+    for seed in scores[0]:
+        seedScores = [contestant.get(seed) for contestant in scores]
+        if None in seedScores:
+            continue
+        best = max(seedScores)
+        if seedScores.count(best) == 1:
+            wins[seedScores.index(best)] += 1
+    return wins
+
+def getLines(summaries: list[Summary]) -> list[str]:
+    lines = ['%-40s %6s %10s %8s %8s %8s %8s %8s %5s' % ('policy', 'games', 'score', '+-95%', 'median', 'lines', 'pieces', 'survive', 'wins')]
+    for summary in summaries:
+        lines.append('%-40s %6d %10.1f %8.1f %8.1f %8.1f %8.1f %7.0f%% %5d' % (summary.label[:40], summary.games, summary.meanScore, summary.scoreError,
+            summary.medianScore, summary.meanLines, summary.meanPieces, summary.survival * 100, summary.wins))
+    return lines
+#endregion
+
+#region Checkpoints
+class Checkpoint:
+    # finished games by contestant key and the tuning state, rewritten atomically so an interrupted run resumes from it
+    def __init__(self, path: str, config: Config, setup: dict):
+        self.path: str = path
+        self.config: Config = config
+        # whatever else has to match for the results to be reused, like the contestants
+        self.setup: dict = setup
+        self.results: dict[int, list[GameResult]] = {}
+        self.state: dict = {}
+        self.__saved: float = time.monotonic()
+        if path == None or not os.path.exists(path):
+            return
+        with open(path) as file:
+            data = json.load(file)
+        if data.get('version') != CHECKPOINT_VERSION or Config(**data['config']) != config or data['setup'] != setup:
+            raise ValueError('checkpoint ' + path + ' was written for different settings')
+        self.results = {int(key): [GameResult(*result) for result in results] for key, results in data['results'].items()}
+        self.state = data['state']
+
+    def add(self, key: int, results: list[GameResult]):
+        self.results.setdefault(key, []).extend(results)
+        if time.monotonic() - self.__saved >= CHECKPOINT_SECONDS:
+            self.save()
+
+    def getMissingSeeds(self, key: int, seeds: tuple[int, ...]) -> tuple[int, ...]:
+        played = set(result.seed for result in self.results.get(key, ()))
+        return tuple(seed for seed in seeds if seed not in played)
+
+    def save(self):
+        self.__saved = time.monotonic()
+        if self.path == None:
+            return
+        data = {'version': CHECKPOINT_VERSION, 'config': self.config._asdict(), 'setup': self.setup, 'state': self.state,
+            'results': {str(key): [list(result) for result in results] for key, results in self.results.items()}}
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(data, file, separators = (',', ':'))
+        os.replace(temporary, self.path)
+#endregion
+
+def getSeeds(config: Config, generation: int = 0) -> tuple[int, ...]:
+    start = config.seed + generation * config.games
+    return tuple(range(start, start + config.games))
+
+def runTournament(specs: list[PolicySpec], config: Config, workers: int = 0, checkpointPath: str = None) -> list[Summary]:
+    checkpoint = Checkpoint(checkpointPath, config, {'contestants': [spec.getLabel() for spec in specs]})
+    seeds = getSeeds(config)
+    tasks = [(key, spec, checkpoint.getMissingSeeds(key, seeds)) for key, spec in enumerate(specs)]
+    try:
+        runGames([task for task in tasks if len(task[2]) > 0], config, workers, checkpoint.add)
+    finally:
+        checkpoint.save()
+    results = [sorted(checkpoint.results[key]) for key in range(len(specs))]
+    wins = countWins(results)
+    return [summarize(spec.getLabel(), results[key], wins[key]) for key, spec in enumerate(specs)]
+
+#region Tuning
+def normalize(weights: list[float]) -> Weights:
+    # only the ranking of placements matters, so weight vectors are compared at unit length
+    length = math.sqrt(sum(weight * weight for weight in weights)) or 1.0
+    return Weights(*(weight / length for weight in weights))
+
+def breed(parents: list[Weights], size: int, generation: int, seed: int) -> list[Weights]:
+    # parents survive unchanged, the rest are gaussian mutations of random parents with a shrinking step
+    generator = random.Random(mix64(seed + generation))
+    sigma = MUTATION_SIGMA * MUTATION_DECAY ** generation
+    children = list(parents)
+    while len(children) < size:
+        parent = generator.choice(parents)
+        children.append(normalize([weight + generator.gauss(0.0, sigma) for weight in parent]))
+    return children
+
+def tune(name: str, generations: int, config: Config, population: int = POPULATION, workers: int = 0, checkpointPath: str = None, report: Callable[[int, Summary], None] = None) -> Weights:
+    # every individual of a generation plays the same fresh seeds, the best share becomes the parents of the next one
+    if generations < 1:
+        raise ValueError('tuning needs at least one generation')
+    checkpoint = Checkpoint(checkpointPath, config, {'tune': name, 'population': population})
+    state = checkpoint.state
+    if 'population' not in state:
+        # the default weights and mutations of them
+        state.update(generation = 0, population = [list(weights) for weights in breed([normalize(list(Weights()))], population, 0, config.seed)], best = None)
+    try:
+        while state['generation'] < generations:
+            generation = state['generation']
+            specs = [PolicySpec(name, Weights(*weights)) for weights in state['population']]
+            seeds = getSeeds(config, generation)
+            tasks = [(key, spec, checkpoint.getMissingSeeds(key, seeds)) for key, spec in enumerate(specs)]
+            runGames([task for task in tasks if len(task[2]) > 0], config, workers, checkpoint.add)
+
+            summaries = [summarize(spec.getLabel(), checkpoint.results[key]) for key, spec in enumerate(specs)]
+            ranking = sorted(range(len(specs)), key = lambda key: summaries[key].meanScore, reverse = True)
+            best = ranking[0]
+            if report != None:
+                report(generation, summaries[best])
+            parents = [specs[key].weights for key in ranking[:max(1, round(len(specs) * ELITE_SHARE))]]
+            state.update(generation = generation + 1, population = [list(weights) for weights in breed(parents, population, generation + 1, config.seed)],
+                best = {'weights': list(specs[best].weights), 'meanScore': summaries[best].meanScore})
+            checkpoint.results = {}
+            checkpoint.save()
+    finally:
+        checkpoint.save()
+    return Weights(*state['best']['weights'])
+#endregion
@@ -1,5 +1,148 @@
-from game_logic.game import Game
+import argparse
+import sys
+
+def parseArguments() -> argparse.Namespace:
+    from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, MIN_BOARD_SIZE, MAX_BOARD_SIZE
+    from game_logic.layout import MIN_CELL_SIZE
+    from game_logic.scheduler import TICK_RATE
+    parser = argparse.ArgumentParser(description = 'Tetris')
+    parser.add_argument('--autoplay', action = 'store_true', help = 'let the bot play')
+    parser.add_argument('--lookahead', action = 'store_true', help = 'bot also searches placements of the next block')
+    parser.add_argument('--workers', type = int, default = 0, help = 'processes used for the lookahead search, --export, --tournament or --tune')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the piece stream')
+    parser.add_argument('--width', type = int, default = CELL_COUNT_WIDTH, help = 'board width in cells, up to %d' % MAX_BOARD_SIZE)
+    parser.add_argument('--height', type = int, default = CELL_COUNT_HEIGHT, help = 'board height in cells, up to %d' % MAX_BOARD_SIZE)
+    parser.add_argument('--record', metavar = 'FILE', help = 'save a replay of the game on exit')
+    parser.add_argument('--replay', metavar = 'FILE', help = 'watch a recorded replay')
+    parser.add_argument('--profile', metavar = 'FILE', help = 'time every frame phase and write the percentiles on exit (F3 shows them)')
+    parser.add_argument('--cprofile', metavar = 'FILE', help = 'write cProfile stats of the first seconds of the game (F4 captures again)')
+    parser.add_argument('--cprofile-seconds', type = float, default = 10.0, help = 'length of a cProfile capture')
+    parser.add_argument('--track-allocations', action = 'store_true', help = 'count allocations per frame phase with tracemalloc, shown by F3 and written by --profile')
+    parser.add_argument('--gc', choices = ('idle', 'auto'), default = 'idle', help = 'freeze startup objects and collect garbage between ticks, or leave collection to Python')
+    parser.add_argument('--telemetry', metavar = 'FILE', help = 'stream gameplay events and frame stats to a JSON lines log')
+    parser.add_argument('--snapshot', metavar = 'FILE', default = 'tetris.snapshot', help = 'file F5 saves the game to and F9 loads it from')
+    parser.add_argument('--serve', metavar = 'ADDRESS', help = 'host games for network clients on host:port or a unix socket path')
+    parser.add_argument('--verify', metavar = 'FILE', help = 're-simulate a replay headlessly and check its score')
+    parser.add_argument('--export', metavar = 'DIR', help = 'render the replay files given as arguments into DIR headlessly')
+    parser.add_argument('--format', choices = ('raw', 'png'), default = 'raw', help = 'raw rgb24 video file or PNG sequence per exported game')
+    parser.add_argument('--fps', type = int, default = TICK_RATE, help = 'frames per second of exported games, a divisor of %d' % TICK_RATE)
+    parser.add_argument('--cell-size', type = int, default = MIN_CELL_SIZE, help = 'pixels per cell in exported frames')
+    parser.add_argument('--highlight', metavar = 'SECONDS', type = float, help = 'only export a clip of this length around the biggest line clear')
+    parser.add_argument('--thumbnails', action = 'store_true', help = 'also save the last exported frame of every game as a PNG')
+    parser.add_argument('--tournament', metavar = 'GAMES', type = int, help = 'play GAMES seeds with every --policy headlessly and compare them')
+    parser.add_argument('--policy', action = 'append', metavar = 'NAME[:WEIGHTS]', help = 'contestant of --tournament: greedy or lookahead, optionally with height,lines,holes,bumpiness weights')
+    parser.add_argument('--tune', metavar = 'GENERATIONS', type = int, help = 'evolve the weights of the first --policy, every individual plays --tournament seeds per generation')
+    parser.add_argument('--population', type = int, default = 16, help = 'weight vectors per --tune generation')
+    parser.add_argument('--max-pieces', type = int, default = 500, help = 'pieces after which a tournament game ends')
+    parser.add_argument('--checkpoint', metavar = 'FILE', help = 'keep finished tournament games in FILE and resume from it')
+    parser.add_argument('replays', nargs = '*', metavar = 'REPLAY', help = 'replay files for --export')
+    arguments = parser.parse_args()
+    if arguments.tune != None and (arguments.tune < 1 or arguments.tournament == None):
+        parser.error('--tune needs at least one generation and --tournament GAMES per individual')
+    for size in (arguments.width, arguments.height):
+        if not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+            parser.error('board sizes must be between %d and %d cells' % (MIN_BOARD_SIZE, MAX_BOARD_SIZE))
+    if arguments.fps < 1 or arguments.fps > TICK_RATE or TICK_RATE % arguments.fps != 0:
+        parser.error('--fps must be one of ' + ', '.join(str(fps) for fps in range(1, TICK_RATE + 1) if TICK_RATE % fps == 0))
+    return arguments
+
+def verifyReplay(path: str) -> int:
+    from game_logic import replay
+    recorded = replay.load(path)
+    score = replay.simulate(recorded).engine.score
+    print('score', score, 'recorded', recorded.score, 'ok' if score == recorded.score else 'MISMATCH')
+    return 0 if score == recorded.score else 1
+
+def exportReplays(arguments: argparse.Namespace) -> int:
+    import time
+    from game_logic.framebuffer import exportFiles
+    start = time.perf_counter()
+    results = exportFiles(arguments.replays, arguments.export, arguments.workers, format = arguments.format, fps = arguments.fps, cellSize = arguments.cell_size, highlight = arguments.highlight, thumbnail = arguments.thumbnails)
+    for result in results:
+        print(result.path, result.frames, 'frames', 'score', result.score)
+    print(len(results), 'games,', sum(result.frames for result in results), 'frames in %.1fs' % (time.perf_counter() - start))
+    return 0
+
+def playTournament(arguments: argparse.Namespace) -> int:
+    from game_logic import tournament
+    config = tournament.Config(arguments.tournament, arguments.seed or 0, arguments.max_pieces, arguments.width, arguments.height)
+    try:
+        specs = [tournament.parsePolicy(text) for text in arguments.policy or ['greedy']]
+        if arguments.tune != None:
+            report = lambda generation, summary: print('generation', generation, *tournament.getLines([summary])[1:])
+            weights = tournament.tune(specs[0].name, arguments.tune, config, arguments.population, arguments.workers, arguments.checkpoint, report)
+            print('best', tournament.PolicySpec(specs[0].name, weights).getLabel())
+            return 0
+        for line in tournament.getLines(tournament.runTournament(specs, config, arguments.workers, arguments.checkpoint)):
+            print(line)
+    except ValueError as error:
+        print(error)
+        return 2
+    except KeyboardInterrupt:
+        print('interrupted' + (', resume from ' + arguments.checkpoint if arguments.checkpoint else ''))
+        return 130
+    return 0
+
+def serveGames(address: str) -> int:
+    import asyncio
+    from game_logic.server import serve
+    try:
+        if '/' in address:
+            asyncio.run(serve(path = address))
+        else:
+            host, port = address.rsplit(':', 1)
+            asyncio.run(serve(host, int(port)))
+    except KeyboardInterrupt:
+        pass
+    return 0
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    arguments = parseArguments()
+    if arguments.verify:
+        sys.exit(verifyReplay(arguments.verify))
+    if arguments.serve:
+        sys.exit(serveGames(arguments.serve))
+    if arguments.export:
+        sys.exit(exportReplays(arguments))
+    if arguments.tournament != None:
+        sys.exit(playTournament(arguments))
+
+    from game_logic.game import Game
+    from game_logic import replay
+    autoPlayer = None
+    if arguments.autoplay:
+        from game_logic.bot import AutoPlayer, Bot
+        autoPlayer = AutoPlayer(Bot(lookahead = arguments.lookahead, workers = arguments.workers))
+
+    recorded = replay.load(arguments.replay) if arguments.replay else None
+    profiler = None
+    if arguments.profile or arguments.track_allocations:
+        from game_logic.profiler import FrameProfiler
+        profiler = FrameProfiler()
+    gcPolicy = None
+    if arguments.track_allocations or arguments.gc == 'idle':
+        from game_logic.memory import AllocationTracker, GcPolicy
+        if arguments.track_allocations:
+            profiler.allocations = AllocationTracker()
+        if arguments.gc == 'idle':
+            gcPolicy = GcPolicy()
+    telemetry = None
+    if arguments.telemetry:
+        from game_logic.telemetry import Telemetry
+        telemetry = Telemetry(arguments.telemetry)
+    try:
+        game = Game(autoPlayer, arguments.seed, recorded, profiler, arguments.cprofile, arguments.cprofile_seconds, arguments.width, arguments.height, telemetry, gcPolicy)
+        game.snapshotPath = arguments.snapshot
+        game.run()
+        if arguments.record:
+            try:
+                replay.save(game.getReplay(), arguments.record)
+            except replay.ReplayError as error:
+                print('replay not saved:', error)
+        if arguments.profile:
+            game.profiler.dump(arguments.profile)
+    finally:
+        if autoPlayer != None:
+            autoPlayer.close()
+        if telemetry != None:
+            telemetry.close()
@@ -0,0 +1,19 @@
+import random
+from codesets.blocks import CellType, Color
+from codesets.colors import GAME_PLANE_COLOR
+from game_logic.matirix import Board, Matrix
+
+def getRandomMatrix(generator: random.Random, width: int, height: int, stackRows: int) -> Matrix:
+    # a ragged stack in the bottom stackRows rows, cells thin out towards the top so there are overhangs and holes but no full rows
+    matrix = Matrix(width, height, Color(GAME_PLANE_COLOR), generator)
+    fullRow = (1 << width) - 1
+    rows = [0] * height
+    for row in range(stackRows):
+        density = 0.9 - 0.7 * row / stackRows
+        mask = sum(1 << x for x in range(width) if generator.random() < density)
+        if mask == fullRow:
+            mask &= ~(1 << generator.randrange(width))
+        rows[height - 1 - row] = mask
+    colors = tuple(bytes(CellType.LINE.value if row >> x & 1 else 0 for x in range(width)) for row in rows)
+    matrix.setBoard(Board(tuple(rows), colors, 0, 0, 0, 0))
+    return matrix
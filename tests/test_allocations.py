@@ -0,0 +1,67 @@
+import os
+import tracemalloc
+from typing import Callable
+from game_logic.engine import Engine
+from game_logic.memory import AllocationTracker
+
+TICKS = 5000
+WARM_UP_TICKS = 2000
+# a lock replaces the color rows it touched and a restart builds a new board, nothing else may outlive a tick
+MAX_LIVE_BLOCKS = 100
+# per tick, above what an empty frame shows with the tracker's own bookkeeping
+TRACKED_TICKS = 3000
+MAX_TICK_BYTES = 256
+MAX_TICK_BLOCKS = 8
+# a restart builds a new board and a lock may clear lines, the worst tick is bounded but not free
+MAX_WORST_TICK_BYTES = 8192
+SOURCES = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), directory, '*') for directory in ('game_logic', 'codesets')]
+
+def runTicks(engine: Engine, count: int):
+    for index in range(count):
+        engine.tick()
+        if engine.done:
+            engine.reset(index)
+
+def trackFrames(frame: Callable[[], None], frames: int) -> AllocationTracker:
+    tracker = AllocationTracker(frames, snapshotFrames = frames + 1)
+    tracker.start()
+    try:
+        for _ in range(frames):
+            frame()
+            tracker.mark('tick')
+            tracker.endFrame()
+    finally:
+        tracker.stop()
+    return tracker
+
+def countLiveBlocks(ticks: int) -> int:
+    engine = Engine(seed = 0)
+    # shared positions, footprints and shape tables are built once and are not what is measured
+    runTicks(engine, WARM_UP_TICKS)
+    tracemalloc.start()
+    try:
+        runTicks(engine, ticks)
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, source) for source in SOURCES])
+    finally:
+        tracemalloc.stop()
+    return sum(statistic.count for statistic in snapshot.statistics('filename'))
+
+def test_gravity_ticks_leave_no_allocations_behind():
+    short = countLiveBlocks(TICKS // 10)
+    long = countLiveBlocks(TICKS)
+    assert long < MAX_LIVE_BLOCKS, long
+    # live blocks depend on the board, not on how many ticks ran
+    assert long <= short + MAX_LIVE_BLOCKS // 2, (short, long)
+
+def test_steady_ticks_stay_under_an_allocation_ceiling():
+    engine = Engine(seed = 0)
+    runTicks(engine, WARM_UP_TICKS)
+    idle = trackFrames(lambda: None, TRACKED_TICKS)
+    ticks = trackFrames(lambda: runTicks(engine, 1), TRACKED_TICKS)
+    idleBytes = idle.transientBytes.getPercentiles((95, 100))
+    tickBytes = ticks.transientBytes.getPercentiles((95, 100))
+    assert tickBytes[0] <= idleBytes[0] + MAX_TICK_BYTES, (idleBytes, tickBytes)
+    assert tickBytes[1] <= idleBytes[1] + MAX_WORST_TICK_BYTES, (idleBytes, tickBytes)
+    idleBlocks = idle.phases['tick'].getPercentiles((99,))[0]
+    tickBlocks = ticks.phases['tick'].getPercentiles((99,))[0]
+    assert tickBlocks <= idleBlocks + MAX_TICK_BLOCKS, (idleBlocks, tickBlocks)
@@ -0,0 +1,84 @@
+import random
+import numpy as np
+import pytest
+from game_logic.batch import BatchEngine
+from game_logic.engine import Action, Engine
+
+BOARDS = 8
+STEPS = 3000
+# hard drops and soft drops often enough that games end and the narrow board clears lines
+ACTION_WEIGHTS = {Action.NONE: 1, Action.LEFT: 2, Action.RIGHT: 2, Action.ROTATE_LEFT: 1, Action.ROTATE_RIGHT: 1, Action.DOWN: 3, Action.SAVE: 1, Action.HARD_DROP: 2}
+
+def recordSpawns(engine: Engine, spawns: list[tuple[int, int, int]]):
+    place = engine.matrix.place
+    def recordingPlace(block) -> bool:
+        placed = place(block)
+        spawns.append((block.type.value, block.getRotation().type.value - 1, engine.matrix.getBlockPosition().x))
+        return placed
+    engine.matrix.place = recordingPlace
+
+def steerSpawns(batch: BatchEngine, engines: list[Engine], spawns: list[list[tuple[int, int, int]]]):
+    # the batch draws pieces from its own generator, so every spawn takes the piece, rotation and column its Engine picked;
+    # which boards spawn, with what block and whether it fits is still up to the batch
+    fits = batch._BatchEngine__fits
+
+    def steeredPlace(index: np.ndarray, block: np.ndarray, rotation: np.ndarray):
+        x = np.zeros(len(index), dtype = np.int64)
+        for position, board in enumerate(index):
+            expected = spawns[board].pop(0)
+            assert (block[position], rotation[position]) == expected[:2], board
+            x[position] = expected[2]
+        batch.block[index] = block
+        batch.rotation[index] = rotation
+        batch.x[index] = x
+        batch.y[index] = 0
+        batch.done[index[~fits(index, block, rotation, x, np.zeros(len(index), dtype = np.int64))]] = True
+
+    def steeredPlaceBlock(index: np.ndarray):
+        if len(index) == 0:
+            return
+        batch.canSave[index] = True
+        steeredPlace(index, batch.nextBlock[index], np.array([spawns[board][0][1] if len(spawns[board]) > 0 else -1 for board in index], dtype = np.int64))
+        batch.nextBlock[index] = [spawns[board][0][0] if len(spawns[board]) > 0 else engines[board].nextBlock.type.value for board in index]
+
+    batch._BatchEngine__place = steeredPlace
+    batch._BatchEngine__placeBlock = steeredPlaceBlock
+
+def assertSameState(batch: BatchEngine, engines: list[Engine]):
+    boards = batch.getBoards(withBlocks = False)
+    for board, engine in enumerate(engines):
+        matrix = engine.matrix
+        assert np.array_equal(boards[board], np.frombuffer(matrix.getCellTypes(), dtype = np.uint8).reshape(engine.height, engine.width)), board
+        assert (batch.score[board], batch.done[board]) == (engine.score, engine.done), board
+        block = matrix.currentBlock
+        if block == None:
+            assert batch.block[board] == 0, board
+            continue
+        position = matrix.getBlockPosition()
+        assert (batch.block[board], batch.rotation[board], batch.x[board], batch.y[board]) == (block.type.value, block.getRotation().type.value - 1, position.x, position.y), board
+
+@pytest.mark.parametrize('width, height', [(10, 22), (4, 22)])
+@pytest.mark.parametrize('seed', range(2))
+def test_batch_plays_like_engines(seed: int, width: int, height: int):
+    engines = [Engine(width, height, seed = seed * BOARDS + board) for board in range(BOARDS)]
+    spawns = [[] for _ in engines]
+    for engine, engineSpawns in zip(engines, spawns):
+        recordSpawns(engine, engineSpawns)
+    batch = BatchEngine(BOARDS, width, height, seed)
+    batch.nextBlock[:] = [engine.nextBlock.type.value for engine in engines]
+    steerSpawns(batch, engines, spawns)
+
+    generator = random.Random(seed)
+    for _ in range(STEPS):
+        actions = generator.choices(list(ACTION_WEIGHTS), list(ACTION_WEIGHTS.values()), k = BOARDS)
+        rewards = [engine.step(action)[1] for engine, action in zip(engines, actions)]
+        _, batchRewards, done = batch.step(np.array([action.value for action in actions]))
+        assert list(batchRewards) == rewards
+        assert all(len(engineSpawns) == 0 for engineSpawns in spawns)
+        assertSameState(batch, engines)
+        if np.all(done):
+            break
+
+    assert np.all(batch.done)
+    if width == 4:
+        assert np.any(batch.score > 0)
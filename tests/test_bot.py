@@ -0,0 +1,36 @@
+import pickle
+from game_logic.bot import Bot
+from game_logic.engine import Engine
+
+def playPieces(engine: Engine, bot: Bot, pieces: int) -> list:
+    choices = []
+    engine.placeBlock()
+    for _ in range(pieces):
+        matrix = engine.matrix
+        placement = bot.choose(matrix, matrix.currentBlock, engine.nextBlock)
+        choices.append((placement.actions, placement.score))
+        for action, row in placement.actions:
+            while matrix.hasBlock() and matrix.getBlockPosition().y < row:
+                engine.moveDown()
+            engine.apply(action)
+        engine.hardDrop()
+    return choices
+
+def test_matrix_copies_pickle():
+    engine = Engine(seed = 1)
+    engine.placeBlock()
+    engine.hardDrop()
+    matrix = pickle.loads(pickle.dumps(engine.matrix.copy()))
+    assert matrix.getRows() == engine.matrix.getRows()
+    assert matrix.getCellTypes() == engine.matrix.getCellTypes()
+    assert matrix.getHash() == engine.matrix.getHash()
+    assert matrix.getPosition(3, 4) is engine.matrix.getPosition(3, 4)
+
+def test_parallel_lookahead_matches_serial():
+    serial = playPieces(Engine(seed = 3), Bot(lookahead = True), 5)
+    bot = Bot(lookahead = True, workers = 2)
+    try:
+        parallel = playPieces(Engine(seed = 3), bot, 5)
+    finally:
+        bot.close()
+    assert parallel == serial
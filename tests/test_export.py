@@ -0,0 +1,22 @@
+import json
+import pytest
+from game_logic.framebuffer import exportReplay
+from game_logic.replay import Replay
+from game_logic.scheduler import TICK_RATE
+
+TICKS = 2 * TICK_RATE
+
+def idleReplay() -> Replay:
+    return Replay(1, False, TICKS, 0, [])
+
+def test_export_keeps_the_requested_frame_rate(tmp_path):
+    result = exportReplay(idleReplay(), str(tmp_path / 'game'), fps = TICK_RATE // 2)
+    with open(result.path + '.json') as file:
+        header = json.load(file)
+    assert header['fps'] == TICK_RATE // 2
+    assert result.frames == header['frames'] == TICKS // 2 + 1
+
+@pytest.mark.parametrize('fps', [0, -1, 45, TICK_RATE + 1])
+def test_export_rejects_rates_that_do_not_divide_the_tick_rate(tmp_path, fps: int):
+    with pytest.raises(ValueError):
+        exportReplay(idleReplay(), str(tmp_path / 'game'), fps = fps)
@@ -0,0 +1,104 @@
+import random
+from bisect import bisect_left
+from game_logic.bot import AutoPlayer, Bot
+from game_logic.history import KEYFRAME_PIECES, KEYFRAME_TICKS, History
+from game_logic.session import Session
+from test_replay import playByHand
+
+TICKS = 6000
+# several keyframes into a game that is still going, random presses top out after a few dozen pieces
+BOT_TICKS = 3 * KEYFRAME_TICKS
+
+def getState(session: Session) -> tuple:
+    return session.ticks, session.engine.snapshot(), session.gravity.getState()
+
+def playRecorded(session: Session, history: History, generator: random.Random, ticks: int) -> dict[int, tuple]:
+    # live state at every tick, taken before that tick's inputs like History promises; without a generator the session's bot plays
+    states = {session.ticks: getState(session)}
+    for _ in range(ticks):
+        if generator == None:
+            session.update()
+        else:
+            playByHand(session, generator, 1)
+        history.update()
+        states[session.ticks] = getState(session)
+    return states
+
+def playForward(session: Session, ticks: int):
+    # the recorded inputs from the current tick on, applied without recording them a second time
+    events = session.events
+    index = bisect_left(events, session.ticks, key = lambda event: event[0])
+    session.events = []
+    try:
+        for _ in range(ticks):
+            while index < len(events) and events[index][0] <= session.ticks:
+                session.input(events[index][1])
+                index += 1
+            session.update()
+    finally:
+        session.events = events
+
+def test_seek_returns_to_the_live_state():
+    session = Session(3)
+    history = History(session)
+    states = playRecorded(session, history, random.Random(3), TICKS)
+    generator = random.Random(4)
+    for tick in [0, 1, TICKS - 1, TICKS, TICKS + 50] + [generator.randrange(TICKS) for _ in range(40)]:
+        history.seek(tick)
+        assert getState(session) == states[min(tick, TICKS)], tick
+
+def test_seek_returns_to_the_live_state_across_keyframes():
+    session = Session(3, AutoPlayer(Bot()))
+    history = History(session)
+    states = playRecorded(session, history, None, BOT_TICKS)
+    assert history.pieces > KEYFRAME_PIECES and not session.engine.done
+    generator = random.Random(5)
+    for tick in [0, KEYFRAME_TICKS - 1, KEYFRAME_TICKS, BOT_TICKS] + [generator.randrange(BOT_TICKS) for _ in range(40)]:
+        history.seek(tick)
+        assert getState(session) == states[tick], tick
+
+def test_seek_then_play_forward_matches_the_live_game():
+    session = Session(6)
+    history = History(session)
+    states = playRecorded(session, history, random.Random(6), TICKS)
+    generator = random.Random(7)
+    for _ in range(10):
+        history.seek(generator.randrange(TICKS - 200))
+        for _ in range(5):
+            playForward(session, 37)
+            assert getState(session) == states[session.ticks]
+
+def test_step_piece_lands_on_piece_starts():
+    session = Session(8)
+    history = History(session)
+    playRecorded(session, history, random.Random(8), 3000)
+    starts = []
+    for piece in (9, 10, 11):
+        history.seekPiece(piece)
+        starts.append(session.ticks)
+    assert starts[2] - starts[1] > 1
+    history.seek((starts[1] + starts[2]) // 2)
+    # the first step back only returns to the start of the piece in play
+    history.stepPiece(-1)
+    assert (session.ticks, history.getPiece()) == (starts[1], 10)
+    history.stepPiece(-1)
+    assert (session.ticks, history.getPiece()) == (starts[0], 9)
+    history.stepPiece(2)
+    assert (session.ticks, history.getPiece()) == (starts[2], 11)
+
+def test_branch_drops_the_future():
+    session = Session(9)
+    history = History(session)
+    playRecorded(session, history, random.Random(9), 3000)
+    history.seek(1500)
+    history.branch()
+    assert history.latestTick == 1500
+    assert all(tick < 1500 for tick, _ in session.events)
+    # different inputs from here on, the old future must not come back
+    states = playRecorded(session, history, random.Random(10), 500)
+    assert history.latestTick == 2000
+    history.seek(3000)
+    assert getState(session) == states[2000]
+    for tick in (1500, 1700, 1999):
+        history.seek(tick)
+        assert getState(session) == states[tick]
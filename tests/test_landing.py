@@ -0,0 +1,32 @@
+import random
+import pytest
+from codesets.blocks import ROTATIONS, Block, CellType, RotationType
+from boards import getRandomMatrix
+
+def fallWithMoveDown(matrix, block: Block, x: int, y: int) -> int:
+    copy = matrix.copy()
+    copy.placeAt(block, x, y)
+    while copy.moveDown():
+        y += 1
+    return y
+
+@pytest.mark.parametrize('seed', range(6))
+def test_landing_row_matches_falling_row_by_row(seed: int):
+    generator = random.Random(seed)
+    width = generator.choice((4, 10, 17))
+    matrix = getRandomMatrix(generator, width, 22, 12)
+    overhangs = 0
+    for type in CellType:
+        for rotationType in RotationType:
+            rotation = ROTATIONS[type].get(rotationType)
+            for x in range(width - rotation.width + 1):
+                for y in range(matrix.height - rotation.height + 1):
+                    block = Block(type, rotation)
+                    if not matrix.placeAt(block, x, y):
+                        continue
+                    expected = fallWithMoveDown(matrix, Block(type, rotation), x, y)
+                    assert matrix.getLandingRow() == expected, (type, rotationType, x, y)
+                    # started below a locked cell of one of its columns, where the column heights do not apply
+                    heights = matrix.getColumnHeights()
+                    overhangs += any(y + bottom >= heights[x + column] for column, bottom in enumerate(rotation.bottomProfile))
+    assert overhangs > 0
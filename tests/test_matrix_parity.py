@@ -0,0 +1,94 @@
+import random
+import pytest
+from codesets.blocks import CellType, Color, Position, PositionType, RotationType, getBlockFromValues
+from codesets.colors import GAME_PLANE_COLOR
+from game_logic.engine import CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT
+from game_logic.matirix import Matrix
+from legacy_matrix import LegacyMatrix
+
+MOVES = ('moveLeft', 'moveRight', 'moveDown', 'moveDown', 'rotateLeft', 'rotateRight')
+STEPS = 3000
+# the old rotation check looked at the board origin, so rotations are only compared while that corner is empty
+ORIGIN_ROWS = 4
+ORIGIN_MASK = (1 << 4) - 1
+
+def assertSameBoard(matrix: Matrix, legacy: LegacyMatrix):
+    for y in range(matrix.height):
+        for x in range(matrix.width):
+            cell = matrix.get(Position(x, y))
+            legacyCell = legacy.get(Position(x, y))
+            assert (cell.type, cell.color) == (legacyCell.type, legacyCell.color), (x, y)
+
+def isOriginClear(matrix: Matrix) -> bool:
+    return all(row & ORIGIN_MASK == 0 for row in matrix.getRows()[:ORIGIN_ROWS])
+
+# narrow boards fill rows often enough to compare line clears too
+@pytest.mark.parametrize('width, height', [(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT), (4, CELL_COUNT_HEIGHT)])
+@pytest.mark.parametrize('seed', range(8))
+def test_seeded_moves_match_legacy_matrix(seed: int, width: int, height: int):
+    color = Color(GAME_PLANE_COLOR)
+    matrix = Matrix(width, height, color, random.Random(seed))
+    legacy = LegacyMatrix(width, height, color, random.Random(seed))
+    moves = random.Random(~seed)
+    pieces = 0
+    rotations = 0
+    clears = 0
+    for _ in range(STEPS):
+        if not matrix.hasBlock():
+            type = moves.randint(CellType.LINE.value, CellType.MIRROR_L.value)
+            rotation = moves.randint(1, len(RotationType))
+            # the old matrix wrote a spawn over the stack, boards stop being comparable there
+            if not matrix.place(getBlockFromValues(type, rotation)):
+                break
+            legacy.place(getBlockFromValues(type, rotation))
+            pieces += 1
+        move = moves.choice(MOVES)
+        if move.startswith('rotate'):
+            before = matrix.currentBlock.getRotation()
+            getattr(matrix, move)()
+            # the old matrix rotated into locked cells, only follow rotations that were legal
+            if matrix.currentBlock.getRotation() is not before:
+                if not isOriginClear(matrix):
+                    break
+                getattr(legacy, move)()
+                rotations += 1
+        elif move == 'moveDown':
+            assert matrix.moveDown() == legacy.moveDown()
+        else:
+            getattr(matrix, move)()
+            getattr(legacy, move)()
+        if not matrix.hasBlock():
+            points = matrix.checkLine()
+            assert points == legacy.checkLine()
+            clears += points > 0
+        assertSameBoard(matrix, legacy)
+    assert pieces >= 8 and rotations >= 8, (pieces, rotations)
+    if width < CELL_COUNT_WIDTH:
+        assert clears > 0
+
+def test_rotation_cannot_overwrite_locked_cells():
+    color = Color(GAME_PLANE_COLOR)
+    matrix = Matrix(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, color, random.Random(0))
+    bottom = CELL_COUNT_HEIGHT - 4
+    # an upright line locked in column 6, then another upright line next to it whose flat rotation would cross it
+    matrix.placeAt(getBlockFromValues(CellType.LINE.value, RotationType.LEFT.value), 6, bottom)
+    assert not matrix.moveDown()
+    rows = matrix.getRows()
+    matrix.placeAt(getBlockFromValues(CellType.LINE.value, RotationType.LEFT.value), 5, bottom)
+    matrix.rotateRight()
+    assert matrix.currentBlock.getRotation().type == RotationType.LEFT
+    matrix.rotateLeft()
+    assert matrix.currentBlock.getRotation().type == RotationType.LEFT
+    assert matrix.getRows() == rows
+    assert matrix.get(Position(6, bottom)).type == PositionType.BLOCK
+    assert matrix.getLockedColor(Position(6, bottom)) is getBlockFromValues(CellType.LINE.value).color
+
+def test_rotation_on_the_floor_stays_on_the_board():
+    color = Color(GAME_PLANE_COLOR)
+    matrix = Matrix(CELL_COUNT_WIDTH, CELL_COUNT_HEIGHT, color, random.Random(0))
+    # a flat line on the last row has no room to stand up, the old check indexed past the floor here
+    matrix.placeAt(getBlockFromValues(CellType.LINE.value, RotationType.TOP.value), 3, CELL_COUNT_HEIGHT - 1)
+    matrix.rotateRight()
+    assert matrix.currentBlock.getRotation().type == RotationType.TOP
+    assert not matrix.moveDown()
+    assert matrix.getRows()[-1] == 0b1111 << 3
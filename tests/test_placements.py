@@ -0,0 +1,76 @@
+import random
+import pytest
+from codesets.blocks import ROTATIONS, Block, CellType, RotationType
+from game_logic.matirix import PLACEMENT_CACHE, Matrix
+from boards import getRandomMatrix
+
+MOVES = ('moveLeft', 'moveRight', 'rotateLeft', 'rotateRight')
+
+def searchAllMoves(matrix: Matrix, block: Block, x: int, y: int) -> set[tuple]:
+    # every state the Matrix moves reach from (x, y), trying each move on a fresh copy; a failed moveDown is a landing
+    start = (block.getRotation(), x, y)
+    seen = {start}
+    queue = [start]
+    landings = set()
+    for rotation, x, y in queue:
+        for move in MOVES + ('moveDown',):
+            copy = matrix.copy()
+            copy.placeAt(Block(block.type, rotation), x, y)
+            if getattr(copy, move)() == False and move == 'moveDown':
+                landings.add((rotation.rowMasks, x, y))
+                continue
+            position = copy.getBlockPosition()
+            state = (copy.currentBlock.getRotation(), position.x, position.y)
+            if state not in seen:
+                seen.add(state)
+                queue.append(state)
+    return landings
+
+def followMoves(matrix: Matrix, block: Block, x: int, y: int, moves: tuple[tuple[str, int], ...]) -> Matrix:
+    copy = matrix.copy()
+    copy.placeAt(Block(block.type, block.getRotation()), x, y)
+    for name, row in moves:
+        while copy.getBlockPosition().y < row:
+            assert copy.moveDown()
+        getattr(copy, name)()
+    copy.drop()
+    return copy
+
+@pytest.mark.parametrize('seed', range(6))
+def test_placements_match_exhaustive_search(seed: int):
+    generator = random.Random(seed)
+    width = generator.choice((4, 10, 13))
+    matrix = getRandomMatrix(generator, width, 22, 12)
+    tucks = 0
+    for type in CellType:
+        if type == CellType.BACKGROUD:
+            continue
+        block = Block(type, ROTATIONS[type].get(RotationType(generator.randint(1, 4))))
+        x = (width - block.getRotation().width) // 2
+        landings = matrix.getPlacements(block, x, 0)
+        assert {(landing.rotation.rowMasks, landing.x, landing.y) for landing in landings} == searchAllMoves(matrix, block, x, 0)
+        for landing in landings:
+            copy = followMoves(matrix, block, x, 0, landing.moves)
+            position = copy.getBlockPosition()
+            assert (copy.currentBlock.getRotation().rowMasks, position.x, position.y) == (landing.rotation.rowMasks, landing.x, landing.y)
+            assert not copy.moveDown()
+            copy.checkLine()
+            assert copy.lastLines == landing.lines
+            # a move made below the top row slid or turned the block under something
+            tucks += any(row > 0 for _, row in landing.moves)
+    assert tucks > 0
+
+def test_cached_placements_match_a_fresh_search():
+    matrix = getRandomMatrix(random.Random(7), 10, 22, 10)
+    block = Block(CellType.T, ROTATIONS[CellType.T].get(RotationType.TOP))
+    PLACEMENT_CACHE.clear()
+    misses = PLACEMENT_CACHE.misses
+    searched = matrix.getPlacements(block, 4, 0)
+    assert PLACEMENT_CACHE.misses == misses + 1
+    hits = PLACEMENT_CACHE.hits
+    # another matrix with the same locked cells shares the entry
+    assert matrix.copy().getPlacements(block, 4, 0) == searched
+    assert matrix.getPlacements(block, 4, 0) == searched
+    assert PLACEMENT_CACHE.hits == hits + 2
+    PLACEMENT_CACHE.clear()
+    assert matrix.getPlacements(block, 4, 0) == searched
@@ -0,0 +1,47 @@
+import random
+import pytest
+from game_logic import replay
+from game_logic.bot import AutoPlayer, Bot
+from game_logic.engine import Action
+from game_logic.session import Session
+
+TICKS = 3000
+# chance per tick of a key press
+PRESS_CHANCE = 0.2
+PRESSES = [Action.LEFT, Action.RIGHT, Action.ROTATE_LEFT, Action.ROTATE_RIGHT, Action.SAVE, Action.DOWN, Action.HARD_DROP]
+
+def playByHand(session: Session, generator: random.Random, ticks: int):
+    for _ in range(ticks):
+        if generator.random() < PRESS_CHANCE:
+            session.press(generator.choice(PRESSES))
+        if session.gravity.downPressed and generator.random() < 0.3:
+            session.release(Action.DOWN)
+        session.update()
+
+@pytest.mark.parametrize('seed', range(3))
+def test_saved_replay_reproduces_the_game(seed: int, tmp_path):
+    session = Session(seed)
+    playByHand(session, random.Random(seed), TICKS)
+    path = str(tmp_path / 'game.trp')
+    replay.save(replay.fromSession(session), path)
+    played = replay.simulate(replay.load(path))
+    assert played.ticks == session.ticks
+    assert played.events == session.events
+    assert played.engine.snapshot() == session.engine.snapshot()
+    assert played.engine.score == session.engine.score
+
+def test_bot_replay_plays_without_the_bot(tmp_path):
+    session = Session(5, AutoPlayer(Bot()), width = 8, height = 16)
+    for _ in range(TICKS):
+        session.update()
+    recorded = replay.decode(replay.encode(replay.fromSession(session)))
+    assert recorded.autoPlay and (recorded.width, recorded.height) == (8, 16)
+    assert replay.verify(recorded)
+    assert replay.simulate(recorded).engine.snapshot() == session.engine.snapshot()
+
+def test_restored_sessions_cannot_be_replayed():
+    session = Session(1)
+    playByHand(session, random.Random(1), 100)
+    session.restore(session.engine.snapshot())
+    with pytest.raises(replay.ReplayError):
+        replay.fromSession(session)
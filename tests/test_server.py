@@ -0,0 +1,42 @@
+import random
+import pytest
+from game_logic.engine import Action
+from game_logic.server import GameServer, RemoteGame
+from game_logic.session import RELEASE_FLAG, Session
+
+TICKS = 4000
+PRESS_CHANCE = 0.05
+PRESSES = [Action.LEFT, Action.RIGHT, Action.ROTATE_LEFT, Action.ROTATE_RIGHT, Action.DOWN]
+
+@pytest.mark.parametrize('seed', range(3))
+def test_wheel_falls_on_the_ticks_a_session_does(seed: int):
+    # the wheel driven tick by tick without the event loop, next to a Session getting the same inputs
+    server = GameServer()
+    game = RemoteGame(server)
+    game.engine.reset(seed)
+    game.schedule()
+    session = Session(seed)
+    generator = random.Random(seed)
+    falls = softFalls = gated = 0
+    for _ in range(TICKS):
+        if generator.random() < PRESS_CHANCE:
+            action = generator.choice(PRESSES)
+            session.press(action)
+            game.input(action.value)
+        if session.gravity.downPressed and generator.random() < 0.1:
+            session.release(Action.DOWN)
+            game.input(Action.DOWN.value | RELEASE_FLAG)
+
+        session.update()
+        downPressed, ticksLastEvent, _ = session.gravity.getState()
+        sessionFell = ticksLastEvent == 0
+        # gravity was due but a recent sideways move held it back
+        gated += not sessionFell and not downPressed and ticksLastEvent >= server.tickDown
+        due = server.wheel.advance()
+        for dueGame in due:
+            dueGame.fall()
+        assert (game in due) == sessionFell, server.wheel.tick
+        assert game.engine.snapshot() == session.engine.snapshot(), server.wheel.tick
+        falls += sessionFell
+        softFalls += sessionFell and downPressed
+    assert falls > 0 and softFalls > 0 and gated > 0
@@ -0,0 +1,96 @@
+import random
+import pytest
+from game_logic.engine import SNAPSHOT_HEADER, Action, Engine, SnapshotError
+from game_logic.matirix import getSnapshotFormat
+
+def play(engine: Engine, actions: list[Action]) -> list:
+    return [engine.step(action) for action in actions]
+
+@pytest.mark.parametrize('seed', range(4))
+def test_restored_engine_plays_on_identically(seed: int):
+    generator = random.Random(seed)
+    engine = Engine(seed = seed)
+    engine.reset(seed)
+    for _ in range(20):
+        play(engine, [Action(generator.randrange(len(Action))) for _ in range(generator.randint(1, 60))])
+        snapshot = engine.snapshot()
+        restored = Engine()
+        restored.restore(snapshot)
+        assert restored.snapshot() == snapshot
+        actions = [Action(generator.randrange(len(Action))) for _ in range(40)]
+        assert play(restored, actions) == play(engine, actions)
+        assert restored.matrix.getColumnHeights() == engine.matrix.getColumnHeights()
+
+def test_keyframes_restore_without_copying_rows():
+    engine = Engine(seed = 1)
+    engine.reset(1)
+    play(engine, [Action.HARD_DROP] * 30)
+    keyframe = engine.getKeyframe()
+    snapshot = engine.snapshot()
+    play(engine, [Action.LEFT, Action.HARD_DROP] * 10)
+    engine.restoreKeyframe(keyframe)
+    assert engine.snapshot() == snapshot
+    assert engine.matrix.getBoard().colors[-1] is keyframe.board.colors[-1]
+
+def test_bad_snapshots_leave_the_engine_untouched():
+    engine = Engine(seed = 2)
+    engine.reset(2)
+    play(engine, [Action.HARD_DROP] * 5)
+    snapshot = engine.snapshot()
+    for size in (0, SNAPSHOT_HEADER.size, len(snapshot) - 1):
+        with pytest.raises(SnapshotError):
+            engine.restore(snapshot[:size])
+    with pytest.raises(SnapshotError):
+        engine.restore(Engine(12, 22).snapshot())
+    assert engine.snapshot() == snapshot
+
+def damage(snapshot: bytes, offset: int, value: int) -> bytes:
+    return snapshot[:offset] + bytes([value]) + snapshot[offset + 1:]
+
+def test_damaged_fields_are_rejected_before_anything_changes():
+    engine = Engine(seed = 3)
+    engine.reset(3)
+    play(engine, [Action.HARD_DROP] * 5 + [Action.DOWN])
+    snapshot = engine.snapshot()
+    matrixStart = SNAPSHOT_HEADER.size
+    rowsStart = matrixStart + 6
+    planeStart = matrixStart + getSnapshotFormat(engine.width, engine.height).size
+    damaged = [
+        # next block, saved block type and rotation, active block type and rotation
+        damage(snapshot, 20, 0),
+        damage(snapshot, 20, 9),
+        damage(snapshot, 21, 7),
+        damage(damage(snapshot, 21, 2), 22, 9),
+        damage(snapshot, matrixStart, 9),
+        damage(snapshot, matrixStart + 1, 0),
+        # active block origin left of, right of and below the board
+        damage(damage(snapshot, matrixStart + 2, 0xff), matrixStart + 3, 0xff),
+        damage(snapshot, matrixStart + 2, engine.width),
+        damage(snapshot, matrixStart + 4, engine.height),
+        # a row mask wider than the board and an unknown cell type
+        damage(snapshot, rowsStart + 2 * (engine.height - 1) + 1, 0x80),
+        damage(snapshot, planeStart, 0x7f),
+    ]
+    for data in damaged:
+        with pytest.raises(SnapshotError):
+            engine.restore(data)
+        assert engine.snapshot() == snapshot
+
+def test_bit_flipped_snapshots_are_rejected_or_playable():
+    engine = Engine(seed = 4)
+    engine.reset(4)
+    play(engine, [Action.LEFT, Action.HARD_DROP] * 6 + [Action.DOWN])
+    snapshot = engine.snapshot()
+    rejected = 0
+    for offset in range(len(snapshot)):
+        for bit in range(8):
+            data = damage(snapshot, offset, snapshot[offset] ^ 1 << bit)
+            try:
+                engine.restore(data)
+            except SnapshotError:
+                rejected += 1
+                assert engine.snapshot() == snapshot
+                continue
+            play(engine, [Action.HARD_DROP, Action.LEFT, Action.ROTATE_LEFT, Action.DOWN] * 5)
+            engine.restore(snapshot)
+    assert rejected > 0
@@ -0,0 +1,12 @@
+import pytest
+from benchmarks.startup import HEADLESS_MODULES, IMPORT_BUDGETS, findForbidden, measureImport
+
+@pytest.mark.parametrize('module', HEADLESS_MODULES)
+def test_headless_modules_skip_heavy_imports(module: str):
+    assert findForbidden(module) == []
+
+# the game's own budget needs pygame and a display, benchmarks/startup.py checks it
+@pytest.mark.parametrize('module', [module for module in IMPORT_BUDGETS if module in HEADLESS_MODULES])
+def test_headless_imports_stay_in_budget(module: str):
+    milliseconds = measureImport(module)
+    assert milliseconds <= IMPORT_BUDGETS[module], '%s took %.1f ms' % (module, milliseconds)
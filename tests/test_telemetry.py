@@ -0,0 +1,40 @@
+import json
+import os
+import time
+from game_logic.telemetry import Telemetry
+
+def readEvents(path: str) -> list[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+def emitBatches(telemetry: Telemetry, batches: int, size: int = 50):
+    # each batch is written on its own, so every batch after the first has to rotate
+    for batch in range(batches):
+        for index in range(size):
+            telemetry.emit('lock', batch = batch, index = index)
+        deadline = time.monotonic() + 5.0
+        while telemetry.written < telemetry.emitted and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+def test_rotation_keeps_backups(tmp_path):
+    path = str(tmp_path / 'game.jsonl')
+    telemetry = Telemetry(path, maxBytes = 1024, backups = 2, flushInterval = 0.01)
+    emitBatches(telemetry, 4)
+    telemetry.close()
+    assert telemetry.rotations == 3
+    assert telemetry.failedWrites == 0
+    assert os.path.exists(path + '.2') and not os.path.exists(path + '.3')
+    assert readEvents(path)[0]['batch'] == 3
+
+def test_failed_rotation_keeps_the_writer_running(tmp_path, monkeypatch):
+    path = str(tmp_path / 'game.jsonl')
+    telemetry = Telemetry(path, maxBytes = 1024, flushInterval = 0.01)
+    def failReplace(source: str, target: str):
+        raise OSError('read-only file system')
+    monkeypatch.setattr(os, 'replace', failReplace)
+    emitBatches(telemetry, 4)
+    telemetry.close()
+    assert telemetry.rotations == 0
+    assert telemetry.failedWrites == 3
+    assert telemetry.written == 200
+    assert len(readEvents(path)) == 200
@@ -0,0 +1,55 @@
+import pytest
+from game_logic import tournament
+from game_logic.bot import Weights
+from game_logic.tournament import Config, PolicySpec
+
+CONFIG = Config(4, 0, maxPieces = 15)
+SPECS = [PolicySpec('greedy', Weights()), PolicySpec('greedy', Weights(1.0, 0.0, 0.0, 0.0))]
+# the real one, a second recordGames must not wrap the first
+playGame = tournament.playGame
+
+def recordGames(monkeypatch, played: list, interruptAfter: int = None):
+    def recordingPlayGame(spec: PolicySpec, seed: int, *arguments):
+        if len(played) == interruptAfter:
+            raise KeyboardInterrupt
+        played.append((spec, seed))
+        return playGame(spec, seed, *arguments)
+    monkeypatch.setattr(tournament, 'playGame', recordingPlayGame)
+
+def test_resumed_tournament_plays_only_the_missing_seeds(monkeypatch, tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    first = []
+    recordGames(monkeypatch, first, interruptAfter = 5)
+    with pytest.raises(KeyboardInterrupt):
+        tournament.runTournament(SPECS, CONFIG, checkpointPath = path)
+    resumed = []
+    recordGames(monkeypatch, resumed)
+    summaries = tournament.runTournament(SPECS, CONFIG, checkpointPath = path)
+    everything = [(spec, seed) for spec in SPECS for seed in tournament.getSeeds(CONFIG)]
+    assert len(first) == 5 and set(first).isdisjoint(resumed)
+    assert sorted(first + resumed, key = everything.index) == everything
+
+    # the same as a run that was never interrupted
+    monkeypatch.undo()
+    assert summaries == tournament.runTournament(SPECS, CONFIG)
+
+def test_resumed_tuning_continues_the_interrupted_generation(monkeypatch, tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    population = 3
+    played = []
+    # all of generation 0 and part of generation 1
+    interruptAfter = population * CONFIG.games + 4
+    recordGames(monkeypatch, played, interruptAfter)
+    with pytest.raises(KeyboardInterrupt):
+        tournament.tune('greedy', 2, CONFIG, population, checkpointPath = path)
+    resumed = []
+    recordGames(monkeypatch, resumed)
+    weights = tournament.tune('greedy', 2, CONFIG, population, checkpointPath = path)
+    assert len(resumed) == 2 * population * CONFIG.games - interruptAfter
+    assert all(seed in tournament.getSeeds(CONFIG, 1) for _, seed in resumed)
+    monkeypatch.undo()
+    assert weights == tournament.tune('greedy', 2, CONFIG, population)
+
+def test_tuning_needs_a_generation():
+    with pytest.raises(ValueError):
+        tournament.tune('greedy', 0, CONFIG)